@@ -0,0 +1,126 @@
+"""
+access_log.py — Structured, sampled access log written off the event loop.
+
+Centralizes: record(), which RequestMiddleware calls once per response, and
+start() / stop(), which run the QueueListener for the app lifespan.
+
+Each entry is one JSON line on stdout from the "jdgk-api.access" logger:
+    {"ts": ..., "method": "GET", "path": "/api/blog/hello", "route": "/api/blog/{slug}",
+     "status": 200, "duration_ms": 12.41, "db_ms": 3.02, "db_statements": 2, ...}
+
+record() only decides whether to log and enqueues a plain dict; a
+QueueListener thread turns it into JSON and writes it, so a slow stdout
+never blocks a request. Responses below 400 are logged with probability
+ACCESS_LOG_SAMPLE_RATE (entries carry "sample_rate" so counts can be scaled
+back up); errors, requests slower than ACCESS_LOG_SLOW_MS and requests
+flagged for their queries ("db_over_budget", "db_repeated"; see
+db_metrics.QUERY_BUDGET) are always logged. If the queue is full
+(ACCESS_LOG_QUEUE_SIZE) entries are dropped and counted rather than waited
+on. This replaces uvicorn's own access log, which start.sh turns off.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Optional
+
+from starlette.types import Scope
+
+from .db_metrics import QueryStats
+
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "1.0"))
+ACCESS_LOG_SLOW_MS = float(os.getenv("ACCESS_LOG_SLOW_MS", "1000"))
+ACCESS_LOG_QUEUE_SIZE = int(os.getenv("ACCESS_LOG_QUEUE_SIZE", "10000"))
+
+logger = logging.getLogger("jdgk-api.access")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+
+dropped = 0
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record.msg, ensure_ascii=False, separators=(",", ":"))
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The default formats in the calling thread; the listener does it instead
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        global dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped += 1
+
+
+_handler = _QueueHandler(queue.Queue(ACCESS_LOG_QUEUE_SIZE))
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def start() -> None:
+    global _listener
+    if _listener is not None:
+        return
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter())
+    _listener = logging.handlers.QueueListener(_handler.queue, output)
+    _listener.start()
+    logger.addHandler(_handler)
+
+
+def stop() -> None:
+    """Flush what is queued and stop the listener thread."""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        logger.removeHandler(_handler)
+        listener.stop()
+
+
+def route_template(scope: Scope) -> Optional[str]:
+    """The matched route's path pattern (or mount prefix), filled in by the router as the request ran."""
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path", None)
+    root_path = scope.get("root_path")
+    return f"{root_path}/{{path}}" if root_path else None
+
+
+def record(
+    scope: Scope, route: Optional[str], status: int, duration_ns: int, queries: QueryStats, response_bytes: int,
+) -> None:
+    if _listener is None:
+        return
+    duration_ms = duration_ns / 1_000_000
+    over_budget = queries.over_budget()
+    repeated = queries.repeated()
+    sampled = status < 400 and duration_ms < ACCESS_LOG_SLOW_MS and not over_budget and not repeated
+    if sampled and (ACCESS_LOG_SAMPLE_RATE <= 0 or random.random() >= ACCESS_LOG_SAMPLE_RATE):
+        return
+    entry = {
+        "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "method": scope["method"],
+        "path": scope["path"],
+        "route": route,
+        "status": status,
+        "duration_ms": round(duration_ms, 2),
+        "db_ms": round(queries.seconds * 1000, 2),
+        "db_statements": queries.statements,
+        "bytes": response_bytes,
+        "client": scope["client"][0] if scope.get("client") else None,
+    }
+    if over_budget:
+        entry["db_over_budget"] = True
+    if repeated:
+        entry["db_repeated"] = {" ".join(sql.split())[:200]: n for sql, n in repeated.items()}
+    if sampled and ACCESS_LOG_SAMPLE_RATE < 1:
+        entry["sample_rate"] = ACCESS_LOG_SAMPLE_RATE
+    logger.info(entry)
@@ -3,6 +3,8 @@ JWT Authentication module for JDGK Backend.
 Provides token creation, validation, and FastAPI dependencies for route protection.
 """
 
+import hashlib
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
@@ -11,8 +13,9 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 
+from .cache import _MISSING, QueryCache
 from .database import get_db
-from . import models, crud
+from . import cache_bus, models, schemas, crud
 import os
 
 # --- Configuration ---
@@ -32,6 +35,10 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1440
 
 security = HTTPBearer(auto_error=False)
 
+# Identity cache: how long a resolved token may skip the user lookup
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "30"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "1024"))
+
 
 # --- Token Operations ---
 
@@ -48,15 +55,71 @@ def decode_token(token: str) -> dict:
     return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
 
 
+# --- Identity Cache ---
+# sha256(token) -> (exp, schemas.Identity), so repeat requests with the same
+# token skip both the JWT decode and the user query. Entries are tagged with
+# the user id and dropped through cache_bus whenever crud commits to "users"
+# (update_user, update_user_role, delete_user — on any worker), so a role
+# change or deletion applies to the very next request. Commits that carry no
+# user id (a bulk change) drop every entry.
+
+_identity_cache = QueryCache(AUTH_CACHE_TTL, AUTH_CACHE_MAX_ENTRIES)
+# Bumped on every users invalidation; a lookup that raced with a write is not stored
+_identity_generation = 0
+
+
+def identity_cache_stats() -> dict:
+    return _identity_cache.stats()
+
+
+def _token_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def _cached_user(token: str) -> Optional[schemas.Identity]:
+    """The token's identity, if resolved recently and the token is unexpired."""
+    entry = _identity_cache.get(_token_key(token))
+    if entry is _MISSING:
+        return None
+    exp, identity = entry
+    if exp <= time.time():
+        return None
+    return identity
+
+
+def _remember_user(token: str, payload: dict, identity: schemas.Identity, generation: int) -> None:
+    if generation != _identity_generation:
+        return
+    _identity_cache.set(
+        _token_key(token),
+        (payload.get("exp", float("inf")), identity),
+        tags=("users", f"users:{identity.id}"),
+    )
+
+
+def _invalidate_identities(table: str, key: Optional[str]) -> None:
+    global _identity_generation
+    if table not in ("users", cache_bus.ALL_TABLES):
+        return
+    _identity_generation += 1
+    if key is None:
+        _identity_cache.clear()
+    else:
+        _identity_cache.invalidate(f"users:{key}")
+
+
+cache_bus.subscribe(_invalidate_identities)
+
+
 # --- FastAPI Dependencies ---
 
 async def get_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     db: Session = Depends(get_db),
-) -> models.User:
+) -> schemas.Identity:
     """
     Dependency: extracts and validates the JWT from the Authorization header.
-    Returns the authenticated User model instance.
+    Returns the authenticated user as a read-only schemas.Identity.
     Raises 401 if token is missing, invalid, or user not found.
     """
     if credentials is None:
@@ -66,6 +129,11 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    user = _cached_user(credentials.credentials)
+    if user is not None:
+        return user
+
+    generation = _identity_generation
     try:
         payload = decode_token(credentials.credentials)
         user_id: str = payload.get("sub")
@@ -94,13 +162,15 @@ async def get_current_user(
             detail="User not found",
         )
 
-    return user
+    identity = schemas.Identity.model_validate(user)
+    _remember_user(credentials.credentials, payload, identity, generation)
+    return identity
 
 
 async def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     db: Session = Depends(get_db),
-) -> Optional[models.User]:
+) -> Optional[schemas.Identity]:
     """
     Dependency: same as get_current_user but returns None instead of raising
     if no token is provided. Useful for endpoints that behave differently
@@ -109,6 +179,11 @@ async def get_current_user_optional(
     if credentials is None:
         return None
 
+    user = _cached_user(credentials.credentials)
+    if user is not None:
+        return user
+
+    generation = _identity_generation
     try:
         payload = decode_token(credentials.credentials)
         user_id: str = payload.get("sub")
@@ -117,12 +192,17 @@ async def get_current_user_optional(
     except JWTError:
         return None
 
-    return db.query(models.User).filter(models.User.id == user_id).first()
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    if user is None:
+        return None
+    identity = schemas.Identity.model_validate(user)
+    _remember_user(credentials.credentials, payload, identity, generation)
+    return identity
 
 
 async def require_admin(
-    current_user: models.User = Depends(get_current_user),
-) -> models.User:
+    current_user: schemas.Identity = Depends(get_current_user),
+) -> schemas.Identity:
     """
     Dependency: requires the current user to have admin role.
     Chain after get_current_user — raises 403 if not admin.
@@ -0,0 +1,185 @@
+"""
+blobstore.py — Content-addressed storage for uploaded files.
+
+Centralizes: store(), which files a hashed upload (see uploads.py) once under
+uploads/blobs/<sha256[:2]>/<sha256><ext> — a URL whose bytes can never
+change, so it is served with an immutable far-future Cache-Control — and
+records the logical path the client asked for; remove(), which drops a
+logical path; and collect_garbage(), which deletes blobs nothing references.
+
+upload_blobs holds one row per distinct content with a ref_count,
+upload_paths maps each logical path (e.g. gallery/logo.png) to its blob.
+On disk the logical path is a hard link to the blob, so /uploads/<path> URLs
+keep working without a second copy of the bytes. CMS rows (pages, team
+members, gallery items, settings, ...) save the content-addressed URL itself,
+so GC also keeps any blob whose hash still appears in one of them.
+
+Files are written and unlinked while the database locks are held and
+committed right after: store() and remove() hold a per-path advisory lock
+plus the blob row, and collect_garbage() holds the orphan's row while it
+unlinks the blob. A re-upload racing GC therefore either keeps the row alive
+(GC skips it) or waits for GC to finish and writes the file afresh.
+"""
+import errno
+import gzip
+import os
+import shutil
+import uuid
+from typing import NamedTuple, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from . import crud_async, images
+from .metrics import request_metrics
+from .uploads import SavedUpload, _discard
+
+UPLOAD_DIR = "uploads"
+BLOB_PREFIX = "blobs"
+BLOB_DIR = os.path.join(UPLOAD_DIR, BLOB_PREFIX)
+# Unreferenced blobs are kept this long in case they are uploaded again
+BLOB_GC_GRACE_SECONDS = float(os.getenv("BLOB_GC_GRACE_SECONDS", "3600"))
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Text-based types get a gzip sidecar (<blob>.gz) when stored, served by UploadStaticFiles / nginx gzip_static
+PRECOMPRESSED_EXTENSIONS = {".svg"}
+PRECOMPRESSED_SUFFIX = ".gz"
+
+
+class StoredUpload(NamedTuple):
+    url: str           # immutable, content-addressed
+    path: str          # logical, relative to uploads/
+    size: int
+    sha256: str
+
+
+def blob_name(sha256: str, extension: str) -> str:
+    return f"{BLOB_PREFIX}/{sha256[:2]}/{sha256}{extension}"
+
+
+def blob_url(sha256: str, extension: str) -> str:
+    return f"/{UPLOAD_DIR}/{blob_name(sha256, extension)}"
+
+
+def logical_path(file_path: str) -> str:
+    """`file_path` (under UPLOAD_DIR) as the key stored in upload_paths."""
+    return os.path.relpath(file_path, UPLOAD_DIR).replace("\\", "/")
+
+
+def is_reserved_path(path: str) -> bool:
+    """Whether a logical path falls in the blob or variant trees, which clients may not write."""
+    return any(path == p or path.startswith(p + "/") for p in (BLOB_PREFIX, images.VARIANT_PREFIX))
+
+
+def staging_path() -> str:
+    """A temp name inside BLOB_DIR, so publishing it is a same-filesystem rename."""
+    os.makedirs(BLOB_DIR, exist_ok=True)
+    return os.path.join(BLOB_DIR, f".upload-{uuid.uuid4().hex}.part")
+
+
+def precompress(blob_file: str) -> None:
+    """Write <blob>.gz beside a compressible blob, unless it would not be smaller."""
+    if os.path.splitext(blob_file)[1].lower() not in PRECOMPRESSED_EXTENSIONS:
+        return
+    with open(blob_file, "rb") as f:
+        data = f.read()
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) >= len(data):
+        return
+    tmp_path = f"{blob_file}.{uuid.uuid4().hex}.part"
+    try:
+        with open(tmp_path, "wb") as out:
+            out.write(compressed)
+        os.replace(tmp_path, blob_file + PRECOMPRESSED_SUFFIX)
+    finally:
+        _discard(tmp_path)
+
+
+def _publish(tmp_path: str, blob_file: str, file_path: str) -> None:
+    os.makedirs(os.path.dirname(blob_file), exist_ok=True)
+    if os.path.exists(blob_file):
+        _discard(tmp_path)  # Already stored — this is the deduplication
+    else:
+        os.replace(tmp_path, blob_file)
+        precompress(blob_file)
+    _link(blob_file, file_path)
+
+
+def _link(blob_file: str, file_path: str) -> None:
+    """Make `file_path` a hard link to `blob_file`, atomically replacing what was there."""
+    directory = os.path.dirname(file_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    try:
+        if os.path.samefile(blob_file, file_path):
+            return
+    except FileNotFoundError:
+        pass
+    tmp_link = os.path.join(directory, f".link-{uuid.uuid4().hex}.part")
+    try:
+        try:
+            os.link(blob_file, tmp_link)
+        except OSError as e:
+            if e.errno not in (errno.EPERM, errno.EXDEV, errno.ENOTSUP, errno.EMLINK):
+                raise
+            shutil.copyfile(blob_file, tmp_link)  # No hard links on this volume
+        os.replace(tmp_link, file_path)
+    finally:
+        _discard(tmp_link)
+
+
+async def store(
+    db: AsyncSession,
+    tmp_path: str,
+    saved: SavedUpload,
+    file_path: str,
+    extension: str,
+    content_type: Optional[str] = None,
+) -> StoredUpload:
+    """Publish the hashed temp file `tmp_path` as `file_path`, storing its bytes once."""
+    path = logical_path(file_path)
+    width = await run_in_threadpool(images.probe_width, tmp_path)
+    try:
+        extension = await crud_async.attach_upload(
+            db, path, saved.sha256, saved.size, extension, content_type, width,
+        )
+        blob_file = os.path.join(UPLOAD_DIR, blob_name(saved.sha256, extension))
+        await run_in_threadpool(_publish, tmp_path, blob_file, file_path)
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        _discard(tmp_path)
+        raise
+    images.remember_widths([(saved.sha256, width)])
+    request_metrics.observe_upload(saved.size)
+    return StoredUpload(blob_url(saved.sha256, extension), path, saved.size, saved.sha256)
+
+
+async def remove(db: AsyncSession, file_path: str) -> bool:
+    """Drop the logical path; its blob stays until collect_garbage() finds it unreferenced."""
+    try:
+        sha256 = await crud_async.detach_upload(db, logical_path(file_path))
+        if sha256 is not None:
+            await run_in_threadpool(_discard, file_path)
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
+    return sha256 is not None
+
+
+async def collect_garbage(db: AsyncSession, grace_seconds: float = BLOB_GC_GRACE_SECONDS) -> dict:
+    """Delete every blob (and its image variants) unreferenced for at least grace_seconds."""
+    deleted = freed = 0
+    while (blob := await crud_async.lock_orphan_blob(db, grace_seconds)) is not None:
+        size = blob.size
+        try:
+            blob_file = os.path.join(UPLOAD_DIR, blob_name(blob.sha256, blob.extension))
+            await run_in_threadpool(_discard, blob_file)
+            await run_in_threadpool(_discard, blob_file + PRECOMPRESSED_SUFFIX)
+            await run_in_threadpool(shutil.rmtree, images.variant_dir(blob.sha256), True)
+        except BaseException:
+            await db.rollback()
+            raise
+        await crud_async.delete_blob(db, blob)
+        deleted += 1
+        freed += size
+    return {"deleted": deleted, "bytes_freed": freed}
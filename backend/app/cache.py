@@ -0,0 +1,197 @@
+"""
+cache.py — In-process read-through cache for public CMS queries.
+
+Centralizes: the shared QueryCache instance, the @cached_query decorator
+used by the crud.get_* list functions, and cached_call() for ad-hoc reads.
+
+Entries are keyed on the function name plus its normalized query parameters
+and tagged with the table(s) they were read from. Writers call
+query_cache.invalidate(<table>) after commit, which drops exactly the entries
+tagged with that table. Entries also expire after QUERY_CACHE_TTL seconds and
+the least-recently-used entry is evicted once QUERY_CACHE_MAX_ENTRIES is hit.
+"""
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Awaitable, Callable, Hashable, Iterable, Type
+
+from pydantic import BaseModel, ConfigDict
+
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "60"))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1024"))
+
+_MISSING = object()
+
+
+class QueryCache:
+    """Thread-safe TTL + LRU cache with tag-based invalidation."""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple[float, Any, tuple[str, ...]]]" = OrderedDict()
+        self._tags: dict[str, set[Hashable]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value for key, or _MISSING if absent/expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return _MISSING
+            expires_at, value, _ = entry
+            if expires_at < time.monotonic():
+                self._drop(key)
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[str]) -> None:
+        tags = tuple(tags)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def invalidate(self, *tags: str) -> None:
+        """Drop every entry tagged with any of the given tags."""
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _drop(self, key: Hashable) -> None:
+        # Caller must hold self._lock
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+# ── Shared instance ───────────────────────────────────────────────────────────
+query_cache = QueryCache(ttl=QUERY_CACHE_TTL, max_entries=QUERY_CACHE_MAX_ENTRIES)
+
+
+def cached_call(key: Hashable, tags: Iterable[str], loader: Callable[[], Any]) -> Any:
+    """Return the cached value for key, calling loader() and caching it on a miss."""
+    value = query_cache.get(key)
+    if value is _MISSING:
+        value = loader()
+        query_cache.set(key, value, tags)
+    return value
+
+
+async def cached_call_async(key: Hashable, tags: Iterable[str], loader: Callable[[], Awaitable[Any]]) -> Any:
+    """Async variant of cached_call() for loaders that run on an AsyncSession."""
+    value = query_cache.get(key)
+    if value is _MISSING:
+        value = await loader()
+        query_cache.set(key, value, tags)
+    return value
+
+
+def _normalize(value: Any) -> Hashable:
+    # crud filters treat "" the same as None (`if status:`), so share the key
+    if isinstance(value, str):
+        return value or None
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(sorted(_normalize(v) for v in value))
+    return value
+
+
+_frozen_schemas: dict[type, type] = {}
+
+
+def _frozen(schema: Type[BaseModel]) -> Type[BaseModel]:
+    """A frozen subclass of schema; responses and PageBundle fields still accept it as the schema."""
+    frozen = _frozen_schemas.get(schema)
+    if frozen is None:
+        frozen = _frozen_schemas[schema] = type(
+            schema.__name__, (schema,), {"__module__": schema.__module__, "model_config": ConfigDict(frozen=True)}
+        )
+    return frozen
+
+
+def cached_query(schema: Type[BaseModel], *tags: str) -> Callable:
+    """
+    Decorator for crud list functions with signature (db, **query_params).
+
+    Works on both sync (Session) and async (AsyncSession) functions. The key
+    is the function name plus its parameters, so crud.get_pages and
+    crud_async.get_pages share entries. Rows are cached as frozen `schema`
+    instances rather than ORM objects: every request shares them, so they
+    must not be attached to a session or be mutated by the caller.
+    """
+    def decorator(fn: Callable) -> Callable:
+        sig = inspect.signature(fn)
+        snapshot = _frozen(schema)
+
+        def make_key(db, args, kwargs) -> Hashable:
+            bound = sig.bind(db, *args, **kwargs)
+            bound.apply_defaults()
+            params = tuple(
+                (name, _normalize(value))
+                for name, value in bound.arguments.items()
+                if name != "db"
+            )
+            return (fn.__name__, params)
+
+        def store(key, result) -> list:
+            rows = tuple(snapshot.model_validate(obj) for obj in result)
+            query_cache.set(key, rows, tags)
+            return list(rows)
+
+        if inspect.iscoroutinefunction(fn):
+            @wraps(fn)
+            async def async_wrapper(db, *args, **kwargs):
+                key = make_key(db, args, kwargs)
+                cached = query_cache.get(key)
+                if cached is not _MISSING:
+                    return list(cached)
+                return store(key, await fn(db, *args, **kwargs))
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(db, *args, **kwargs):
+            key = make_key(db, args, kwargs)
+            cached = query_cache.get(key)
+            if cached is not _MISSING:
+                return list(cached)
+            return store(key, fn(db, *args, **kwargs))
+
+        return wrapper
+    return decorator
@@ -0,0 +1,123 @@
+"""
+cache_bus.py — Cross-worker cache invalidation over Postgres LISTEN/NOTIFY.
+
+Every crud mutation calls publish() before committing, which queues a
+pg_notify() on the same transaction — Postgres only delivers it once the
+write commits. Each uvicorn worker runs listen() from the app lifespan and
+applies incoming events to its in-process caches, so a write handled by one
+worker evicts stale entries on all of them.
+
+Payload: {"origin": <worker id>, "table": <table name>, "key": <row key | null>}
+"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+from typing import Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .cache import query_cache
+
+logger = logging.getLogger("jdgk-api")
+
+CHANNEL = "cms_cache_invalidate"
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+RECONNECT_DELAY_SECONDS = 5
+
+# Extra per-process caches (settings snapshot, token cache, ...) register here.
+# ALL_TABLES is passed when events may have been missed and everything must go.
+ALL_TABLES = "*"
+_subscribers: list[Callable[[str, Optional[str]], None]] = []
+
+
+def subscribe(callback: Callable[[str, Optional[str]], None]) -> None:
+    """Register callback(table, key) to run for every local or remote invalidation."""
+    _subscribers.append(callback)
+
+
+def apply(table: str, key: Optional[str] = None) -> None:
+    """Evict cached entries for table (and table:key) in this process."""
+    if table == ALL_TABLES:
+        query_cache.clear()
+    else:
+        query_cache.invalidate(*([table] if key is None else [table, f"{table}:{key}"]))
+    for callback in _subscribers:
+        try:
+            callback(table, key)
+        except Exception:
+            logger.exception("cache_bus subscriber failed for %s", table)
+
+
+_NOTIFY = text("SELECT pg_notify(:channel, :payload)")
+
+
+def _notify_params(table: str, key: Optional[str]) -> dict:
+    return {"channel": CHANNEL, "payload": json.dumps({"origin": WORKER_ID, "table": table, "key": key})}
+
+
+def publish(db: Session, table: str, key: Optional[str] = None) -> None:
+    """Queue an invalidation event on db's current transaction (sent on commit)."""
+    db.execute(_NOTIFY, _notify_params(table, key))
+
+
+async def publish_async(db: AsyncSession, table: str, key: Optional[str] = None) -> None:
+    """publish() for an AsyncSession."""
+    await db.execute(_NOTIFY, _notify_params(table, key))
+
+
+def _handle(payload: str) -> None:
+    try:
+        event = json.loads(payload)
+    except ValueError:
+        logger.warning("cache_bus: ignoring malformed payload %r", payload)
+        return
+    if event.get("origin") == WORKER_ID:
+        return  # Already applied locally right after commit
+    apply(event["table"], event.get("key"))
+
+
+def _connect(engine):
+    """Open a dedicated DBAPI connection outside the pool (held for the worker lifetime)."""
+    cargs, cparams = engine.dialect.create_connect_args(engine.url)
+    conn = engine.dialect.dbapi.connect(*cargs, **cparams)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f"LISTEN {CHANNEL}")
+    return conn
+
+
+async def listen(engine) -> None:
+    """Run forever: LISTEN on CHANNEL and apply events. Reconnects on failure."""
+    loop = asyncio.get_running_loop()
+    while True:
+        conn = None
+        try:
+            conn = await loop.run_in_executor(None, _connect, engine)
+            # Anything published while we were disconnected is lost — start clean
+            apply(ALL_TABLES)
+            ready = asyncio.Event()
+            loop.add_reader(conn.fileno(), ready.set)
+            try:
+                while True:
+                    await ready.wait()
+                    ready.clear()
+                    conn.poll()
+                    while conn.notifies:
+                        _handle(conn.notifies.pop(0).payload)
+            finally:
+                loop.remove_reader(conn.fileno())
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("cache_bus listener lost its connection; retrying in %ss", RECONNECT_DELAY_SECONDS)
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+        await asyncio.sleep(RECONNECT_DELAY_SECONDS)
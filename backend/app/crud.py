@@ -1,10 +1,13 @@
+import base64
+import json
+from datetime import datetime
 from typing import Callable, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import asc, desc
+from sqlalchemy import and_, asc, case, desc, func, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from . import models, schemas
-from passlib.context import CryptContext
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from .cache import cached_call, cached_query
+from . import cache_bus, passwords
 
 # Fields that may contain user-authored HTML and need sanitization
 _HTML_FIELDS = frozenset({"content", "description", "bio", "excerpt", "body"})
@@ -18,20 +21,123 @@ def _sanitize_data(data: dict, sanitize_fn: Optional[Callable] = None) -> dict:
             data[key] = sanitize_fn(data[key])
     return data
 
-def _apply_sort(query, model, sort_by: str, order: str):
-    """Apply safe column sorting — ignores invalid column names."""
-    col = getattr(model, sort_by, None)
+def _commit(db: Session, *tables: str, key: Optional[str] = None):
+    """Commit, then evict cached reads of `tables` on this and every other worker."""
+    for table in tables:
+        cache_bus.publish(db, table, key)
+    db.commit()
+    for table in tables:
+        cache_bus.apply(table, key)
+
+# Column each list endpoint sorts by when the client does not pass sort_by
+_DEFAULT_SORT = {
+    models.Page: "created_at",
+    models.Service: "sort_order",
+    models.BlogPost: "created_at",
+    models.JobListing: "created_at",
+    models.Testimonial: "sort_order",
+    models.TeamMember: "sort_order",
+    models.GalleryItem: "sort_order",
+    models.ContentBlock: "sort_order",
+    models.JobApplication: "created_at",
+    models.ContactMessage: "submitted_at",
+}
+
+class InvalidCursor(ValueError):
+    """Raised for a pagination cursor that is malformed or was issued for another sort."""
+
+def _sort_column(model, sort_by: Optional[str]):
+    """Resolve sort_by to a column — ignores invalid column names."""
+    col = getattr(model, sort_by or _DEFAULT_SORT.get(model, "created_at"), None)
     if col is None:
         col = getattr(model, "created_at", None)
-    if col is not None:
-        query = query.order_by(desc(col) if order == "desc" else asc(col))
+    return col
+
+def _apply_sort(query, model, sort_by: Optional[str], order: str, cursor: Optional[str] = None):
+    """
+    Apply safe column sorting with `id` as a tiebreaker, then seek past `cursor`.
+
+    Keyset pagination: instead of OFFSET, the cursor carries the (sort value, id)
+    of the last row served and the next page starts strictly after it, so deep
+    pages cost the same as the first one. Postgres sorts NULLs last in ASC and
+    first in DESC, which the seek conditions mirror.
+    """
+    col = _sort_column(model, sort_by)
+    if col is None:
+        return query
+    descending = order == "desc"
+    direction = desc if descending else asc
+    query = query.order_by(direction(col), direction(model.id))
+    if cursor:
+        value, last_id = _decode_cursor(cursor, col, descending)
+        if value is None:
+            seek = and_(col.is_(None), model.id < last_id if descending else model.id > last_id)
+            query = query.where(or_(seek, col.is_not(None)) if descending else seek)
+        elif descending:
+            query = query.where(tuple_(col, model.id) < tuple_(value, last_id))
+        else:
+            query = query.where(or_(tuple_(col, model.id) > tuple_(value, last_id), col.is_(None)))
     return query
 
+def _decode_cursor(cursor: str, col, descending: bool):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        value, last_id = payload["v"], payload["id"]
+        if payload.get("t") == "dt":
+            value = datetime.fromisoformat(value)
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor("Malformed pagination cursor")
+    if payload.get("k") != col.key or payload.get("d") != descending:
+        raise InvalidCursor("Pagination cursor does not match the requested sort")
+    return value, last_id
+
+def next_cursor(rows, model, sort_by: Optional[str], order: str, limit: int) -> Optional[str]:
+    """Opaque cursor for the page after `rows`, or None when this was the last page."""
+    col = _sort_column(model, sort_by)
+    if col is None or not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    value = getattr(last, col.key)
+    payload = {"k": col.key, "d": order == "desc", "id": last.id, "v": value}
+    if isinstance(value, datetime):
+        payload.update(v=value.isoformat(), t="dt")
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _page(query, skip: int, limit: int, cursor: Optional[str]):
+    """LIMIT a sorted query; `skip` only applies to offset paging (a cursor already seeks)."""
+    return query.limit(limit) if cursor else query.offset(skip).limit(limit)
+
+def get_collection_stamp(db: Session, model, **filters):
+    """
+    Return (row_count, last_modified) for the rows a list endpoint would read.
+
+    A single aggregate query used for ETag / Last-Modified checks before the
+    full rows are fetched. Falsy filters are ignored, like in the get_* functions;
+    `page_assignments` is matched with JSONB containment.
+    """
+    key, stmt = collection_stamp_query(model, **filters)
+    return cached_call(key, [model.__tablename__], lambda: tuple(db.execute(stmt).one()))
+
+def collection_stamp_query(model, **filters):
+    """Return (cache key, aggregate statement) for get_collection_stamp."""
+    filters = {name: value for name, value in filters.items() if value}
+    stmt = select(
+        func.count(),
+        func.max(func.coalesce(model.updated_at, model.created_at)),
+    ).select_from(model)
+    for name, value in filters.items():
+        col = getattr(model, name)
+        stmt = stmt.where(col.contains([value]) if name == "page_assignments" else col == value)
+    key = ("get_collection_stamp", model.__tablename__, tuple(sorted(filters.items())))
+    return key, stmt
+
+# Blocking bcrypt — request paths use the async passwords.hash_password / verify_password
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return passwords.hash_sync(password)
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return passwords.verify_sync(plain_password, hashed_password)
 
 # --- Users ---
 def get_user_by_email(db: Session, email: str):
@@ -40,53 +146,6 @@ def get_user_by_email(db: Session, email: str):
 def get_user_by_id(db: Session, user_id: str):
     return db.query(models.User).filter(models.User.id == user_id).first()
 
-def authenticate_user(db: Session, email: str, password: str):
-    """
-    Verify email/password and return user if valid.
-    Tracks failed attempts and enforces account lockout.
-    Returns:
-        user  — on success (resets counter)
-        None  — wrong credentials (increments counter)
-    Raises:
-        ValueError — account is locked (message contains remaining minutes)
-    """
-    from datetime import datetime, timezone, timedelta
-    from .models import MAX_FAILED_ATTEMPTS, LOCKOUT_MINUTES
-
-    user = get_user_by_email(db, email)
-    if not user:
-        return None  # Don't reveal whether email exists
-
-    # ── Check lockout ─────────────────────────────────────────────────────
-    now = datetime.now(timezone.utc)
-    if user.locked_until and user.locked_until > now:
-        remaining = (user.locked_until - now).total_seconds()
-        minutes_left = max(1, int(remaining // 60) + 1)
-        raise ValueError(
-            f"Account locked due to too many failed attempts. "
-            f"Try again in {minutes_left} minute{'s' if minutes_left != 1 else ''}."
-        )
-
-    # ── Verify password ───────────────────────────────────────────────────
-    if not verify_password(password, user.hashed_password):
-        user.failed_login_attempts = (user.failed_login_attempts or 0) + 1
-        if user.failed_login_attempts >= MAX_FAILED_ATTEMPTS:
-            user.locked_until = now + timedelta(minutes=LOCKOUT_MINUTES)
-            db.commit()
-            raise ValueError(
-                f"Account locked after {MAX_FAILED_ATTEMPTS} failed attempts. "
-                f"Try again in {LOCKOUT_MINUTES} minutes."
-            )
-        remaining_attempts = MAX_FAILED_ATTEMPTS - user.failed_login_attempts
-        db.commit()
-        return None  # Caller shows generic "invalid credentials" message
-
-    # ── Success — reset counters ──────────────────────────────────────────
-    user.failed_login_attempts = 0
-    user.locked_until = None
-    db.commit()
-    return user
-
 def create_user(db: Session, user: schemas.UserCreate):
     hashed_password = get_password_hash(user.password)
     db_user = models.User(
@@ -96,7 +155,8 @@ def create_user(db: Session, user: schemas.UserCreate):
         role=user.role
     )
     db.add(db_user)
-    db.commit()
+    db.flush()  # Assigns the id, so the event names this user instead of dropping every cached identity
+    _commit(db, "users", key=db_user.id)
     db.refresh(db_user)
     return db_user
 
@@ -107,7 +167,7 @@ def update_user_role(db: Session, user_id: str, role: str):
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
     if db_user:
         db_user.role = role
-        db.commit()
+        _commit(db, "users", key=user_id)
         db.refresh(db_user)
     return db_user
 
@@ -121,7 +181,7 @@ def update_user(db: Session, user_id: str, data: schemas.UserUpdate):
         db_user.avatar_url = data.avatar_url
     if data.role is not None:
         db_user.role = data.role
-    db.commit()
+    _commit(db, "users", key=user_id)
     db.refresh(db_user)
     return db_user
 
@@ -130,24 +190,28 @@ def delete_user(db: Session, user_id: str) -> bool:
     if db_user is None:
         return False
     db.delete(db_user)
-    db.commit()
+    _commit(db, "users", key=user_id)
     return True
 
 
 # --- Pages ---
-def get_pages(db: Session, skip: int = 0, limit: int = 100, status: str = None, slug: str = None, sort_by: str = None, order: str = "asc"):
-    query = db.query(models.Page)
+@cached_query(schemas.Page, "pages")
+def get_pages(db: Session, skip: int = 0, limit: int = 100, status: str = None, slug: str = None, sort_by: str = None, order: str = "asc", cursor: str = None):
+    stmt = select_pages(status=status, slug=slug, sort_by=sort_by, order=order, cursor=cursor)
+    return db.scalars(_page(stmt, skip, limit, cursor)).all()
+
+def select_pages(status: str = None, slug: str = None, sort_by: str = None, order: str = "asc", cursor: str = None):
+    stmt = select(models.Page)
     if status:
-        query = query.filter(models.Page.status == status)
+        stmt = stmt.where(models.Page.status == status)
     if slug:
-        query = query.filter(models.Page.slug == slug)
-    query = _apply_sort(query, models.Page, sort_by or "created_at", order)
-    return query.offset(skip).limit(limit).all()
+        stmt = stmt.where(models.Page.slug == slug)
+    return _apply_sort(stmt, models.Page, sort_by, order, cursor)
 
 def create_page(db: Session, page: schemas.PageCreate, sanitize_fn: Optional[Callable] = None):
     db_page = models.Page(**_sanitize_data(page.model_dump(), sanitize_fn))
     db.add(db_page)
-    db.commit()
+    _commit(db, "pages")
     db.refresh(db_page)
     return db_page
 
@@ -157,7 +221,7 @@ def update_page(db: Session, page_id: str, page: schemas.PageUpdate, sanitize_fn
         update_data = _sanitize_data(page.model_dump(exclude_unset=True), sanitize_fn)
         for key, value in update_data.items():
             setattr(db_page, key, value)
-        db.commit()
+        _commit(db, "pages", key=db_page.id)
         db.refresh(db_page)
     return db_page
 
@@ -165,21 +229,25 @@ def delete_page(db: Session, page_id: str):
     db_page = db.query(models.Page).filter(models.Page.id == page_id).first()
     if db_page:
         db.delete(db_page)
-        db.commit()
+        _commit(db, "pages", key=db_page.id)
     return db_page
 
 # --- Services ---
-def get_services(db: Session, skip: int = 0, limit: int = 100, slug: str = None, sort_by: str = None, order: str = "asc"):
-    query = db.query(models.Service)
+@cached_query(schemas.Service, "services")
+def get_services(db: Session, skip: int = 0, limit: int = 100, slug: str = None, sort_by: str = None, order: str = "asc", cursor: str = None):
+    stmt = select_services(slug=slug, sort_by=sort_by, order=order, cursor=cursor)
+    return db.scalars(_page(stmt, skip, limit, cursor)).all()
+
+def select_services(slug: str = None, sort_by: str = None, order: str = "asc", cursor: str = None):
+    stmt = select(models.Service)
     if slug:
-        query = query.filter(models.Service.slug == slug)
-    query = _apply_sort(query, models.Service, sort_by or "sort_order", order)
-    return query.offset(skip).limit(limit).all()
+        stmt = stmt.where(models.Service.slug == slug)
+    return _apply_sort(stmt, models.Service, sort_by, order, cursor)
 
 def create_service(db: Session, service: schemas.ServiceCreate, sanitize_fn: Optional[Callable] = None):
     db_service = models.Service(**_sanitize_data(service.model_dump(), sanitize_fn))
     db.add(db_service)
-    db.commit()
+    _commit(db, "services")
     db.refresh(db_service)
     return db_service
 
@@ -189,7 +257,7 @@ def update_service(db: Session, service_id: str, service: schemas.ServiceUpdate,
         update_data = _sanitize_data(service.model_dump(exclude_unset=True), sanitize_fn)
         for key, value in update_data.items():
             setattr(db_service, key, value)
-        db.commit()
+        _commit(db, "services", key=db_service.id)
         db.refresh(db_service)
     return db_service
 
@@ -197,23 +265,23 @@ def delete_service(db: Session, service_id: str):
     db_service = db.query(models.Service).filter(models.Service.id == service_id).first()
     if db_service:
         db.delete(db_service)
-        db.commit()
+        _commit(db, "services", key=db_service.id)
     return db_service
 
 # --- Blog Posts ---
-def get_blog_posts(db: Session, skip: int = 0, limit: int = 100, slug: str = None, status: str = None, sort_by: str = None, order: str = "desc"):
+def get_blog_posts(db: Session, skip: int = 0, limit: int = 100, slug: str = None, status: str = None, sort_by: str = None, order: str = "desc", cursor: str = None):
     query = db.query(models.BlogPost)
     if slug:
         query = query.filter(models.BlogPost.slug == slug)
     if status:
         query = query.filter(models.BlogPost.status == status)
-    query = _apply_sort(query, models.BlogPost, sort_by or "created_at", order)
-    return query.offset(skip).limit(limit).all()
+    query = _apply_sort(query, models.BlogPost, sort_by, order, cursor)
+    return _page(query, skip, limit, cursor).all()
 
 def create_blog_post(db: Session, post: schemas.BlogPostCreate, sanitize_fn: Optional[Callable] = None):
     db_post = models.BlogPost(**_sanitize_data(post.model_dump(), sanitize_fn))
     db.add(db_post)
-    db.commit()
+    _commit(db, "blog_posts")
     db.refresh(db_post)
     return db_post
 
@@ -223,7 +291,7 @@ def update_blog_post(db: Session, post_id: str, post: schemas.BlogPostUpdate, sa
         update_data = _sanitize_data(post.model_dump(exclude_unset=True), sanitize_fn)
         for key, value in update_data.items():
             setattr(db_post, key, value)
-        db.commit()
+        _commit(db, "blog_posts", key=db_post.id)
         db.refresh(db_post)
     return db_post
 
@@ -231,23 +299,23 @@ def delete_blog_post(db: Session, post_id: str):
     db_post = db.query(models.BlogPost).filter(models.BlogPost.id == post_id).first()
     if db_post:
         db.delete(db_post)
-        db.commit()
+        _commit(db, "blog_posts", key=db_post.id)
     return db_post
 
 # --- Job Listings ---
-def get_job_listings(db: Session, skip: int = 0, limit: int = 100, id: str = None, status: str = None, sort_by: str = None, order: str = "desc"):
+def get_job_listings(db: Session, skip: int = 0, limit: int = 100, id: str = None, status: str = None, sort_by: str = None, order: str = "desc", cursor: str = None):
     query = db.query(models.JobListing)
     if id:
         query = query.filter(models.JobListing.id == id)
     if status:
         query = query.filter(models.JobListing.status == status)
-    query = _apply_sort(query, models.JobListing, sort_by or "created_at", order)
-    return query.offset(skip).limit(limit).all()
+    query = _apply_sort(query, models.JobListing, sort_by, order, cursor)
+    return _page(query, skip, limit, cursor).all()
 
 def create_job_listing(db: Session, job: schemas.JobListingCreate, sanitize_fn: Optional[Callable] = None):
     db_job = models.JobListing(**_sanitize_data(job.model_dump(), sanitize_fn))
     db.add(db_job)
-    db.commit()
+    _commit(db, "job_listings")
     db.refresh(db_job)
     return db_job
 
@@ -257,7 +325,7 @@ def update_job_listing(db: Session, job_id: str, job: schemas.JobListingUpdate,
         update_data = _sanitize_data(job.model_dump(exclude_unset=True), sanitize_fn)
         for key, value in update_data.items():
             setattr(db_job, key, value)
-        db.commit()
+        _commit(db, "job_listings", key=db_job.id)
         db.refresh(db_job)
     return db_job
 
@@ -265,19 +333,22 @@ def delete_job_listing(db: Session, job_id: str):
     db_job = db.query(models.JobListing).filter(models.JobListing.id == job_id).first()
     if db_job:
         db.delete(db_job)
-        db.commit()
+        _commit(db, "job_listings", key=db_job.id)
     return db_job
 
 # --- Testimonials ---
-def get_testimonials(db: Session, skip: int = 0, limit: int = 100, sort_by: str = None, order: str = "asc"):
-    query = db.query(models.Testimonial)
-    query = _apply_sort(query, models.Testimonial, sort_by or "sort_order", order)
-    return query.offset(skip).limit(limit).all()
+@cached_query(schemas.Testimonial, "testimonials")
+def get_testimonials(db: Session, skip: int = 0, limit: int = 100, sort_by: str = None, order: str = "asc", cursor: str = None):
+    stmt = select_testimonials(sort_by=sort_by, order=order, cursor=cursor)
+    return db.scalars(_page(stmt, skip, limit, cursor)).all()
+
+def select_testimonials(sort_by: str = None, order: str = "asc", cursor: str = None):
+    return _apply_sort(select(models.Testimonial), models.Testimonial, sort_by, order, cursor)
 
 def create_testimonial(db: Session, testimonial: schemas.TestimonialCreate, sanitize_fn: Optional[Callable] = None):
     db_testimonial = models.Testimonial(**_sanitize_data(testimonial.model_dump(), sanitize_fn))
     db.add(db_testimonial)
-    db.commit()
+    _commit(db, "testimonials")
     db.refresh(db_testimonial)
     return db_testimonial
 
@@ -287,7 +358,7 @@ def update_testimonial(db: Session, testimonial_id: str, testimonial: schemas.Te
         update_data = _sanitize_data(testimonial.model_dump(exclude_unset=True), sanitize_fn)
         for key, value in update_data.items():
             setattr(db_testimonial, key, value)
-        db.commit()
+        _commit(db, "testimonials", key=db_testimonial.id)
         db.refresh(db_testimonial)
     return db_testimonial
 
@@ -295,7 +366,7 @@ def delete_testimonial(db: Session, testimonial_id: str):
     db_testimonial = db.query(models.Testimonial).filter(models.Testimonial.id == testimonial_id).first()
     if db_testimonial:
         db.delete(db_testimonial)
-        db.commit()
+        _commit(db, "testimonials", key=db_testimonial.id)
     return db_testimonial
 
 # --- Team Members ---
@@ -308,32 +379,31 @@ def _generate_slug(name: str) -> str:
     slug = re.sub(r'-+', '-', slug).strip('-')
     return slug
 
-def get_team_members(db: Session, skip: int = 0, limit: int = 100, sort_by: str = None, order: str = "asc"):
-    query = db.query(models.TeamMember)
-    query = _apply_sort(query, models.TeamMember, sort_by or "sort_order", order)
-    return query.offset(skip).limit(limit).all()
+def _select_by_id_or_slug(model, ident: str):
+    """One row whose id or slug is `ident`; both columns are unique-indexed, and an id match sorts first."""
+    return (
+        select(model)
+        .where(or_(model.id == ident, model.slug == ident))
+        .order_by(case((model.id == ident, 0), else_=1))
+        .limit(1)
+    )
+
+@cached_query(schemas.TeamMember, "team_members")
+def get_team_members(db: Session, skip: int = 0, limit: int = 100, sort_by: str = None, order: str = "asc", cursor: str = None):
+    stmt = select_team_members(sort_by=sort_by, order=order, cursor=cursor)
+    return db.scalars(_page(stmt, skip, limit, cursor)).all()
+
+def select_team_members(sort_by: str = None, order: str = "asc", cursor: str = None):
+    return _apply_sort(select(models.TeamMember), models.TeamMember, sort_by, order, cursor)
 
 def get_team_member(db: Session, member_id: str):
-    """Get a single team member by ID, slug, or name-derived slug."""
-    # Try by exact ID
-    member = db.query(models.TeamMember).filter(models.TeamMember.id == member_id).first()
-    if member:
-        return member
-    # Try by stored slug
-    member = db.query(models.TeamMember).filter(models.TeamMember.slug == member_id).first()
-    if member:
-        return member
-    # Fallback: match by generating slug from each member's name
-    # This handles existing records that don't have a slug column populated yet
-    all_members = db.query(models.TeamMember).all()
-    for m in all_members:
-        if m.name and _generate_slug(m.name) == member_id:
-            # Backfill the slug so future lookups are faster
-            m.slug = _generate_slug(m.name)
-            db.commit()
-            db.refresh(m)
-            return m
-    return None
+    """
+    Get a single team member by ID or slug in one indexed lookup (an ID match wins).
+
+    Slugs are backfilled by migrate.py, so there is no name-derived fallback
+    scan here and a GET never writes.
+    """
+    return db.scalars(_select_by_id_or_slug(models.TeamMember, member_id)).first()
 
 def create_team_member(db: Session, member: schemas.TeamMemberCreate, sanitize_fn: Optional[Callable] = None, serialize_fn: Optional[Callable] = None):
     data = _sanitize_data(member.model_dump(), sanitize_fn)
@@ -344,7 +414,7 @@ def create_team_member(db: Session, member: schemas.TeamMemberCreate, sanitize_f
         data = serialize_fn(data)
     db_member = models.TeamMember(**data)
     db.add(db_member)
-    db.commit()
+    _commit(db, "team_members")
     db.refresh(db_member)
     return db_member
 
@@ -359,7 +429,7 @@ def update_team_member(db: Session, member_id: str, member: schemas.TeamMemberUp
             update_data = serialize_fn(update_data)
         for key, value in update_data.items():
             setattr(db_member, key, value)
-        db.commit()
+        _commit(db, "team_members", key=db_member.id)
         db.refresh(db_member)
     return db_member
 
@@ -367,24 +437,25 @@ def delete_team_member(db: Session, member_id: str):
     db_member = db.query(models.TeamMember).filter(models.TeamMember.id == member_id).first()
     if db_member:
         db.delete(db_member)
-        db.commit()
+        _commit(db, "team_members", key=db_member.id)
     return db_member
 
 # --- Gallery Items ---
-def get_gallery_items(db: Session, skip: int = 0, limit: int = 200, status: str = None, category: str = None, sort_by: str = None, order: str = "asc"):
-    query = db.query(models.GalleryItem)
+@cached_query(schemas.GalleryItem, "gallery_items")
+def get_gallery_items(db: Session, skip: int = 0, limit: int = 200, status: str = None, category: str = None, sort_by: str = None, order: str = "asc", cursor: str = None):
+    stmt = select_gallery_items(status=status, category=category, sort_by=sort_by, order=order, cursor=cursor)
+    return db.scalars(_page(stmt, skip, limit, cursor)).all()
+
+def select_gallery_items(status: str = None, category: str = None, sort_by: str = None, order: str = "asc", cursor: str = None):
+    stmt = select(models.GalleryItem)
     if status:
-        query = query.filter(models.GalleryItem.status == status)
+        stmt = stmt.where(models.GalleryItem.status == status)
     if category:
-        query = query.filter(models.GalleryItem.category == category)
-    query = _apply_sort(query, models.GalleryItem, sort_by or "sort_order", order)
-    return query.offset(skip).limit(limit).all()
+        stmt = stmt.where(models.GalleryItem.category == category)
+    return _apply_sort(stmt, models.GalleryItem, sort_by, order, cursor)
 
 def get_gallery_item(db: Session, item_id: str):
-    item = db.query(models.GalleryItem).filter(models.GalleryItem.id == item_id).first()
-    if item:
-        return item
-    return db.query(models.GalleryItem).filter(models.GalleryItem.slug == item_id).first()
+    return db.scalars(_select_by_id_or_slug(models.GalleryItem, item_id)).first()
 
 def create_gallery_item(db: Session, item: schemas.GalleryItemCreate, sanitize_fn: Optional[Callable] = None):
     data = _sanitize_data(item.model_dump(), sanitize_fn)
@@ -392,7 +463,7 @@ def create_gallery_item(db: Session, item: schemas.GalleryItemCreate, sanitize_f
         data['slug'] = _generate_slug(data['title'])
     db_item = models.GalleryItem(**data)
     db.add(db_item)
-    db.commit()
+    _commit(db, "gallery_items")
     db.refresh(db_item)
     return db_item
 
@@ -404,7 +475,7 @@ def update_gallery_item(db: Session, item_id: str, item: schemas.GalleryItemUpda
             update_data['slug'] = _generate_slug(update_data['title'])
         for key, value in update_data.items():
             setattr(db_item, key, value)
-        db.commit()
+        _commit(db, "gallery_items", key=db_item.id)
         db.refresh(db_item)
     return db_item
 
@@ -412,36 +483,57 @@ def delete_gallery_item(db: Session, item_id: str):
     db_item = db.query(models.GalleryItem).filter(models.GalleryItem.id == item_id).first()
     if db_item:
         db.delete(db_item)
-        db.commit()
+        _commit(db, "gallery_items", key=db_item.id)
     return db_item
 
 # --- Settings ---
+@cached_query(schemas.Setting, "settings")
 def get_settings(db: Session):
-    return db.query(models.Setting).all()
+    return db.scalars(select(models.Setting)).all()
 
 def update_settings_bulk(db: Session, settings: list[schemas.SettingBase]):
-    for setting in settings:
-        db_setting = db.query(models.Setting).filter(models.Setting.key == setting.key).first()
-        if db_setting:
-            db_setting.value = setting.value
-        else:
-            db_setting = models.Setting(key=setting.key, value=setting.value)
-            db.add(db_setting)
-    db.commit()
-    return get_settings(db)
+    """
+    Upsert every key in one INSERT ... ON CONFLICT DO UPDATE ... RETURNING.
+
+    Keys whose value is unchanged are filtered out by the conflict WHERE
+    clause, so only inserted or changed rows come back — and nothing is
+    committed or broadcast when the save was a no-op.
+    """
+    # One row per key (last wins) — ON CONFLICT cannot touch the same row twice
+    values = {s.key: s.value for s in settings}
+    if not values:
+        return []
+    stmt = pg_insert(models.Setting).values([{"key": k, "value": v} for k, v in values.items()])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.Setting.key],
+        # Column.onupdate is not applied to ON CONFLICT updates
+        set_={"value": stmt.excluded.value, "updated_at": func.now()},
+        where=models.Setting.value.is_distinct_from(stmt.excluded.value),
+    ).returning(models.Setting)
+    changed = db.scalars(stmt, execution_options={"populate_existing": True}).all()
+    if changed:
+        # Detach first so serializing the response after commit does not reload each row
+        for row in changed:
+            db.expunge(row)
+        _commit(db, "settings")
+    return changed
 
 # --- Content Blocks ---
-def get_content_blocks(db: Session, skip: int = 0, limit: int = 100, block_type: str = None, status: str = None, page_slug: str = None, sort_by: str = None, order: str = "asc"):
-    query = db.query(models.ContentBlock)
+@cached_query(schemas.ContentBlock, "content_blocks")
+def get_content_blocks(db: Session, skip: int = 0, limit: int = 100, block_type: str = None, status: str = None, page_slug: str = None, sort_by: str = None, order: str = "asc", cursor: str = None):
+    stmt = select_content_blocks(block_type=block_type, status=status, page_slug=page_slug, sort_by=sort_by, order=order, cursor=cursor)
+    return db.scalars(_page(stmt, skip, limit, cursor)).all()
+
+def select_content_blocks(block_type: str = None, status: str = None, page_slug: str = None, sort_by: str = None, order: str = "asc", cursor: str = None):
+    stmt = select(models.ContentBlock)
     if block_type:
-        query = query.filter(models.ContentBlock.block_type == block_type)
+        stmt = stmt.where(models.ContentBlock.block_type == block_type)
     if status:
-        query = query.filter(models.ContentBlock.status == status)
+        stmt = stmt.where(models.ContentBlock.status == status)
     # Filter by page assignment (JSONB array contains)
     if page_slug:
-        query = query.filter(models.ContentBlock.page_assignments.contains([page_slug]))
-    query = _apply_sort(query, models.ContentBlock, sort_by or "sort_order", order)
-    return query.offset(skip).limit(limit).all()
+        stmt = stmt.where(models.ContentBlock.page_assignments.contains([page_slug]))
+    return _apply_sort(stmt, models.ContentBlock, sort_by, order, cursor)
 
 def get_content_block(db: Session, block_id: str):
     return db.query(models.ContentBlock).filter(models.ContentBlock.id == block_id).first()
@@ -449,7 +541,7 @@ def get_content_block(db: Session, block_id: str):
 def create_content_block(db: Session, block: schemas.ContentBlockCreate, sanitize_fn: Optional[Callable] = None):
     db_block = models.ContentBlock(**_sanitize_data(block.model_dump(), sanitize_fn))
     db.add(db_block)
-    db.commit()
+    _commit(db, "content_blocks")
     db.refresh(db_block)
     return db_block
 
@@ -459,7 +551,7 @@ def update_content_block(db: Session, block_id: str, block: schemas.ContentBlock
         update_data = _sanitize_data(block.model_dump(exclude_unset=True), sanitize_fn)
         for key, value in update_data.items():
             setattr(db_block, key, value)
-        db.commit()
+        _commit(db, "content_blocks", key=db_block.id)
         db.refresh(db_block)
     return db_block
 
@@ -467,7 +559,7 @@ def delete_content_block(db: Session, block_id: str):
     db_block = db.query(models.ContentBlock).filter(models.ContentBlock.id == block_id).first()
     if db_block:
         db.delete(db_block)
-        db.commit()
+        _commit(db, "content_blocks", key=db_block.id)
     return db_block
 
 # --- Analytics ---
@@ -495,7 +587,7 @@ def create_job_application(
         db_job = db.query(models.JobListing).filter(models.JobListing.id == data.job_id).first()
         if db_job:
             db_job.applications_count = (db_job.applications_count or 0) + 1
-    db.commit()
+    _commit(db, "job_applications", "job_listings")
     db.refresh(db_app)
     return db_app
 
@@ -506,13 +598,15 @@ def get_job_applications(
     status: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
 ):
     query = db.query(models.JobApplication)
     if job_id:
         query = query.filter(models.JobApplication.job_id == job_id)
     if status:
         query = query.filter(models.JobApplication.status == status)
-    return query.order_by(desc(models.JobApplication.created_at)).offset(skip).limit(limit).all()
+    query = _apply_sort(query, models.JobApplication, None, "desc", cursor)
+    return _page(query, skip, limit, cursor).all()
 
 
 def get_job_application(db: Session, app_id: str) -> Optional[models.JobApplication]:
@@ -528,7 +622,7 @@ def update_job_application(
     if db_app:
         for key, value in update.model_dump(exclude_unset=True).items():
             setattr(db_app, key, value)
-        db.commit()
+        _commit(db, "job_applications", key=db_app.id)
         db.refresh(db_app)
     return db_app
 
@@ -537,5 +631,57 @@ def delete_job_application(db: Session, app_id: str) -> Optional[models.JobAppli
     db_app = db.query(models.JobApplication).filter(models.JobApplication.id == app_id).first()
     if db_app:
         db.delete(db_app)
-        db.commit()
+        _commit(db, "job_applications", key=db_app.id)
     return db_app
+
+
+# --- Contact Messages ---
+def select_contact_messages(
+    is_read: Optional[bool] = None,
+    email: Optional[str] = None,
+    submitted_from: Optional[datetime] = None,
+    submitted_to: Optional[datetime] = None,
+    order: str = "desc",
+    cursor: Optional[str] = None,
+):
+    """Newest-first inbox query; every filter is optional and `submitted_to` is exclusive."""
+    stmt = select(models.ContactMessage)
+    if is_read is not None:
+        stmt = stmt.where(models.ContactMessage.is_read == is_read)
+    if email:
+        stmt = stmt.where(func.lower(models.ContactMessage.email) == email.strip().lower())
+    if submitted_from:
+        stmt = stmt.where(models.ContactMessage.submitted_at >= submitted_from)
+    if submitted_to:
+        stmt = stmt.where(models.ContactMessage.submitted_at < submitted_to)
+    return _apply_sort(stmt, models.ContactMessage, None, order, cursor)
+
+def get_contact_messages(
+    db: Session,
+    skip: int = 0,
+    limit: Optional[int] = 100,
+    is_read: Optional[bool] = None,
+    email: Optional[str] = None,
+    submitted_from: Optional[datetime] = None,
+    submitted_to: Optional[datetime] = None,
+    order: str = "desc",
+    cursor: Optional[str] = None,
+):
+    stmt = select_contact_messages(is_read, email, submitted_from, submitted_to, order, cursor)
+    # limit=None: no LIMIT (the whole inbox)
+    return db.scalars(_page(stmt, skip, limit, cursor)).all()
+
+def iter_contact_messages(db: Session, batch_size: int = 500, **filters):
+    """
+    Yield every matching message through a server-side cursor, `batch_size`
+    rows at a time, so exports never hold the whole table in memory.
+    """
+    stmt = select_contact_messages(**filters).execution_options(yield_per=batch_size)
+    for message in db.scalars(stmt):
+        yield message
+
+# --- Upload Blobs ---
+def get_blob_widths(db: Session) -> list[tuple[str, int]]:
+    """(sha256, width) of every stored image, for images.remember_widths()."""
+    Blob = models.UploadBlob
+    return [tuple(row) for row in db.execute(select(Blob.sha256, Blob.width).where(Blob.width.is_not(None)))]
@@ -0,0 +1,291 @@
+"""
+crud_async.py — AsyncSession versions of the crud functions behind the hot public routes.
+
+Statements come from the select_* builders in crud.py so both paths stay in
+sync, and the @cached_query keys match the sync functions of the same name,
+so the two paths share one query cache.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import JSON, String, Text, case, cast, delete, exists, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import cache_bus, crud, models, passwords, schemas
+from .cache import cached_call_async, cached_query
+
+
+async def _commit(db: AsyncSession, *tables: str, key: Optional[str] = None):
+    """Commit, then evict cached reads of `tables` on this and every other worker."""
+    for table in tables:
+        await cache_bus.publish_async(db, table, key)
+    await db.commit()
+    for table in tables:
+        cache_bus.apply(table, key)
+
+
+async def get_collection_stamp(db: AsyncSession, model, **filters):
+    key, stmt = crud.collection_stamp_query(model, **filters)
+
+    async def load():
+        return tuple((await db.execute(stmt)).one())
+
+    return await cached_call_async(key, [model.__tablename__], load)
+
+
+# --- Users ---
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[models.User]:
+    return await db.scalar(select(models.User).where(models.User.email == email))
+
+def _locked_message(locked_until: datetime, now: datetime) -> str:
+    minutes_left = max(1, int((locked_until - now).total_seconds() // 60) + 1)
+    return (
+        f"Account locked due to too many failed attempts. "
+        f"Try again in {minutes_left} minute{'s' if minutes_left != 1 else ''}."
+    )
+
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[models.User]:
+    """
+    Verify email/password and return user if valid.
+    Tracks failed attempts and enforces account lockout; the counter and lock
+    are updated in single UPDATE statements, so concurrent attempts can't
+    lose increments or unlock an account another attempt just locked.
+    Returns:
+        user  — on success (resets counter)
+        None  — wrong credentials (increments counter)
+    Raises:
+        ValueError — account is locked (message contains remaining minutes)
+        passwords.PasswordHasherBusy — too many logins are already being checked
+    """
+    User = models.User
+    user = await get_user_by_email(db, email)
+    if not user:
+        return None  # Don't reveal whether email exists
+
+    # ── Check lockout (before spending bcrypt time on it) ────────────────
+    now = datetime.now(timezone.utc)
+    if user.locked_until and user.locked_until > now:
+        raise ValueError(_locked_message(user.locked_until, now))
+
+    # ── Verify password ───────────────────────────────────────────────────
+    if not await passwords.verify_password(password, user.hashed_password):
+        attempts = func.coalesce(User.failed_login_attempts, 0) + 1
+        stmt = (
+            update(User).where(User.id == user.id)
+            .values(
+                failed_login_attempts=attempts,
+                locked_until=case(
+                    (attempts >= models.MAX_FAILED_ATTEMPTS, func.now() + timedelta(minutes=models.LOCKOUT_MINUTES)),
+                    else_=User.locked_until,
+                ),
+            )
+            .returning(User.failed_login_attempts)
+        )
+        failed = await db.scalar(stmt)
+        await db.commit()
+        if failed >= models.MAX_FAILED_ATTEMPTS:
+            raise ValueError(
+                f"Account locked after {models.MAX_FAILED_ATTEMPTS} failed attempts. "
+                f"Try again in {models.LOCKOUT_MINUTES} minutes."
+            )
+        return None  # Caller shows generic "invalid credentials" message
+
+    # ── Success — reset counters, unless a concurrent failure locked it ───
+    stmt = (
+        update(User)
+        .where(User.id == user.id, or_(User.locked_until.is_(None), User.locked_until <= func.now()))
+        .values(failed_login_attempts=0, locked_until=None)
+        .returning(User.locked_until)
+    )
+    reset = (await db.execute(stmt)).first()
+    await db.commit()
+    if reset is None:
+        await db.refresh(user)
+        raise ValueError(_locked_message(user.locked_until, datetime.now(timezone.utc)))
+    return user
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate) -> models.User:
+    db_user = models.User(
+        email=user.email,
+        hashed_password=await passwords.hash_password(user.password),
+        full_name=user.full_name,
+        role=user.role,
+    )
+    db.add(db_user)
+    await db.flush()  # Assigns the id, so the event names this user instead of dropping every cached identity
+    await _commit(db, "users", key=db_user.id)
+    await db.refresh(db_user)
+    return db_user
+
+# --- Pages ---
+@cached_query(schemas.Page, "pages")
+async def get_pages(db: AsyncSession, skip: int = 0, limit: int = 100, status: str = None, slug: str = None, sort_by: str = None, order: str = "asc", cursor: str = None):
+    stmt = crud.select_pages(status=status, slug=slug, sort_by=sort_by, order=order, cursor=cursor)
+    return (await db.scalars(crud._page(stmt, skip, limit, cursor))).all()
+
+# --- Services ---
+@cached_query(schemas.Service, "services")
+async def get_services(db: AsyncSession, skip: int = 0, limit: int = 100, slug: str = None, sort_by: str = None, order: str = "asc", cursor: str = None):
+    stmt = crud.select_services(slug=slug, sort_by=sort_by, order=order, cursor=cursor)
+    return (await db.scalars(crud._page(stmt, skip, limit, cursor))).all()
+
+# --- Testimonials ---
+@cached_query(schemas.Testimonial, "testimonials")
+async def get_testimonials(db: AsyncSession, skip: int = 0, limit: int = 100, sort_by: str = None, order: str = "asc", cursor: str = None):
+    stmt = crud.select_testimonials(sort_by=sort_by, order=order, cursor=cursor)
+    return (await db.scalars(crud._page(stmt, skip, limit, cursor))).all()
+
+# --- Team Members ---
+@cached_query(schemas.TeamMember, "team_members")
+async def get_team_members(db: AsyncSession, skip: int = 0, limit: int = 100, sort_by: str = None, order: str = "asc", cursor: str = None):
+    stmt = crud.select_team_members(sort_by=sort_by, order=order, cursor=cursor)
+    return (await db.scalars(crud._page(stmt, skip, limit, cursor))).all()
+
+# --- Gallery Items ---
+@cached_query(schemas.GalleryItem, "gallery_items")
+async def get_gallery_items(db: AsyncSession, skip: int = 0, limit: int = 200, status: str = None, category: str = None, sort_by: str = None, order: str = "asc", cursor: str = None):
+    stmt = crud.select_gallery_items(status=status, category=category, sort_by=sort_by, order=order, cursor=cursor)
+    return (await db.scalars(crud._page(stmt, skip, limit, cursor))).all()
+
+# --- Content Blocks ---
+@cached_query(schemas.ContentBlock, "content_blocks")
+async def get_content_blocks(db: AsyncSession, skip: int = 0, limit: int = 100, block_type: str = None, status: str = None, page_slug: str = None, sort_by: str = None, order: str = "asc", cursor: str = None):
+    stmt = crud.select_content_blocks(block_type=block_type, status=status, page_slug=page_slug, sort_by=sort_by, order=order, cursor=cursor)
+    return (await db.scalars(crud._page(stmt, skip, limit, cursor))).all()
+
+# --- Contact Messages ---
+async def create_contact_message(
+    db: AsyncSession,
+    contact: schemas.ContactCreate,
+    outbox: Optional[models.EmailOutbox] = None,
+) -> models.ContactMessage:
+    db_message = models.ContactMessage(
+        full_name=contact.full_name,
+        contact_number=contact.contact_number,
+        email=contact.email,
+        message=contact.message,
+    )
+    db.add(db_message)
+    if outbox is not None:
+        db.add(outbox)
+    await db.commit()
+    await db.refresh(db_message)
+    return db_message
+
+# --- Job Applications ---
+async def job_listing_exists(db: AsyncSession, job_id: str) -> bool:
+    stmt = select(models.JobListing.id).where(models.JobListing.id == job_id)
+    return (await db.scalar(stmt)) is not None
+
+async def create_job_application(
+    db: AsyncSession,
+    data: schemas.JobApplicationCreate,
+    resume_url: Optional[str] = None,
+    outbox: Optional[models.EmailOutbox] = None,
+) -> models.JobApplication:
+    db_app = models.JobApplication(
+        **data.model_dump(),
+        resume_url=resume_url,
+    )
+    db.add(db_app)
+    if outbox is not None:
+        db.add(outbox)
+    # Increment applications_count on the job listing
+    if data.job_id:
+        db_job = await db.get(models.JobListing, data.job_id)
+        if db_job:
+            db_job.applications_count = (db_job.applications_count or 0) + 1
+    await _commit(db, "job_applications", "job_listings")
+    await db.refresh(db_app)
+    return db_app
+
+# --- Upload Blobs ---
+async def _lock_upload_path(db: AsyncSession, path: str):
+    # Serializes writers of one logical path, including the first (no row to lock yet)
+    await db.execute(select(func.pg_advisory_xact_lock(func.hashtext("upload_paths:" + path))))
+
+async def attach_upload(
+    db: AsyncSession,
+    path: str,
+    sha256: str,
+    size: int,
+    extension: str,
+    content_type: Optional[str] = None,
+    width: Optional[int] = None,
+) -> str:
+    """Point `path` at blob `sha256`, moving a reference from its previous blob.
+
+    Returns the blob's extension. The caller commits once the file is in place:
+    until then the path lock and the blob row lock keep GC and other writers out.
+    """
+    Blob, Path = models.UploadBlob, models.UploadPath
+    await _lock_upload_path(db, path)
+    previous = await db.scalar(select(Path.sha256).where(Path.path == path))
+    if previous == sha256:
+        return await db.scalar(select(Blob.extension).where(Blob.sha256 == sha256).with_for_update())
+    stmt = pg_insert(Blob).values(
+        sha256=sha256, size=size, extension=extension, content_type=content_type, width=width, ref_count=1,
+    )
+    # Waits on a GC pass holding the row; inserts afresh if GC deleted it meanwhile
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Blob.sha256],
+        set_={"ref_count": Blob.ref_count + 1, "updated_at": func.now()},
+    ).returning(Blob.extension)
+    extension = await db.scalar(stmt)
+    stmt = pg_insert(Path).values(path=path, sha256=sha256)
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[Path.path],
+        set_={"sha256": stmt.excluded.sha256, "updated_at": func.now()},
+    ))
+    if previous is not None:
+        await _release_blob(db, previous)
+    return extension
+
+async def _release_blob(db: AsyncSession, sha256: str):
+    Blob = models.UploadBlob
+    await db.execute(
+        update(Blob).where(Blob.sha256 == sha256)
+        .values(ref_count=func.greatest(Blob.ref_count - 1, 0), updated_at=func.now())
+    )
+
+async def detach_upload(db: AsyncSession, path: str) -> Optional[str]:
+    """Forget logical `path`; returns the hash it pointed at, or None if unknown. The caller commits."""
+    Path = models.UploadPath
+    await _lock_upload_path(db, path)
+    sha256 = await db.scalar(delete(Path).where(Path.path == path).returning(Path.sha256))
+    if sha256 is not None:
+        await _release_blob(db, sha256)
+    return sha256
+
+# CMS rows store upload URLs in their text and JSON columns rather than through upload_paths
+_BLOB_REFERENCING_MODELS = (
+    models.User, models.Page, models.Service, models.BlogPost, models.JobListing, models.Testimonial,
+    models.TeamMember, models.GalleryItem, models.Setting, models.ContentBlock,
+)
+
+def _referenced_by_content(sha256):
+    """Whether any CMS row mentions the hash — blob and variant URLs both contain it."""
+    clauses = []
+    for model in _BLOB_REFERENCING_MODELS:
+        columns = [
+            col for col in model.__table__.columns if isinstance(col.type, (String, JSON)) and not col.primary_key
+        ]
+        clauses.append(exists().where(or_(*(cast(col, Text).contains(sha256) for col in columns))))
+    return or_(*clauses)
+
+async def lock_orphan_blob(db: AsyncSession, grace_seconds: float) -> Optional[models.UploadBlob]:
+    """Lock one blob unreferenced for grace_seconds; the caller deletes it and commits."""
+    Blob = models.UploadBlob
+    stmt = (
+        select(Blob)
+        .where(Blob.ref_count == 0, Blob.updated_at < func.now() - timedelta(seconds=grace_seconds))
+        .where(~_referenced_by_content(Blob.sha256))
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    return await db.scalar(stmt)
+
+async def delete_blob(db: AsyncSession, blob: models.UploadBlob):
+    await db.delete(blob)
+    await db.commit()
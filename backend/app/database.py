@@ -1,9 +1,14 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
 from dotenv import load_dotenv
 
+from .db_metrics import PoolMetrics, instrumented_pool_class, track_queries
+
 load_dotenv()
 
 # PostgreSQL connection — configured via environment variables
@@ -16,14 +21,73 @@ DATABASE_URL = os.getenv(
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+# Connection pool — sized per uvicorn worker. Keep
+# workers × engines × (DB_POOL_SIZE + DB_MAX_OVERFLOW) below Postgres max_connections.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))      # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))        # seconds; -1 = never recycle
+# "pessimistic" pings every connection on checkout (one extra round trip);
+# "optimistic" skips the ping and relies on DB_POOL_RECYCLE + disconnect handling.
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "pessimistic").lower() in ("pessimistic", "true", "1")
+
+sync_pool_metrics = PoolMetrics("sync")
+async_pool_metrics = PoolMetrics("async")
+
+
+def _pool_options(pool_base, metrics: PoolMetrics) -> dict:
+    return {
+        "poolclass": instrumented_pool_class(pool_base, metrics),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+engine = create_engine(DATABASE_URL, **_pool_options(QueuePool, sync_pool_metrics))
+sync_pool_metrics.attach(engine)
+track_queries(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def _async_url(url: str):
+    """Same database over asyncpg (which spells libpq's sslmode as ssl)."""
+    async_url = make_url(url).set(drivername="postgresql+asyncpg")
+    if "sslmode" in async_url.query:
+        query = dict(async_url.query)
+        query["ssl"] = query.pop("sslmode")
+        async_url = async_url.set(query=query)
+    return async_url
+
+
+# Async engine for the hot public routes — keeps the event loop free while
+# waiting on Postgres. Admin/CRUD routes stay on the sync engine above.
+async_engine = create_async_engine(
+    _async_url(DATABASE_URL), **_pool_options(AsyncAdaptedQueuePool, async_pool_metrics)
+)
+async_pool_metrics.attach(async_engine.sync_engine)
+track_queries(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
+
+def pool_stats() -> dict:
+    """Point-in-time metrics for both connection pools."""
+    return {
+        "sync": sync_pool_metrics.snapshot(engine.pool),
+        "async": async_pool_metrics.snapshot(async_engine.sync_engine.pool),
+    }
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,228 @@
+"""
+db_metrics.py — Connection pool instrumentation for the sync and async engines.
+
+Centralizes: PoolMetrics (checkout wait histogram, connection age histogram,
+timeout/connect counters), instrumented_pool_class(), which wraps a
+SQLAlchemy pool class so every checkout is timed, QueryStats /
+track_queries(), which add up the statements run and time spent in the
+database on behalf of the current request (flagging requests over
+QUERY_BUDGET or repeating a statement), and capture_queries() /
+assert_max_queries() for asserting an endpoint's query count in tests.
+
+Gauges (checked out, overflow, idle) are read straight from the pool when a
+snapshot is taken; only the histograms and counters are accumulated here.
+"""
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from sqlalchemy import event, exc
+
+# Upper bounds in seconds; an implicit +Inf bucket catches the rest
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+AGE_BUCKETS = (1, 10, 60, 300, 900, 1800, 3600, 4 * 3600, 24 * 3600)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> dict:
+        cumulative, running = {}, 0
+        for bound, n in zip((*self.buckets, "+Inf"), self.counts):
+            running += n
+            cumulative[str(bound)] = running
+        return {"buckets": cumulative, "sum": round(self.sum, 6), "count": self.count}
+
+
+class PoolMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self.checkout_wait = Histogram(WAIT_BUCKETS)
+        self.connection_age = Histogram(AGE_BUCKETS)
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def observe_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.checkout_wait.observe(seconds)
+
+    def attach(self, engine) -> None:
+        """Hook connect/checkout/invalidate events on a (sync) Engine."""
+
+        @event.listens_for(engine, "connect")
+        def on_connect(dbapi_conn, record):
+            record.info["created_at"] = time.monotonic()
+            with self._lock:
+                self.connects += 1
+
+        @event.listens_for(engine, "checkout")
+        def on_checkout(dbapi_conn, record, proxy):
+            created_at = record.info.get("created_at")
+            if created_at is not None:
+                with self._lock:
+                    self.connection_age.observe(time.monotonic() - created_at)
+
+        @event.listens_for(engine, "invalidate")
+        def on_invalidate(dbapi_conn, record, exception):
+            with self._lock:
+                self.invalidations += 1
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            data = {
+                "checkout_wait_seconds": self.checkout_wait.snapshot(),
+                "connection_age_seconds": self.connection_age.snapshot(),
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+            }
+        # QueuePool gauges — other pool classes (NullPool, StaticPool) lack them
+        for gauge in ("size", "checkedout", "checkedin", "overflow"):
+            fn = getattr(pool, gauge, None)
+            if callable(fn):
+                data[gauge] = fn()
+        return data
+
+
+def instrumented_pool_class(base, metrics: PoolMetrics):
+    """
+    Subclass `base` so each checkout is timed into metrics.checkout_wait.
+
+    The metrics live on the class, so they survive engine.dispose() (which
+    recreates the pool via self.__class__).
+    """
+
+    class InstrumentedPool(base):
+        _metrics = metrics
+
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            except exc.TimeoutError:
+                with self._metrics._lock:
+                    self._metrics.timeouts += 1
+                raise
+            finally:
+                self._metrics.observe_wait(time.perf_counter() - start)
+
+    InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+    return InstrumentedPool
+
+
+# ── Per-request query time ────────────────────────────────────────────────────
+# A request running more statements than this, or the same statement more than
+# QUERY_REPEAT_THRESHOLD times (the N+1 pattern), is flagged in the access log
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "10"))
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "5"))
+
+
+class QueryStats:
+    """Statements executed and seconds spent in them, for one request (or one capture_queries() block)."""
+
+    __slots__ = ("statements", "seconds", "by_statement")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+        self.by_statement: dict[str, int] = {}  # SQL text (parameters unbound) -> executions
+
+    def add(self, statement: str, seconds: float) -> None:
+        self.statements += 1
+        self.seconds += seconds
+        self.by_statement[statement] = self.by_statement.get(statement, 0) + 1
+
+    def repeated(self, threshold: int = QUERY_REPEAT_THRESHOLD) -> dict[str, int]:
+        """Statements run more than `threshold` times."""
+        return {sql: n for sql, n in self.by_statement.items() if n > threshold}
+
+    def over_budget(self, budget: int = QUERY_BUDGET) -> bool:
+        return self.statements > budget
+
+    def report(self) -> str:
+        """Every statement with its count, most frequent first — for assertion messages."""
+        lines = [f"{self.statements} statements in {self.seconds * 1000:.2f} ms"]
+        for sql, n in sorted(self.by_statement.items(), key=lambda item: -item[1]):
+            lines.append(f"  {n}× {' '.join(sql.split())[:200]}")
+        return "\n".join(lines)
+
+
+# Set by RequestMiddleware; the object is shared with the threadpool / greenlet
+# copies of the context, so sync and async routes both add to it
+current_queries: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar(
+    "current_queries", default=None
+)
+# Open capture_queries() blocks; process-wide, so they also see TestClient's app thread
+_captures: list[QueryStats] = []
+
+
+def track_queries(engine) -> None:
+    """Time every statement on a (sync) Engine into the current request's QueryStats."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started_at"].pop()
+        stats = current_queries.get()
+        if stats is not None:
+            stats.add(statement, elapsed)
+        for capture in _captures:
+            capture.add(statement, elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def on_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started_at"):
+            conn.info["query_started_at"].pop()
+
+
+@contextmanager
+def capture_queries() -> Iterator[QueryStats]:
+    """
+    Collect every statement run on a tracked engine while the block is open.
+
+        with capture_queries() as queries:
+            client.get("/api/pages")
+        assert queries.statements <= 2, queries.report()
+    """
+    stats = QueryStats()
+    _captures.append(stats)
+    try:
+        yield stats
+    finally:
+        _captures.remove(stats)
+
+
+@contextmanager
+def assert_max_queries(limit: int, repeat_threshold: int = QUERY_REPEAT_THRESHOLD) -> Iterator[QueryStats]:
+    """Fail the block if it runs more than `limit` statements or repeats one more than `repeat_threshold` times."""
+    with capture_queries() as stats:
+        yield stats
+    if stats.statements > limit:
+        raise AssertionError(f"expected at most {limit} statements, got {stats.report()}")
+    if stats.repeated(repeat_threshold):
+        raise AssertionError(f"statement repeated more than {repeat_threshold} times: {stats.report()}")
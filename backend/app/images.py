@@ -0,0 +1,186 @@
+"""
+images.py — Responsive variants of uploaded images, rendered on first request.
+
+Centralizes: srcset(), which maps a content-addressed image URL to
+{format: "<url> 320w, <url> 640w, ..."} for the response schemas, and
+ensure_variant(), which UploadStaticFiles awaits when a variant under
+uploads/variants/ is requested but not on disk yet.
+
+Variants live at uploads/variants/<aa>/<sha256>/<width>.<format>. Like the
+blob they are resized from, their bytes never change, so they are served
+immutable. Widths and formats are fixed lists, which bounds the disk cache
+per blob and keeps clients from requesting arbitrary sizes. Sources are
+never upscaled: a blob offers the listed widths below its own width plus
+one variant at its own width. Source widths are recorded in
+upload_blobs.width when stored and loaded at startup (remember_widths());
+blobs another worker stored since are measured from the file header once.
+Rendering runs in the threadpool, at most
+IMAGE_RENDER_CONCURRENCY at a time, and concurrent requests for the same
+variant share one render.
+
+Pillow is optional: without it srcset() returns None and no variants exist.
+"""
+import asyncio
+import glob
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from .uploads import public_tempfile
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:
+    Image = None
+
+logger = logging.getLogger("jdgk-api")
+
+UPLOAD_DIR = "uploads"
+VARIANT_PREFIX = "variants"
+VARIANT_WIDTHS = tuple(
+    int(w) for w in os.getenv("IMAGE_VARIANT_WIDTHS", "320,640,960,1280,1920").split(",") if w.strip()
+)
+# Listed in order of preference; formats this Pillow build cannot encode are dropped
+VARIANT_FORMATS = tuple(
+    fmt for fmt in (f.strip() for f in os.getenv("IMAGE_VARIANT_FORMATS", "avif,webp").split(","))
+    if Image is not None and fmt and features.check(fmt)
+)
+IMAGE_RENDER_CONCURRENCY = int(os.getenv("IMAGE_RENDER_CONCURRENCY", "2"))
+
+_SAVE_OPTIONS = {
+    "avif": {"quality": 60, "speed": 6},
+    "webp": {"quality": 80, "method": 4},
+}
+_RASTER_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif")
+_BLOB_URL = re.compile(r"^/uploads/blobs/[0-9a-f]{2}/([0-9a-f]{64})\.(?:jpe?g|png|webp|gif)$", re.IGNORECASE)
+_VARIANT_PATH = re.compile(r"^variants/([0-9a-f]{2})/([0-9a-f]{64})/(\d+)\.([a-z]+)$")
+
+
+def variant_url(sha256: str, width: int, fmt: str) -> str:
+    return f"/{UPLOAD_DIR}/{VARIANT_PREFIX}/{sha256[:2]}/{sha256}/{width}.{fmt}"
+
+
+def variant_dir(sha256: str) -> str:
+    return os.path.join(UPLOAD_DIR, VARIANT_PREFIX, sha256[:2], sha256)
+
+
+# ── Source widths ─────────────────────────────────────────────────────────────
+_source_widths: Dict[str, Optional[int]] = {}
+
+
+def probe_width(path: str) -> Optional[int]:
+    """Displayed width of the image at path (EXIF rotation applied), or None if Pillow can't read it."""
+    if Image is None:
+        return None
+    try:
+        with Image.open(path) as im:  # Reads the header only
+            return im.height if im.getexif().get(0x0112, 1) >= 5 else im.width
+    except Exception:
+        return None
+
+
+def remember_widths(widths: Iterable[Tuple[str, Optional[int]]]) -> None:
+    """Record (sha256, width) pairs, from upload_blobs at startup or from store()."""
+    _source_widths.update(widths)
+
+
+def source_width(sha256: str) -> Optional[int]:
+    if sha256 not in _source_widths:
+        source = _source(sha256[:2], sha256)
+        _source_widths[sha256] = probe_width(source) if source else None
+    return _source_widths[sha256]
+
+
+def variant_widths(width: int) -> Tuple[int, ...]:
+    """The variant widths a source `width` pixels wide offers: no upscaling, plus its own width."""
+    return tuple(w for w in VARIANT_WIDTHS if w < width) + (width,)
+
+
+@lru_cache(maxsize=4096)
+def srcset(url: Optional[str]) -> Optional[Dict[str, str]]:
+    """{format: srcset string} for a content-addressed raster image URL, else None."""
+    if not url or not VARIANT_FORMATS:
+        return None
+    match = _BLOB_URL.match(url)
+    if not match:
+        return None
+    sha256 = match.group(1).lower()
+    width = source_width(sha256)
+    if width is None:
+        return None
+    return {
+        fmt: ", ".join(f"{variant_url(sha256, w, fmt)} {w}w" for w in variant_widths(width))
+        for fmt in VARIANT_FORMATS
+    }
+
+
+# ── Rendering ─────────────────────────────────────────────────────────────────
+def _source(prefix: str, sha256: str) -> Optional[str]:
+    for path in glob.glob(os.path.join(UPLOAD_DIR, "blobs", prefix, sha256 + ".*")):
+        if path.lower().endswith(_RASTER_EXTENSIONS):
+            return path
+    return None
+
+
+def _resize(source: str, width: int) -> "Image.Image":
+    with Image.open(source) as im:
+        if im.getexif().get(0x0112, 1) < 5 and im.width > width:
+            # JPEG: decode at a reduced scale straight away (no-op for other formats)
+            im.draft("RGB", (width, max(1, im.height * width // im.width)))
+        im = ImageOps.exif_transpose(im)
+        has_alpha = im.mode in ("RGBA", "LA", "PA") or "transparency" in im.info
+        im = im.convert("RGBA" if has_alpha else "RGB")
+        if im.width > width:
+            im = im.resize((width, max(1, round(im.height * width / im.width))), Image.LANCZOS)
+        return im
+
+
+def render_variant(path: str) -> bool:
+    """Render uploads/<path> (variants/<aa>/<sha256>/<width>.<format>); False if it can't exist."""
+    match = _VARIANT_PATH.match(path.replace(os.sep, "/"))
+    if not match or Image is None:
+        return False
+    prefix, sha256, width, fmt = match.group(1), match.group(2), int(match.group(3)), match.group(4)
+    if fmt not in VARIANT_FORMATS or sha256[:2] != prefix:
+        return False
+    source = _source(prefix, sha256)
+    if source is None:
+        return False
+    source_px = source_width(sha256)
+    if source_px is None or width not in variant_widths(source_px):
+        return False
+    dest = os.path.join(UPLOAD_DIR, path)
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    fd, tmp_path = public_tempfile(os.path.dirname(dest), prefix=".variant-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            _resize(source, width).save(out, format=fmt.upper(), **_SAVE_OPTIONS.get(fmt, {}))
+        os.replace(tmp_path, dest)
+    except Exception as e:
+        os.unlink(tmp_path)
+        # Corrupt or oversized (decompression bomb) sources just have no variants
+        logger.warning("images: cannot render %s: %s", path, e)
+        return False
+    return True
+
+
+_rendering: Dict[str, asyncio.Future] = {}
+_render_slots = asyncio.Semaphore(IMAGE_RENDER_CONCURRENCY)
+
+
+async def _render(path: str) -> bool:
+    async with _render_slots:
+        return await run_in_threadpool(render_variant, path)
+
+
+async def ensure_variant(path: str) -> bool:
+    """Render the variant at uploads/<path> unless another request already is; True once it exists."""
+    task = _rendering.get(path)
+    if task is None:
+        task = _rendering[path] = asyncio.ensure_future(_render(path))
+        task.add_done_callback(lambda _: _rendering.pop(path, None))
+    return await asyncio.shield(task)
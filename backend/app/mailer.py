@@ -0,0 +1,264 @@
+"""
+mailer.py — Durable outbound email: queued in email_outbox, sent by a background loop.
+
+Centralizes: compose() / compose_notification() (an EmailOutbox row the
+caller adds to its own transaction, so the notification is stored atomically
+with what it reports), wake(), MailerMetrics / mailer_metrics and run(), the
+sender loop started from the app lifespan.
+
+Every uvicorn worker runs one sender. Each pass claims up to MAIL_BATCH_SIZE
+due messages with FOR UPDATE SKIP LOCKED and leases them for
+MAIL_LEASE_SECONDS (a crash mid-send only delays them), then sends the batch
+over one SMTP connection, which stays open between passes until it has been
+idle for MAIL_IDLE_DISCONNECT_SECONDS. Failed sends are retried with
+exponential backoff; after MAIL_MAX_ATTEMPTS the message is marked failed.
+The SMTP config and the site's notification recipient are read from the
+settings snapshot when a batch is sent, never when a message is queued, so
+broken mail settings cannot fail the request that queues one.
+
+Local testing works against any SMTP stand-in, e.g.
+    python -m aiosmtpd -n -l localhost:1025
+with settings smtp_host=localhost, smtp_port=1025, smtp_use_tls=false.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from email.utils import formataddr, make_msgid
+from typing import Iterable, Optional
+
+import aiosmtplib
+from fastapi_mail import ConnectionConfig
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models, settings_snapshot
+from .database import AsyncSessionLocal
+
+logger = logging.getLogger("jdgk-api")
+
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", "20"))
+MAIL_POLL_SECONDS = float(os.getenv("MAIL_POLL_SECONDS", "5"))
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", "8"))
+MAIL_RETRY_BASE_SECONDS = float(os.getenv("MAIL_RETRY_BASE_SECONDS", "30"))
+MAIL_RETRY_MAX_SECONDS = float(os.getenv("MAIL_RETRY_MAX_SECONDS", "3600"))
+MAIL_LEASE_SECONDS = float(os.getenv("MAIL_LEASE_SECONDS", "300"))
+MAIL_IDLE_DISCONNECT_SECONDS = float(os.getenv("MAIL_IDLE_DISCONNECT_SECONDS", "60"))
+
+Outbox = models.EmailOutbox
+
+
+# ── Metrics ───────────────────────────────────────────────────────────────────
+class MailerMetrics:
+    """Counters for this worker's sender; queue depth is read from the table."""
+
+    def __init__(self):
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.batches = 0
+        self.connects = 0
+        self.last_error: Optional[str] = None
+
+    async def snapshot(self, db: AsyncSession) -> dict:
+        rows = (await db.execute(
+            select(Outbox.status, func.count(), func.min(Outbox.created_at)).group_by(Outbox.status)
+        )).all()
+        by_status = {status: (count, oldest) for status, count, oldest in rows}
+        pending, oldest = by_status.get("pending", (0, None))
+        return {
+            "queue_depth": pending,
+            "oldest_pending_age_seconds": (
+                round((datetime.now(timezone.utc) - oldest).total_seconds(), 3) if oldest else None
+            ),
+            "failed_total": by_status.get("failed", (0, None))[0],
+            "worker": {
+                "sent": self.sent,
+                "retried": self.retried,
+                "failed": self.failed,
+                "batches": self.batches,
+                "smtp_connects": self.connects,
+                "last_error": self.last_error,
+            },
+        }
+
+
+mailer_metrics = MailerMetrics()
+
+
+# ── Enqueue ───────────────────────────────────────────────────────────────────
+def compose(subject: str, recipients: Iterable[str], html_body: str) -> models.EmailOutbox:
+    """Build an outbox row; add it to the session whose commit should send it."""
+    return Outbox(subject=subject, recipients=list(recipients), html_body=html_body)
+
+
+def compose_notification(subject: str, html_body: str) -> models.EmailOutbox:
+    """compose() for the site's notification recipient (smtp_recipient_email), looked up when sent."""
+    return compose(subject, [], html_body)
+
+
+_wake: Optional[asyncio.Event] = None
+
+
+def wake() -> None:
+    """Nudge this worker's sender after a commit (other workers pick it up on their next poll)."""
+    if _wake is not None:
+        _wake.set()
+
+
+# ── Sending ───────────────────────────────────────────────────────────────────
+def _backoff_seconds(attempts: int) -> float:
+    return min(MAIL_RETRY_MAX_SECONDS, MAIL_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0))
+
+
+def _build_message(row: models.EmailOutbox, config: ConnectionConfig, notify: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg["Subject"] = row.subject
+    msg["From"] = formataddr((config.MAIL_FROM_NAME or "", config.MAIL_FROM))
+    msg["To"] = ", ".join(row.recipients or [notify])
+    # Explicit domain — make_msgid() otherwise calls the blocking socket.getfqdn()
+    msg["Message-ID"] = make_msgid(domain=config.MAIL_FROM.rsplit("@", 1)[-1])
+    msg.set_content(row.html_body, subtype="html")
+    return msg
+
+
+class _Connection:
+    """One SMTP connection reused across messages and passes; reopened when settings change."""
+
+    def __init__(self):
+        self.smtp: Optional[aiosmtplib.SMTP] = None
+        self.config: Optional[ConnectionConfig] = None
+        self.last_used = 0.0
+
+    async def get(self, config: ConnectionConfig) -> aiosmtplib.SMTP:
+        if self.smtp is not None and (self.config is not config or not self.smtp.is_connected):
+            await self.close()
+        if self.smtp is None:
+            smtp = aiosmtplib.SMTP(
+                hostname=config.MAIL_SERVER,
+                port=config.MAIL_PORT,
+                use_tls=config.MAIL_SSL_TLS,
+                start_tls=config.MAIL_STARTTLS and not config.MAIL_SSL_TLS,
+                validate_certs=config.VALIDATE_CERTS,
+                timeout=config.TIMEOUT,
+            )
+            await smtp.connect()
+            if config.USE_CREDENTIALS and smtp.supports_extension("auth"):
+                await smtp.login(config.MAIL_USERNAME, config.MAIL_PASSWORD)
+            self.smtp, self.config = smtp, config
+            mailer_metrics.connects += 1
+        self.last_used = time.monotonic()
+        return self.smtp
+
+    def idle(self) -> bool:
+        return self.smtp is not None and time.monotonic() - self.last_used > MAIL_IDLE_DISCONNECT_SECONDS
+
+    async def close(self) -> None:
+        smtp, self.smtp = self.smtp, None
+        if smtp is None:
+            return
+        try:
+            await smtp.quit()
+        except Exception:
+            smtp.close()
+
+
+async def _claim(db: AsyncSession) -> list[models.EmailOutbox]:
+    """Lease due pending messages; other workers skip the locked rows."""
+    due = (
+        select(Outbox.id)
+        .where(Outbox.status == "pending", Outbox.next_attempt_at <= func.now())
+        .order_by(Outbox.next_attempt_at)
+        .limit(MAIL_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(Outbox)
+        .where(Outbox.id.in_(due.scalar_subquery()))
+        .values(attempts=Outbox.attempts + 1, next_attempt_at=func.now() + timedelta(seconds=MAIL_LEASE_SECONDS))
+        .returning(Outbox)
+    )
+    rows = (await db.scalars(
+        stmt, execution_options={"synchronize_session": False, "populate_existing": True},
+    )).all()
+    await db.commit()
+    return rows
+
+
+async def _record_failure(db: AsyncSession, row: models.EmailOutbox, error: Exception) -> None:
+    mailer_metrics.last_error = f"{type(error).__name__}: {error}"
+    values = {"last_error": mailer_metrics.last_error[:2000]}
+    if row.attempts >= MAIL_MAX_ATTEMPTS:
+        values["status"] = "failed"
+        mailer_metrics.failed += 1
+        logger.error("mailer: giving up on %s after %d attempts: %s", row.id, row.attempts, error)
+    else:
+        values["next_attempt_at"] = func.now() + timedelta(seconds=_backoff_seconds(row.attempts))
+        mailer_metrics.retried += 1
+        logger.warning("mailer: send of %s failed (attempt %d), retrying: %s", row.id, row.attempts, error)
+    await db.execute(update(Outbox).where(Outbox.id == row.id).values(**values))
+
+
+async def _send_due(conn: _Connection) -> int:
+    """One pass: claim a batch and send it. Returns the number of messages claimed."""
+    async with AsyncSessionLocal() as db:
+        # Before claiming: if this fails no rows are leased, so none are stuck without backoff
+        snapshot = await settings_snapshot.current_async(db)
+        config = snapshot.mail_config
+        rows = await _claim(db)
+        if not rows:
+            return 0
+        mailer_metrics.batches += 1
+        for i, row in enumerate(rows):
+            try:
+                smtp = await conn.get(config)
+            except Exception as e:
+                # Server unreachable — defer the rest of the batch instead of retrying each
+                await conn.close()
+                for pending in rows[i:]:
+                    await _record_failure(db, pending, e)
+                break
+            try:
+                if not config.SUPPRESS_SEND:
+                    await smtp.send_message(_build_message(row, config, snapshot.recipient))
+            except Exception as e:
+                if not smtp.is_connected:
+                    await conn.close()
+                await _record_failure(db, row, e)
+                continue
+            await db.execute(
+                update(Outbox).where(Outbox.id == row.id)
+                .values(status="sent", sent_at=func.now(), last_error=None)
+            )
+            mailer_metrics.sent += 1
+        await db.commit()
+        return len(rows)
+
+
+async def run() -> None:
+    """Run forever: send due mail, then sleep until woken or MAIL_POLL_SECONDS pass."""
+    global _wake
+    _wake = asyncio.Event()
+    conn = _Connection()
+    try:
+        while True:
+            try:
+                claimed = await _send_due(conn)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("mailer: send pass failed")
+                claimed = 0
+            if claimed >= MAIL_BATCH_SIZE:
+                continue  # More may be due — keep draining
+            if conn.idle():
+                await conn.close()
+            try:
+                await asyncio.wait_for(_wake.wait(), MAIL_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            _wake.clear()
+    finally:
+        await conn.close()
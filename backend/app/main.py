@@ -3,29 +3,32 @@ main.py — Application factory for JDGK Business Solutions API.
 
 Responsibilities:
   - App creation and configuration
-  - Middleware registration (CORS, request logging, rate limiting)
-  - Startup: DB table creation + seed
+  - Middleware registration (CORS, security headers + access log, body size limits, rate limiting)
+  - Startup: DB table creation + seed, cross-worker cache invalidation listener
   - Static file mount for uploads
   - Domain router registration
 
 All business logic lives in app/routers/ and app/crud.py.
 """
+import asyncio
 import logging
 import os
-import time
 from contextlib import asynccontextmanager
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, PlainTextResponse
 from slowapi.errors import RateLimitExceeded
 from slowapi import _rate_limit_exceeded_handler
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .database import SessionLocal, engine
-from . import models, seed
-from .main_helpers import limiter
-from .routers import all_routers
+from .database import SessionLocal, async_engine, engine, get_async_db
+from . import access_log, cache_bus, crud, images, mailer, metrics, models, passwords, seed, uploads
+from .main_helpers import NEXT_CURSOR_HEADER, limiter
+from .middleware import BodySizeLimitMiddleware, RequestMiddleware
+from .routers import all_routers, job_applications, storage
+from .static_files import UploadStaticFiles
 
 # ── Environment ───────────────────────────────────────────────────────────────
 # Explicitly look for .env in the backend directory to avoid root collision
@@ -39,14 +42,32 @@ logger = logging.getLogger("jdgk-api")
 # ── Database bootstrap ────────────────────────────────────────────────────────
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Run DB table creation and seed on startup."""
+    """Run DB table creation and seed on startup; listen for cache invalidations and send queued mail."""
+    access_log.start()
     models.Base.metadata.create_all(bind=engine)
     db = SessionLocal()
     try:
         seed.init_db(db)
+        images.remember_widths(crud.get_blob_widths(db))
     finally:
         db.close()
+    passwords.start()
+    background = [
+        asyncio.create_task(cache_bus.listen(engine)),
+        asyncio.create_task(mailer.run()),
+        asyncio.create_task(metrics.run()),
+    ]
     yield  # App runs here
+    for task in background:
+        task.cancel()
+    for task in background:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    passwords.shutdown()
+    await async_engine.dispose()
+    access_log.stop()
 
 
 # ── Uploads directory ─────────────────────────────────────────────────────────
@@ -59,7 +80,31 @@ app = FastAPI(title="JDGK Business Solutions API", lifespan=lifespan)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
+
+@app.exception_handler(crud.InvalidCursor)
+async def invalid_cursor_handler(request: Request, exc: crud.InvalidCursor):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
+@app.exception_handler(passwords.PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: passwords.PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many sign-in attempts are being processed. Please retry."},
+        headers={"Retry-After": str(passwords.PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+    )
+
+app.mount("/uploads", UploadStaticFiles(directory=UPLOAD_DIR), name="uploads")
+
+# ── Request body limits (before multipart parsing spools the body) ────────────
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    limits={
+        ("POST", "/api/job_applications"): job_applications.MAX_RESUME_BYTES + uploads.FORM_OVERHEAD_BYTES,
+        # Resumable PUTs already stop at UPLOAD_MAX_BYTES while streaming
+        ("POST", "/api/storage/upload"): storage.UPLOAD_MAX_BYTES + uploads.FORM_OVERHEAD_BYTES,
+    },
+)
 
 # ── CORS ──────────────────────────────────────────────────────────────────────
 ALLOWED_ORIGINS = os.getenv(
@@ -72,41 +117,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Browsers hide non-safelisted response headers from JS unless exposed
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
 
-# ── Security headers middleware (XSS / clickjacking / MIME-sniff protection) ──
-@app.middleware("http")
-async def add_security_headers(request: Request, call_next):
-    response = await call_next(request)
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-    response.headers["Permissions-Policy"] = "camera=(), microphone=(), geolocation=()"
-    response.headers["Strict-Transport-Security"] = (
-        "max-age=31536000; includeSubDomains; preload"
-    )
-    response.headers["Content-Security-Policy"] = (
-        "default-src 'self'; "
-        "script-src 'self' 'unsafe-inline' https://www.googletagmanager.com https://www.google-analytics.com https://connect.facebook.net; "
-        "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
-        "font-src 'self' https://fonts.gstatic.com; "
-        "img-src 'self' data: blob: https:; "
-        "connect-src 'self' https://www.google-analytics.com https://region1.google-analytics.com; "
-        "frame-src 'self' https://www.googletagmanager.com; "
-        "object-src 'none'; "
-        "base-uri 'self';"
-    )
-    return response
-
-# ── Request logging middleware ────────────────────────────────────────────────
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start = time.time()
-    response = await call_next(request)
-    duration_ms = round((time.time() - start) * 1000)
-    logger.info(f"{request.method} {request.url.path} → {response.status_code} ({duration_ms}ms)")
-    return response
+# ── Security headers + access log (raw ASGI, outermost) ──────────────────────
+app.add_middleware(RequestMiddleware)
 
 # ── Register all domain routers ───────────────────────────────────────────────
 for router in all_routers:
@@ -122,3 +138,9 @@ def read_root():
 @app.get("/api/version")
 def api_version():
     return {"commit": BUILD_COMMIT, "status": "ok"}
+
+# ── Prometheus metrics ────────────────────────────────────────────────────────
+# Outside /api, so nginx does not expose it; scrape the backend port directly
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics(db: AsyncSession = Depends(get_async_db)):
+    return PlainTextResponse(await metrics.render(db), media_type="text/plain; version=0.0.4")
@@ -1,18 +1,27 @@
 """
 main_helpers.py — Shared utilities used across routers.
 
-Centralizes: rate-limiter, HTML sanitization, mail config builder.
+Centralizes: rate-limiter, HTML sanitization, conditional GET, keyset cursor
+header, mail config builder.
 Imported by main.py and all router modules.
 """
+import hashlib
 import os
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
 import bleach
+from fastapi import Request, Response
 from sqlalchemy.orm import Session
-from slowapi import Limiter
 from slowapi.util import get_remote_address
 from fastapi_mail import ConnectionConfig
 
+from .rate_limit import SharedLimiter
+
 # ── Rate limiter (shared instance) ───────────────────────────────────────────
-limiter = Limiter(key_func=get_remote_address)
+# Counts are shared across workers (see rate_limit.py)
+limiter = SharedLimiter(key_func=get_remote_address)
 
 # ── HTML sanitization ─────────────────────────────────────────────────────────
 ALLOWED_TAGS = list(bleach.ALLOWED_TAGS) + [
@@ -34,24 +43,85 @@ def sanitize_html(text: str | None) -> str | None:
     return bleach.clean(text, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRS, strip=True)
 
 
+# ── Conditional GET (ETag / Last-Modified) ─────────────────────────────────────
+def conditional_get(
+    request: Request,
+    response: Response,
+    stamp: tuple[int, Optional[datetime]],
+) -> Optional[Response]:
+    """
+    Set validators on `response` from a crud.get_collection_stamp() result.
+
+    Returns a bodiless 304 Response when the client's If-None-Match /
+    If-Modified-Since shows its copy is current, otherwise None (caller then
+    fetches and returns the rows as usual).
+    """
+    count, last_modified = stamp
+    params = sorted(request.query_params.multi_items())
+    digest = hashlib.sha1(
+        repr((request.url.path, params, count, last_modified and last_modified.isoformat())).encode()
+    ).hexdigest()
+    headers = {
+        "ETag": f'W/"{digest}"',
+        # Always revalidate — CMS edits must show up on the next page load
+        "Cache-Control": "no-cache",
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.replace(microsecond=0), usegmt=True)
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison (RFC 9110 §13.1.2): ignore W/ prefixes
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in tags or f'"{digest}"' in tags:
+            return Response(status_code=304, headers=headers)
+        return None
+
+    # If-Modified-Since only counts when no ETag was sent (it cannot see deletions)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return None
+        if since.tzinfo is not None and last_modified.replace(microsecond=0) <= since:
+            return Response(status_code=304, headers=headers)
+    return None
+
+
+# ── Keyset pagination ─────────────────────────────────────────────────────────
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def set_next_cursor(response: Response, rows: list, model, sort_by: Optional[str], order: str, limit: int) -> None:
+    """
+    Advertise the cursor for the page after `rows` (omitted on the last page).
+
+    The body stays a plain list so offset-paging clients are unaffected; new
+    clients pass the header value back as ?cursor=.
+    """
+    from . import crud
+
+    cursor = crud.next_cursor(rows, model, sort_by, order, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+
+
 # ── Mail config builder ───────────────────────────────────────────────────────
 def build_mail_config(db: Session | None = None) -> ConnectionConfig:
-    """Build SMTP config from DB settings, falling back to environment variables."""
-    s: dict = {}
+    """SMTP config from DB settings (via the settings snapshot), falling back to environment variables."""
     if db:
         try:
-            from . import models
-            rows = db.query(models.Setting).filter(
-                models.Setting.key.in_([
-                    "smtp_host", "smtp_port", "smtp_username", "smtp_password",
-                    "smtp_from_email", "smtp_from_name", "smtp_use_tls", "smtp_use_ssl",
-                ])
-            ).all()
-            for row in rows:
-                s[row.key] = row.value
+            from . import settings_snapshot
+            return settings_snapshot.current(db).mail_config
         except Exception:
             pass
+    return mail_config_from_settings({})
+
 
+def mail_config_from_settings(s: dict) -> ConnectionConfig:
+    """Build SMTP config from an already-loaded {key: value} settings dict."""
     use_tls = s.get("smtp_use_tls", "").lower() not in ("false", "0", "") if s.get("smtp_use_tls") else True
     use_ssl = s.get("smtp_use_ssl", "").lower() in ("true", "1") if s.get("smtp_use_ssl") else False
 
@@ -0,0 +1,407 @@
+"""
+metrics.py — Prometheus metrics for GET /metrics, merged across uvicorn workers.
+
+Centralizes: request_metrics (per-route request counts, latency and response
+size histograms, in-flight gauge and upload counters), run(), which flushes
+this worker's snapshot, and render(), which returns the text exposition
+format.
+
+Counters are plain Python ints with no lock. RequestMiddleware and the
+upload path only ever touch them from the worker's event loop thread.
+Every METRICS_FLUSH_SECONDS, and at shutdown, each worker writes its
+snapshot to METRICS_DIR/worker-<pid>.json. The snapshot covers requests,
+uploads, DB pools, caches, the password hasher, the rate limiter and the
+mail sender.
+
+The worker that serves the scrape merges those files with its own live
+values. Counters and histograms are summed over every file, so a restarted
+worker's totals are kept. Gauges are summed over live workers only. Other
+workers' numbers can be up to METRICS_FLUSH_SECONDS old. Mail queue depth
+and stored upload bytes are read from the database at scrape time.
+start.sh empties METRICS_DIR before uvicorn starts.
+
+Routes are labelled by template (/api/blog/{slug}). Requests that matched
+no route share route="<unmatched>", which keeps label cardinality bounded.
+"""
+import asyncio
+import json
+import logging
+import os
+import tempfile
+from bisect import bisect_left
+from datetime import datetime, timezone
+from itertools import accumulate
+from typing import Iterable, Optional
+
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from . import models
+from .db_metrics import QueryStats
+
+logger = logging.getLogger("jdgk-api")
+
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(tempfile.gettempdir(), "jdgk-api-metrics"))
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+# ── This worker's request counters ────────────────────────────────────────────
+class _Series:
+    """Non-cumulative bucket counts + sum; made cumulative when exported."""
+
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, buckets: tuple):
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def export(self) -> dict:
+        buckets = list(accumulate(self.counts))
+        return {"buckets": buckets, "sum": self.sum, "count": buckets[-1]}
+
+
+class RequestMetrics:
+    """Event-loop-only counters, hence lock-free."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.responses: dict[tuple[str, str, int], int] = {}
+        self.latency: dict[tuple[str, str], _Series] = {}
+        self.size: dict[tuple[str, str], _Series] = {}
+        self.db_statements: dict[tuple[str, str], int] = {}
+        self.db_seconds: dict[tuple[str, str], float] = {}
+        self.query_flags: dict[tuple[str, str, str], int] = {}
+        self.uploads = 0
+        self.upload_bytes = 0
+
+    def observe(
+        self, method: str, route: Optional[str], status: int, seconds: float, size: int, queries: QueryStats,
+    ) -> None:
+        method = method if method in _METHODS else "OTHER"
+        route = route or UNMATCHED_ROUTE
+        key = (method, route)
+        self.responses[(method, route, status)] = self.responses.get((method, route, status), 0) + 1
+        latency = self.latency.get(key)
+        if latency is None:
+            latency = self.latency[key] = _Series(LATENCY_BUCKETS)
+            self.size[key] = _Series(SIZE_BUCKETS)
+        latency.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        latency.sum += seconds
+        sizes = self.size[key]
+        sizes.counts[bisect_left(SIZE_BUCKETS, size)] += 1
+        sizes.sum += size
+        if queries.statements:
+            self.db_statements[key] = self.db_statements.get(key, 0) + queries.statements
+            self.db_seconds[key] = self.db_seconds.get(key, 0.0) + queries.seconds
+            if queries.over_budget():
+                self._flag(method, route, "over_budget")
+            if queries.repeated():
+                self._flag(method, route, "repeated")
+
+    def _flag(self, method: str, route: str, reason: str) -> None:
+        self.query_flags[(method, route, reason)] = self.query_flags.get((method, route, reason), 0) + 1
+
+    def observe_upload(self, size: int) -> None:
+        self.uploads += 1
+        self.upload_bytes += size
+
+
+request_metrics = RequestMetrics()
+
+
+# ── Snapshot ──────────────────────────────────────────────────────────────────
+def _family(name: str, kind: str, help_text: str, samples: Iterable, buckets: tuple = ()) -> dict:
+    """samples: (labels dict, value) pairs; a histogram value is {"buckets", "sum", "count"}."""
+    return {"name": name, "type": kind, "help": help_text, "bounds": list(buckets), "samples": list(samples)}
+
+
+def _pool_histogram(snapshot: dict) -> dict:
+    # db_metrics.Histogram.snapshot() is already cumulative, keyed by bound
+    return {"buckets": list(snapshot["buckets"].values()), "sum": snapshot["sum"], "count": snapshot["count"]}
+
+
+def worker_families() -> list[dict]:
+    from .auth import identity_cache_stats
+    from .cache import query_cache
+    from .database import pool_stats
+    from .db_metrics import WAIT_BUCKETS
+    from .mailer import mailer_metrics
+    from .passwords import hasher_metrics
+    from .rate_limit import rate_limit_metrics
+
+    rm = request_metrics
+    families = [
+        _family("http_requests_in_flight", "gauge", "Requests being handled.", [({}, rm.in_flight)]),
+        _family(
+            "http_requests_total", "counter", "Responses sent, by route template and status.",
+            (({"method": m, "route": r, "status": str(s)}, n) for (m, r, s), n in rm.responses.items()),
+        ),
+        _family(
+            "http_request_duration_seconds", "histogram", "Time from request to last response byte.",
+            (({"method": m, "route": r}, series.export()) for (m, r), series in rm.latency.items()),
+            LATENCY_BUCKETS,
+        ),
+        _family(
+            "http_response_size_bytes", "histogram", "Response body size.",
+            (({"method": m, "route": r}, series.export()) for (m, r), series in rm.size.items()),
+            SIZE_BUCKETS,
+        ),
+        _family(
+            "http_request_db_statements_total", "counter", "SQL statements run on behalf of requests.",
+            (({"method": m, "route": r}, n) for (m, r), n in rm.db_statements.items()),
+        ),
+        _family(
+            "http_request_db_seconds_total", "counter", "Time spent in SQL statements on behalf of requests.",
+            (({"method": m, "route": r}, s) for (m, r), s in rm.db_seconds.items()),
+        ),
+        _family(
+            "http_request_query_flags_total", "counter",
+            "Requests over QUERY_BUDGET statements (over_budget) or repeating one statement (repeated).",
+            (({"method": m, "route": r, "reason": reason}, n) for (m, r, reason), n in rm.query_flags.items()),
+        ),
+        _family("uploads_total", "counter", "Files stored through the upload endpoints.", [({}, rm.uploads)]),
+        _family("upload_bytes_total", "counter", "Bytes received by the upload endpoints.", [({}, rm.upload_bytes)]),
+    ]
+
+    pools = pool_stats()
+    families += [
+        _family(
+            f"db_pool_{gauge}", "gauge", f"Connection pool {gauge}.",
+            (({"engine": engine}, stats[gauge]) for engine, stats in pools.items() if gauge in stats),
+        )
+        for gauge in ("size", "checkedout", "checkedin", "overflow")
+    ]
+    families += [
+        _family(
+            f"db_pool_{counter}_total", "counter", f"Connection pool {counter}.",
+            (({"engine": engine}, stats[counter]) for engine, stats in pools.items()),
+        )
+        for counter in ("timeouts", "connects", "invalidations")
+    ]
+    families.append(_family(
+        "db_pool_checkout_wait_seconds", "histogram", "Time waiting for a pooled connection.",
+        (({"engine": engine}, _pool_histogram(stats["checkout_wait_seconds"])) for engine, stats in pools.items()),
+        WAIT_BUCKETS,
+    ))
+
+    caches = {"query": query_cache.stats(), "identity": identity_cache_stats()}
+    cache_help = {
+        "hits": "Cache lookups answered from memory; hit ratio = hits / (hits + misses).",
+        "misses": "Cache lookups that went to the database.",
+        "evictions": "Entries dropped to stay under the size limit.",
+    }
+    families += [
+        _family(
+            f"cache_{counter}_total", "counter", help_text,
+            (({"cache": name}, stats[counter]) for name, stats in caches.items()),
+        )
+        for counter, help_text in cache_help.items()
+    ]
+    families.append(_family(
+        "cache_entries", "gauge", "Entries currently cached.",
+        (({"cache": name}, stats["entries"]) for name, stats in caches.items()),
+    ))
+
+    families += [
+        _family(
+            "password_hash_in_flight", "gauge", "bcrypt calls queued or running.", [({}, hasher_metrics.in_flight)],
+        ),
+        _family(
+            "password_hash_total", "counter", "bcrypt calls by outcome.",
+            [
+                ({"outcome": "completed"}, hasher_metrics.completed),
+                ({"outcome": "rejected"}, hasher_metrics.rejected),
+                ({"outcome": "error"}, hasher_metrics.errors),
+            ],
+        ),
+        _family(
+            "password_hash_seconds_total", "counter", "Seconds spent hashing, and waiting for a pool process.",
+            [({"phase": "hash"}, hasher_metrics.hash_seconds), ({"phase": "wait"}, hasher_metrics.wait_seconds)],
+        ),
+        _family(
+            "rate_limit_requests_total", "counter", "Rate-limited requests by outcome.",
+            (
+                ({"route": route, "outcome": outcome}, counts[outcome])
+                for route, counts in rate_limit_metrics.snapshot()["routes"].items()
+                for outcome in ("allowed", "rejected", "rejected_locally")
+            ),
+        ),
+        _family(
+            "mail_sent_total", "counter", "Outbox messages by send outcome.",
+            [
+                ({"outcome": "sent"}, mailer_metrics.sent),
+                ({"outcome": "retried"}, mailer_metrics.retried),
+                ({"outcome": "failed"}, mailer_metrics.failed),
+            ],
+        ),
+    ]
+    return families
+
+
+async def _database_families(db: AsyncSession) -> list[dict]:
+    """Deployment-wide figures, read once per scrape rather than per worker."""
+    Outbox, Blob = models.EmailOutbox, models.UploadBlob
+    outbox = (await db.execute(
+        select(Outbox.status, func.count(), func.min(Outbox.created_at)).group_by(Outbox.status)
+    )).all()
+    oldest = next((oldest for status, _, oldest in outbox if status == "pending"), None)
+    state = case((Blob.ref_count > 0, "referenced"), else_="orphaned")
+    blobs = (await db.execute(
+        select(state, func.count(), func.coalesce(func.sum(Blob.size), 0)).group_by(state)
+    )).all()
+    return [
+        _family(
+            "mail_outbox_messages", "gauge", "Outbox rows by status (pending = queue depth).",
+            (({"status": status}, count) for status, count, _ in outbox),
+        ),
+        _family(
+            "mail_outbox_oldest_pending_seconds", "gauge", "Age of the oldest pending outbox message.",
+            [({}, (datetime.now(timezone.utc) - oldest).total_seconds() if oldest else 0)],
+        ),
+        _family(
+            "upload_blobs", "gauge", "Distinct stored files.",
+            (({"state": name}, count) for name, count, _ in blobs),
+        ),
+        _family(
+            "upload_stored_bytes", "gauge", "Bytes held in the content-addressed upload store.",
+            (({"state": name}, int(size)) for name, _, size in blobs),
+        ),
+    ]
+
+
+# ── Cross-worker files ────────────────────────────────────────────────────────
+def _worker_file(pid: int) -> str:
+    return os.path.join(METRICS_DIR, f"worker-{pid}.json")
+
+
+def _write(data: str) -> None:
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = _worker_file(os.getpid())
+    tmp_path = f"{path}.part"
+    with open(tmp_path, "w") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _snapshot() -> str:
+    return json.dumps({"pid": os.getpid(), "families": worker_families()})
+
+
+async def run() -> None:
+    """Flush this worker's snapshot every METRICS_FLUSH_SECONDS, and once more on shutdown."""
+    try:
+        while True:
+            try:
+                await run_in_threadpool(_write, _snapshot())
+            except Exception:
+                logger.exception("metrics: cannot write %s", METRICS_DIR)
+            await asyncio.sleep(METRICS_FLUSH_SECONDS)
+    finally:
+        try:
+            _write(_snapshot())
+        except Exception:
+            pass
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _read_other_workers() -> list[dict]:
+    snapshots = []
+    try:
+        names = os.listdir(METRICS_DIR)
+    except FileNotFoundError:
+        return snapshots
+    own = os.path.basename(_worker_file(os.getpid()))
+    for name in names:
+        if not name.startswith("worker-") or not name.endswith(".json") or name == own:
+            continue
+        try:
+            with open(os.path.join(METRICS_DIR, name)) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # Being replaced, or from a crashed write
+    return snapshots
+
+
+def _add(a, b):
+    if isinstance(a, dict):
+        if len(a["buckets"]) != len(b["buckets"]):
+            return a  # Bucket layout changed between deployments
+        return {
+            "buckets": [x + y for x, y in zip(a["buckets"], b["buckets"])],
+            "sum": a["sum"] + b["sum"],
+            "count": a["count"] + b["count"],
+        }
+    return a + b
+
+
+def _merge(snapshots: list[dict]) -> list[dict]:
+    merged: dict[str, dict] = {}
+    for snapshot in snapshots:
+        alive = snapshot["pid"] == os.getpid() or _alive(snapshot["pid"])
+        for family in snapshot["families"]:
+            if family["type"] == "gauge" and not alive:
+                continue
+            target = merged.setdefault(family["name"], {**family, "samples": {}})
+            for labels, value in family["samples"]:
+                key = tuple(sorted(labels.items()))
+                previous = target["samples"].get(key)
+                target["samples"][key] = value if previous is None else _add(previous, value)
+    for family in merged.values():
+        family["samples"] = [(dict(key), value) for key, value in family["samples"].items()]
+    return list(merged.values())
+
+
+# ── Exposition ────────────────────────────────────────────────────────────────
+def _labels(labels: dict, extra: str = "") -> str:
+    parts = [
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels.items()
+    ]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value) -> str:
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+def _exposition(families: list[dict]) -> str:
+    lines = []
+    for family in sorted(families, key=lambda f: f["name"]):
+        name = family["name"]
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        for labels, value in family["samples"]:
+            if family["type"] != "histogram":
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                continue
+            bounds = [*map(_number, family["bounds"]), "+Inf"]
+            for bound, count in zip(bounds, value["buckets"]):
+                le = f'le="{bound}"'
+                lines.append(f"{name}_bucket{_labels(labels, le)} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(value['sum'])}")
+            lines.append(f"{name}_count{_labels(labels)} {value['count']}")
+    return "\n".join(lines) + "\n"
+
+
+async def render(db: AsyncSession) -> str:
+    """Text exposition of every worker's metrics plus the database-derived gauges."""
+    snapshots = await run_in_threadpool(_read_other_workers)
+    snapshots.append({"pid": os.getpid(), "families": worker_families()})
+    return _exposition(_merge(snapshots) + await _database_families(db))
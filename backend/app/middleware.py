@@ -0,0 +1,168 @@
+"""
+middleware.py — Raw ASGI middleware wrapped around every request.
+
+Centralizes: RequestMiddleware, which sets the security headers
+(XSS / clickjacking / MIME-sniff protection, HSTS, CSP) on every response,
+times the request and its database statements (reported in a Server-Timing
+header unless SERVER_TIMING=false), and hands the result to
+metrics.request_metrics and access_log.record() once the response has been
+sent. Requests over the query budget or repeating a statement (see
+db_metrics.QUERY_BUDGET) are flagged there, with one warning per route and
+worker. BodySizeLimitMiddleware refuses over-limit request bodies on the
+upload routes before the app reads them.
+
+They work on the ASGI messages directly instead of through
+@app.middleware("http") (BaseHTTPMiddleware): no per-request task and memory
+stream, and streaming / file responses pass through chunk by chunk. The
+header block is encoded once at import; each response only drops any
+same-named headers the app set and appends the prepared bytes.
+"""
+import logging
+import os
+import time
+
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from . import access_log
+from .db_metrics import QUERY_BUDGET, QueryStats, current_queries
+from .metrics import request_metrics
+
+logger = logging.getLogger("jdgk-api")
+
+# Shows DB time to clients (browser devtools); turn off where that is unwanted
+SERVER_TIMING = os.getenv("SERVER_TIMING", "true").lower() in ("true", "1")
+
+SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+    "Referrer-Policy": "strict-origin-when-cross-origin",
+    "Permissions-Policy": "camera=(), microphone=(), geolocation=()",
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains; preload",
+    "Content-Security-Policy": (
+        "default-src 'self'; "
+        "script-src 'self' 'unsafe-inline' https://www.googletagmanager.com https://www.google-analytics.com https://connect.facebook.net; "
+        "style-src 'self' 'unsafe-inline' https://fonts.googleapis.com; "
+        "font-src 'self' https://fonts.gstatic.com; "
+        "img-src 'self' data: blob: https:; "
+        "connect-src 'self' https://www.google-analytics.com https://region1.google-analytics.com; "
+        "frame-src 'self' https://www.googletagmanager.com; "
+        "object-src 'none'; "
+        "base-uri 'self';"
+    ),
+}
+
+_RAW_SECURITY_HEADERS = [
+    (name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in SECURITY_HEADERS.items()
+]
+_SECURITY_HEADER_NAMES = frozenset(name for name, _ in _RAW_SECURITY_HEADERS)
+
+_warned: set[tuple[str, str, str]] = set()
+
+
+def _server_timing(queries: QueryStats, start_ns: int) -> bytes:
+    # Covers the handler; for streamed bodies, statements run while streaming are not included
+    app_ms = (time.perf_counter_ns() - start_ns) / 1_000_000
+    return (
+        f'db;dur={queries.seconds * 1000:.2f};desc="{queries.statements} queries", app;dur={app_ms:.2f}'
+    ).encode("latin-1")
+
+
+def _warn_query_problems(method: str, route: str, queries: QueryStats) -> None:
+    if queries.over_budget() and (method, route, "budget") not in _warned:
+        _warned.add((method, route, "budget"))
+        logger.warning(
+            "%s %s ran %d SQL statements (budget %d):\n%s",
+            method, route, queries.statements, QUERY_BUDGET, queries.report(),
+        )
+    if queries.repeated() and (method, route, "repeated") not in _warned:
+        _warned.add((method, route, "repeated"))
+        logger.warning("%s %s repeats a SQL statement (likely N+1):\n%s", method, route, queries.report())
+
+
+class RequestMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter_ns()
+        status = 500  # Reported if the app raises before starting a response
+        response_bytes = 0
+        queries = QueryStats()
+        token = current_queries.set(queries)
+        request_metrics.in_flight += 1
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, response_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = [h for h in message.get("headers", ()) if h[0].lower() not in _SECURITY_HEADER_NAMES]
+                headers.extend(_RAW_SECURITY_HEADERS)
+                if SERVER_TIMING:
+                    headers.append((b"server-timing", _server_timing(queries, start)))
+                message["headers"] = headers
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_queries.reset(token)
+            request_metrics.in_flight -= 1
+            duration_ns = time.perf_counter_ns() - start
+            route = access_log.route_template(scope)
+            request_metrics.observe(scope["method"], route, status, duration_ns / 1e9, response_bytes, queries)
+            if queries.statements > QUERY_BUDGET or queries.repeated():
+                _warn_query_problems(scope["method"], route or "<unmatched>", queries)
+            access_log.record(scope, route, status, duration_ns, queries, response_bytes)
+
+
+class BodySizeLimitMiddleware:
+    """
+    413 for a request body over the limit set for its route, in place of the
+    app reading it first (python-multipart spools a whole form to disk before
+    the handler's own size check runs).
+
+    `limits` maps (method, path) to a byte limit. A Content-Length over it is
+    refused without reading the body; otherwise receiving stops as soon as the
+    count passes it (chunked bodies).
+    """
+
+    def __init__(self, app: ASGIApp, limits: dict[tuple[str, str], int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        max_bytes = self.limits.get((scope["method"], scope["path"])) if scope["type"] == "http" else None
+        if max_bytes is None:
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Request body exceeds {max_bytes} bytes"
+        content_length = Headers(scope=scope).get("content-length", "")
+        if content_length.isdigit() and int(content_length) > max_bytes:
+            response = JSONResponse({"detail": detail}, status_code=413, headers={"Connection": "close"})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def receive_limited() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    # Passes through FastAPI's body parsing as-is and becomes the response
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, receive_limited, send)
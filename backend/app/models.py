@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Text, JSON, DateTime
+from sqlalchemy import BigInteger, Boolean, Column, ForeignKey, Index, Integer, String, Text, JSON, DateTime, text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -28,6 +28,10 @@ class User(Base):
 
 class Page(Base):
     __tablename__ = "pages"
+    __table_args__ = (
+        # Lists filter on status and sort by created_at (id is the keyset tiebreaker)
+        Index("ix_pages_status_created_at", "status", "created_at", "id"),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     title = Column(String)
@@ -46,6 +50,9 @@ class Page(Base):
 
 class Service(Base):
     __tablename__ = "services"
+    __table_args__ = (
+        Index("ix_services_sort_order", "sort_order", "id"),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     title = Column(String)
@@ -63,6 +70,11 @@ class Service(Base):
 
 class BlogPost(Base):
     __tablename__ = "blog_posts"
+    __table_args__ = (
+        Index("ix_blog_posts_status_created_at", "status", "created_at", "id"),
+        # Public blog: published only, newest first
+        Index("ix_blog_posts_published_created_at", "created_at", "id", postgresql_where=text("status = 'published'")),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     title = Column(String)
@@ -85,6 +97,9 @@ class BlogPost(Base):
 
 class JobListing(Base):
     __tablename__ = "job_listings"
+    __table_args__ = (
+        Index("ix_job_listings_status_created_at", "status", "created_at", "id"),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     title = Column(String)
@@ -105,6 +120,9 @@ class JobListing(Base):
 
 class Testimonial(Base):
     __tablename__ = "testimonials"
+    __table_args__ = (
+        Index("ix_testimonials_sort_order", "sort_order", "id"),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     client_name = Column(String)
@@ -120,6 +138,9 @@ class Testimonial(Base):
 
 class TeamMember(Base):
     __tablename__ = "team_members"
+    __table_args__ = (
+        Index("ix_team_members_sort_order", "sort_order", "id"),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     name = Column(String)
@@ -146,6 +167,11 @@ class TeamMember(Base):
 
 class GalleryItem(Base):
     __tablename__ = "gallery_items"
+    __table_args__ = (
+        Index("ix_gallery_items_status_sort_order", "status", "sort_order", "id"),
+        # Public gallery filtered by category
+        Index("ix_gallery_items_published_category", "category", "sort_order", "id", postgresql_where=text("status = 'published'")),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     title = Column(String)
@@ -170,6 +196,15 @@ class Setting(Base):
 
 class ContentBlock(Base):
     __tablename__ = "content_blocks"
+    __table_args__ = (
+        Index("ix_content_blocks_status_sort_order", "status", "sort_order", "id"),
+        Index("ix_content_blocks_block_type_sort_order", "block_type", "sort_order", "id"),
+        # page_assignments @> '["slug"]' — jsonb_path_ops only supports @>, but is smaller and faster for it
+        Index(
+            "ix_content_blocks_page_assignments", "page_assignments",
+            postgresql_using="gin", postgresql_ops={"page_assignments": "jsonb_path_ops"},
+        ),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     name = Column(String, unique=True, index=True)  # unique slug e.g. 'hero-about'
@@ -195,6 +230,10 @@ class AnalyticsData(Base):
 
 class JobApplication(Base):
     __tablename__ = "job_applications"
+    __table_args__ = (
+        Index("ix_job_applications_job_id_created_at", "job_id", "created_at", "id"),
+        Index("ix_job_applications_status_created_at", "status", "created_at", "id"),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     job_id = Column(String, ForeignKey("job_listings.id", ondelete="SET NULL"), nullable=True, index=True)
@@ -247,6 +286,10 @@ class JobApplication(Base):
 
 class ContactMessage(Base):
     __tablename__ = "contact_messages"
+    __table_args__ = (
+        # Inbox views filtered on read state, newest first
+        Index("ix_contact_messages_is_read_submitted_at", "is_read", "submitted_at", "id"),
+    )
 
     id = Column(String, primary_key=True, default=generate_uuid)
     full_name = Column(String, nullable=False)
@@ -254,4 +297,76 @@ class ContactMessage(Base):
     email = Column(String, nullable=False)
     message = Column(Text, nullable=False)
     is_read = Column(Boolean, default=False)
-    submitted_at = Column(DateTime(timezone=True), server_default=func.now())
+    submitted_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+
+class EmailOutbox(Base):
+    """Outbound notification email, queued in the same transaction as the row it reports on."""
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # The sender only ever scans due, pending messages
+        Index("ix_email_outbox_pending_next_attempt_at", "next_attempt_at", postgresql_where=text("status = 'pending'")),
+    )
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    subject = Column(String, nullable=False)
+    recipients = Column(JSON, nullable=False)  # list[str]; empty: the notification recipient, resolved when sent
+    html_body = Column(Text, nullable=False)
+    status = Column(String, default="pending")  # pending, sent, failed
+    attempts = Column(Integer, default=0)
+    last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class UploadBlob(Base):
+    """One stored file per distinct content, at uploads/blobs/<sha256[:2]>/<sha256><extension>."""
+    __tablename__ = "upload_blobs"
+    __table_args__ = (
+        # Garbage collection only looks at unreferenced blobs
+        Index("ix_upload_blobs_orphaned_updated_at", "updated_at", postgresql_where=text("ref_count = 0")),
+    )
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    extension = Column(String, nullable=False, default="")  # taken from the first upload
+    content_type = Column(String, nullable=True)
+    ref_count = Column(Integer, nullable=False, default=0)  # upload_paths rows pointing here
+    width = Column(Integer, nullable=True)  # pixels, for images; bounds the srcset variant widths
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class UploadPath(Base):
+    """A logical upload path (relative to uploads/) and the blob it currently holds."""
+    __tablename__ = "upload_paths"
+
+    path = Column(String, primary_key=True)
+    sha256 = Column(String(64), ForeignKey("upload_blobs.sha256"), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class RateLimitHit(Base):
+    """One admitted request inside a sliding rate-limit window (see rate_limit.py)."""
+    __tablename__ = "rate_limit_hits"
+    __table_args__ = (
+        Index("ix_rate_limit_hits_key_hit_at", "key", "hit_at"),
+        # Throwaway state: skip the WAL; a crash simply forgets recent hits
+        {"prefixes": ["UNLOGGED"]},
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    key = Column(String, nullable=False)
+    hit_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+class RateLimitCounter(Base):
+    """Fixed-window counter, used when RATE_LIMIT_STRATEGY=fixed-window."""
+    __tablename__ = "rate_limit_counters"
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    key = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
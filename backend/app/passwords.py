@@ -0,0 +1,151 @@
+"""
+passwords.py — bcrypt hashing off the event loop and the request threadpool.
+
+Centralizes: hash_password() / verify_password(), which run bcrypt (~100–300
+ms of CPU per call) in a dedicated ProcessPoolExecutor of
+PASSWORD_HASH_WORKERS processes, so a login burst uses its own cores instead
+of the threadpool slots every sync route needs; PasswordHasherBusy;
+hasher_metrics; start() / shutdown(); and hash_sync() / verify_sync() for
+scripts and seeding.
+
+At most PASSWORD_HASH_MAX_PENDING calls may be queued or running per uvicorn
+worker. Past that, calls fail fast with PasswordHasherBusy (answered 503 +
+Retry-After) instead of queueing behind the burst. PASSWORD_HASH_WORKERS=0
+runs bcrypt in the threadpool instead, under the same limit, for hosts
+where subprocesses are unavailable.
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = 1
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+class PasswordHasherBusy(Exception):
+    """PASSWORD_HASH_MAX_PENDING hash/verify calls are already queued or running."""
+
+
+def hash_sync(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_sync(password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(password, hashed_password)
+
+
+# ── Metrics ───────────────────────────────────────────────────────────────────
+class HasherMetrics:
+    """Counters for this worker's hasher."""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.errors = 0
+        self.hash_seconds = 0.0   # inside bcrypt
+        self.wait_seconds = 0.0   # queued for a pool process
+
+    def snapshot(self) -> dict:
+        done = self.completed or 1
+        return {
+            "workers": PASSWORD_HASH_WORKERS,
+            "mode": "process" if PASSWORD_HASH_WORKERS > 0 else "thread",
+            "max_pending": PASSWORD_HASH_MAX_PENDING,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "avg_hash_ms": round(self.hash_seconds / done * 1000, 3),
+            "avg_wait_ms": round(self.wait_seconds / done * 1000, 3),
+        }
+
+
+hasher_metrics = HasherMetrics()
+
+
+# ── Executor ──────────────────────────────────────────────────────────────────
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _get_executor() -> Optional[ProcessPoolExecutor]:
+    global _executor
+    if _executor is None and PASSWORD_HASH_WORKERS > 0:
+        # spawn: don't fork a process that holds an event loop and DB connections
+        _executor = ProcessPoolExecutor(PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def _warm() -> None:
+    """Runs in a pool process; unpickling it imports this module and passlib there."""
+
+
+def start() -> None:
+    """Spawn the pool processes at startup rather than on the first login."""
+    executor = _get_executor()
+    if executor is not None:
+        for _ in range(PASSWORD_HASH_WORKERS):
+            executor.submit(_warm)
+
+
+def shutdown() -> None:
+    global _executor
+    executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _timed(fn: Callable, *args):
+    start = time.perf_counter()
+    return fn(*args), time.perf_counter() - start
+
+
+async def _run(fn: Callable, *args):
+    global _executor
+    metrics = hasher_metrics
+    if metrics.in_flight >= PASSWORD_HASH_MAX_PENDING:
+        metrics.rejected += 1
+        raise PasswordHasherBusy()
+    metrics.in_flight += 1
+    metrics.peak_in_flight = max(metrics.peak_in_flight, metrics.in_flight)
+    start = time.perf_counter()
+    try:
+        executor = _get_executor()
+        if executor is None:
+            result, spent = await run_in_threadpool(_timed, fn, *args)
+        else:
+            result, spent = await asyncio.get_running_loop().run_in_executor(executor, _timed, fn, *args)
+    except BrokenProcessPool:
+        # A pool process died; start a fresh pool on the next call
+        metrics.errors += 1
+        _executor = None
+        raise
+    except BaseException:
+        metrics.errors += 1
+        raise
+    finally:
+        metrics.in_flight -= 1
+    metrics.completed += 1
+    metrics.hash_seconds += spent
+    metrics.wait_seconds += max(0.0, time.perf_counter() - start - spent)
+    return result
+
+
+async def hash_password(password: str) -> str:
+    return await _run(hash_sync, password)
+
+
+async def verify_password(password: str, hashed_password: str) -> bool:
+    return await _run(verify_sync, password, hashed_password)
@@ -0,0 +1,338 @@
+"""
+rate_limit.py — Rate-limit state shared by every uvicorn worker.
+
+Centralizes: SharedLimiter (the slowapi Limiter behind main_helpers.limiter),
+PostgresStorage, the per-worker LocalRateLimiter fast path in front of it,
+and rate_limit_metrics (allowed / rejected counts per route).
+
+slowapi's memory:// storage is per process, so with N workers a "5/minute"
+limit really allowed 5×N. With RATE_LIMIT_STORAGE_URI=cms-postgres:// (the
+default) the counts live in the app database instead, in UNLOGGED tables:
+the moving-window strategy keeps one rate_limit_hits row per admitted
+request, so every worker enforces the same sliding window. Any other
+`limits` storage URI (memory://, redis://...) can be configured instead. If
+the storage is unreachable slowapi falls back to per-worker memory and
+retries it with backoff.
+
+Each worker first checks a local token bucket per client and route
+(capacity = the limit, refilled at limit/period). A client already over the
+limit on this worker alone, or one the shared window refused until its reset
+time, is refused without a database round trip. At most
+RATE_LIMIT_LOCAL_MAX_KEYS buckets are kept, least recently used evicted.
+
+slowapi checks limits synchronously inside its route wrapper; for async
+routes SharedLimiter runs that check in the threadpool first, so a database
+round trip never blocks the event loop.
+"""
+import asyncio
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Optional
+
+from limits.storage import MovingWindowSupport, Storage
+from limits.strategies import RateLimiter
+from slowapi import Limiter
+from sqlalchemy import case, create_engine, delete, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+
+from . import models
+from .database import DATABASE_URL
+from .db_metrics import track_queries
+
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "cms-postgres://")
+# moving-window = sliding window; fixed-window is cheaper but allows 2× bursts at window edges
+RATE_LIMIT_STRATEGY = os.getenv("RATE_LIMIT_STRATEGY", "moving-window")
+RATE_LIMIT_LOCAL_MAX_KEYS = int(os.getenv("RATE_LIMIT_LOCAL_MAX_KEYS", "10000"))
+# A limit check holds up its request (and a threadpool thread): fail over quickly instead of stalling
+RATE_LIMIT_DB_TIMEOUT_SECONDS = 1
+RATE_LIMIT_PURGE_SECONDS = 60
+
+
+# ── Shared storage ────────────────────────────────────────────────────────────
+class PostgresStorage(Storage, MovingWindowSupport):
+    """`limits` storage in the app database, on its own small connection pool."""
+
+    STORAGE_SCHEME = ["cms-postgres"]
+
+    def __init__(self, uri: Optional[str] = None, wrap_exceptions: bool = False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.engine = create_engine(
+            DATABASE_URL,
+            pool_size=2,
+            max_overflow=3,
+            pool_timeout=RATE_LIMIT_DB_TIMEOUT_SECONDS,
+            pool_pre_ping=True,
+            connect_args={"options": f"-c statement_timeout={RATE_LIMIT_DB_TIMEOUT_SECONDS * 1000}"},
+        )
+        track_queries(self.engine)
+        self._purged_at = 0.0
+        self._longest_expiry = 0
+
+    @property
+    def base_exceptions(self):
+        return SQLAlchemyError
+
+    # Fixed window
+    def incr(self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1) -> int:
+        Counter = models.RateLimitCounter
+        stmt = pg_insert(Counter).values(
+            key=key, count=amount, expires_at=func.now() + timedelta(seconds=expiry),
+        )
+        expired = Counter.expires_at <= func.now()
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Counter.key],
+            set_={
+                "count": case((expired, stmt.excluded.count), else_=Counter.count + stmt.excluded.count),
+                "expires_at": (
+                    stmt.excluded.expires_at if elastic_expiry
+                    else case((expired, stmt.excluded.expires_at), else_=Counter.expires_at)
+                ),
+            },
+        ).returning(Counter.count)
+        with self.engine.begin() as conn:
+            count = conn.scalar(stmt)
+        self._purge(expiry)
+        return count
+
+    def get(self, key: str) -> int:
+        Counter = models.RateLimitCounter
+        with self.engine.connect() as conn:
+            count = conn.scalar(
+                select(Counter.count).where(Counter.key == key, Counter.expires_at > func.now())
+            )
+        return count or 0
+
+    def get_expiry(self, key: str) -> float:
+        Counter = models.RateLimitCounter
+        with self.engine.connect() as conn:
+            expires_at = conn.scalar(
+                select(func.extract("epoch", Counter.expires_at)).where(Counter.key == key)
+            )
+        return float(expires_at) if expires_at is not None else time.time()
+
+    # Moving (sliding) window
+    def acquire_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        Hit = models.RateLimitHit
+        with self.engine.begin() as conn:
+            # Serializes the count-then-insert for one client and route across workers
+            conn.execute(select(func.pg_advisory_xact_lock(func.hashtext("rate_limit:" + key))))
+            count = conn.scalar(
+                select(func.count()).select_from(Hit)
+                .where(Hit.key == key, Hit.hit_at > func.now() - timedelta(seconds=expiry))
+            )
+            if count + amount > limit:
+                return False
+            conn.execute(insert(Hit), [{"key": key}] * amount)
+        self._purge(expiry)
+        return True
+
+    def get_moving_window(self, key: str, limit: int, expiry: int) -> tuple[float, int]:
+        Hit = models.RateLimitHit
+        with self.engine.connect() as conn:
+            oldest, count = conn.execute(
+                select(func.extract("epoch", func.min(Hit.hit_at)), func.count())
+                .where(Hit.key == key, Hit.hit_at > func.now() - timedelta(seconds=expiry))
+            ).one()
+        return (float(oldest) if oldest is not None else time.time()), count
+
+    def _purge(self, expiry: int) -> None:
+        """Every RATE_LIMIT_PURGE_SECONDS, drop hits and counters no window can still see."""
+        self._longest_expiry = max(self._longest_expiry, expiry)
+        now = time.monotonic()
+        if now - self._purged_at < RATE_LIMIT_PURGE_SECONDS:
+            return
+        self._purged_at = now
+        Hit, Counter = models.RateLimitHit, models.RateLimitCounter
+        with self.engine.begin() as conn:
+            conn.execute(delete(Hit).where(Hit.hit_at <= func.now() - timedelta(seconds=self._longest_expiry)))
+            conn.execute(delete(Counter).where(Counter.expires_at <= func.now()))
+
+    def check(self) -> bool:
+        try:
+            with self.engine.connect() as conn:
+                conn.scalar(select(1))
+            return True
+        except SQLAlchemyError:
+            return False
+
+    def reset(self) -> Optional[int]:
+        with self.engine.begin() as conn:
+            hits = conn.execute(delete(models.RateLimitHit)).rowcount
+            counters = conn.execute(delete(models.RateLimitCounter)).rowcount
+        return hits + counters
+
+    def clear(self, key: str) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(delete(models.RateLimitHit).where(models.RateLimitHit.key == key))
+            conn.execute(delete(models.RateLimitCounter).where(models.RateLimitCounter.key == key))
+
+
+# ── Metrics ───────────────────────────────────────────────────────────────────
+class RateLimitMetrics:
+    """Per-route counts for this worker; routes are the decorated endpoints, so the dict stays small."""
+
+    def __init__(self):
+        self.routes: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, allowed: bool, local: bool = False) -> None:
+        with self._lock:
+            counts = self.routes.get(route)
+            if counts is None:
+                counts = self.routes[route] = {"allowed": 0, "rejected": 0, "rejected_locally": 0}
+            if allowed:
+                counts["allowed"] += 1
+            else:
+                counts["rejected"] += 1
+                if local:
+                    counts["rejected_locally"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            routes = {route: dict(counts) for route, counts in self.routes.items()}
+        return {
+            "storage": RATE_LIMIT_STORAGE_URI.split("://", 1)[0],
+            "strategy": RATE_LIMIT_STRATEGY,
+            "local_max_keys": RATE_LIMIT_LOCAL_MAX_KEYS,
+            "routes": routes,
+        }
+
+
+rate_limit_metrics = RateLimitMetrics()
+
+
+# ── Local fast path ───────────────────────────────────────────────────────────
+class _Bucket:
+    __slots__ = ("tokens", "updated_at", "blocked_until")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated_at = now
+        self.blocked_until = 0.0
+
+
+class LocalRateLimiter(RateLimiter):
+    """Per-worker token buckets in front of `shared`, which has the final say on admitted requests."""
+
+    def __init__(self, shared: RateLimiter, max_keys: int = RATE_LIMIT_LOCAL_MAX_KEYS):
+        super().__init__(shared.storage)
+        self.shared = shared
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, _Bucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _bucket(self, item, key: str, now: float) -> _Bucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(item.amount, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            refill = (now - bucket.updated_at) * item.amount / item.get_expiry()
+            bucket.tokens = min(item.amount, bucket.tokens + refill)
+            bucket.updated_at = now
+        return bucket
+
+    def hit(self, item, *identifiers: str, cost: int = 1) -> bool:
+        # slowapi passes (client key, route scope)
+        route = identifiers[-1] if identifiers else ""
+        key = item.key_for(*identifiers)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(item, key, now)
+            refused = now < bucket.blocked_until or bucket.tokens < cost
+            if not refused:
+                bucket.tokens -= cost
+        if refused:
+            rate_limit_metrics.record(route, allowed=False, local=True)
+            return False
+        if not self.shared.hit(item, *identifiers, cost=cost):
+            # Refuse locally until the shared window has room again
+            reset_time = self.shared.get_window_stats(item, *identifiers).reset_time
+            with self._lock:
+                bucket.blocked_until = now + max(0.0, reset_time - time.time())
+            rate_limit_metrics.record(route, allowed=False)
+            return False
+        rate_limit_metrics.record(route, allowed=True)
+        return True
+
+    def test(self, item, *identifiers: str, cost: int = 1) -> bool:
+        with self._lock:
+            bucket = self._buckets.get(item.key_for(*identifiers))
+            if bucket is not None and time.monotonic() < bucket.blocked_until:
+                return False
+        return self.shared.test(item, *identifiers, cost=cost)
+
+    def get_window_stats(self, item, *identifiers: str):
+        return self.shared.get_window_stats(item, *identifiers)
+
+    def clear(self, item, *identifiers: str) -> None:
+        with self._lock:
+            self._buckets.pop(item.key_for(*identifiers), None)
+        self.shared.clear(item, *identifiers)
+
+    @property
+    def local_keys(self) -> int:
+        return len(self._buckets)
+
+
+class SharedLimiter(Limiter):
+    """slowapi Limiter whose checks go through a LocalRateLimiter fast path."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("storage_uri", RATE_LIMIT_STORAGE_URI)
+        kwargs.setdefault("strategy", RATE_LIMIT_STRATEGY)
+        kwargs.setdefault("in_memory_fallback_enabled", True)
+        self._fast_path: Optional[LocalRateLimiter] = None
+        super().__init__(*args, **kwargs)
+
+    @property
+    def limiter(self) -> RateLimiter:
+        shared = super().limiter
+        # Rebuilt when slowapi switches to (or back from) its in-memory fallback
+        if self._fast_path is None or self._fast_path.shared is not shared:
+            self._fast_path = LocalRateLimiter(shared)
+        return self._fast_path
+
+    def limit(self, *args, **kwargs):
+        decorate = super().limit(*args, **kwargs)
+
+        def decorator(func):
+            wrapped = decorate(func)
+            if not asyncio.iscoroutinefunction(func):
+                return wrapped  # Sync routes already run in the threadpool
+
+            @functools.wraps(func)
+            async def check_off_loop(*a, **kw):
+                request = kw.get("request")
+                if (
+                    self.enabled and self._auto_check and isinstance(request, Request)
+                    and not getattr(request.state, "_rate_limiting_complete", False)
+                ):
+                    await run_in_threadpool(self._check_request_limit, request, func, False)
+                    # slowapi's wrapper sees this and skips its own (blocking) check
+                    request.state._rate_limiting_complete = True
+                return await wrapped(*a, **kw)
+
+            return check_off_loop
+
+        return decorator
+
+    def reset(self) -> None:
+        super().reset()
+        self._fast_path = None
+
+    def stats(self) -> dict:
+        snapshot = rate_limit_metrics.snapshot()
+        snapshot["local_keys"] = self._fast_path.local_keys if self._fast_path else 0
+        return snapshot
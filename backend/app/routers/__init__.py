@@ -13,6 +13,8 @@ from .analytics import router as analytics_router
 from .storage import router as storage_router
 from .contact import router as contact_router
 from .job_applications import router as job_applications_router
+from .page_bundle import router as page_bundle_router
+from .system import router as system_router
 
 all_routers = [
     auth_router,
@@ -30,4 +32,6 @@ all_routers = [
     storage_router,
     contact_router,
     job_applications_router,
+    page_bundle_router,
+    system_router,
 ]
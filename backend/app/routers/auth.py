@@ -4,11 +4,12 @@ Auth routes: login, session, signup, logout, user role.
 from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Optional
 
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud, crud_async, schemas
+from ..database import get_async_db, get_db
 from ..auth import (
     create_access_token,
     decode_token,
@@ -24,9 +25,9 @@ router = APIRouter(tags=["auth"])
 
 @router.post("/auth/login", response_model=schemas.SessionResponse)
 @limiter.limit("10/minute")
-def login(request: Request, login_data: schemas.LoginRequest, db: Session = Depends(get_db)):
+async def login(request: Request, login_data: schemas.LoginRequest, db: AsyncSession = Depends(get_async_db)):
     try:
-        user = crud.authenticate_user(db, login_data.email, login_data.password)
+        user = await crud_async.authenticate_user(db, login_data.email, login_data.password)
     except ValueError as e:
         # Account is locked — return 429 with lock message
         raise HTTPException(
@@ -50,7 +51,7 @@ def login(request: Request, login_data: schemas.LoginRequest, db: Session = Depe
 @router.get("/auth/session", response_model=schemas.SessionResponse)
 def get_session(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    current_user: Optional[models.User] = Depends(get_current_user_optional),
+    current_user: Optional[schemas.Identity] = Depends(get_current_user_optional),
 ):
     if current_user is None:
         return schemas.SessionResponse(session=None)
@@ -80,11 +81,11 @@ def get_session(
 
 
 @router.post("/auth/signup", response_model=schemas.SessionResponse)
-def signup(signup_data: schemas.SignupRequest, db: Session = Depends(get_db)):
-    existing = crud.get_user_by_email(db, email=signup_data.email)
+async def signup(signup_data: schemas.SignupRequest, db: AsyncSession = Depends(get_async_db)):
+    existing = await crud_async.get_user_by_email(db, email=signup_data.email)
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
-    user = crud.create_user(db, schemas.UserCreate(
+    user = await crud_async.create_user(db, schemas.UserCreate(
         email=signup_data.email,
         password=signup_data.password,
         full_name=signup_data.full_name,
@@ -105,14 +106,14 @@ def logout():
 
 
 @router.get("/user_roles/me")
-def get_my_role(current_user: models.User = Depends(get_current_user)):
+def get_my_role(current_user: schemas.Identity = Depends(get_current_user)):
     return {"role": current_user.role, "user_id": current_user.id}
 
 
 @router.put("/auth/me", response_model=schemas.User)
 def update_my_profile(
     update_data: schemas.UserUpdate,
-    current_user: models.User = Depends(get_current_user),
+    current_user: schemas.Identity = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Let the logged-in user update their own profile (name, avatar). Role changes are ignored."""
@@ -1,35 +1,42 @@
 """
 Blog routes: blog post management.
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from .. import crud, models, schemas
 from ..database import get_db
 from ..auth import require_admin
-from ..main_helpers import sanitize_html
+from ..main_helpers import conditional_get, sanitize_html, set_next_cursor
 
 router = APIRouter(tags=["blog"])
 
 
 @router.get("/blog_posts", response_model=List[schemas.BlogPost])
 def read_blog_posts(
+    request: Request, response: Response,
     skip: int = 0, limit: int = 100,
     slug: Optional[str] = None,
-    status: Optional[str] = None, sort_by: Optional[str] = None, order: Optional[str] = "desc",
+    status: Optional[str] = None, sort_by: Optional[str] = None, order: Optional[str] = "desc", cursor: Optional[str] = None,
     db: Session = Depends(get_db),
 ):
-    return crud.get_blog_posts(db, skip=skip, limit=limit, slug=slug, status=status, sort_by=sort_by, order=order)
+    stamp = crud.get_collection_stamp(db, models.BlogPost, slug=slug, status=status)
+    not_modified = conditional_get(request, response, stamp)
+    if not_modified:
+        return not_modified
+    rows = crud.get_blog_posts(db, skip=skip, limit=limit, slug=slug, status=status, sort_by=sort_by, order=order, cursor=cursor)
+    set_next_cursor(response, rows, models.BlogPost, sort_by, order, limit)
+    return rows
 
 
 @router.post("/blog_posts", response_model=schemas.BlogPost)
-def create_blog_post(post: schemas.BlogPostCreate, admin: models.User = Depends(require_admin), db: Session = Depends(get_db)):
+def create_blog_post(post: schemas.BlogPostCreate, admin: schemas.Identity = Depends(require_admin), db: Session = Depends(get_db)):
     return crud.create_blog_post(db=db, post=post, sanitize_fn=sanitize_html)
 
 
 @router.put("/blog_posts/{post_id}", response_model=schemas.BlogPost)
-def update_blog_post(post_id: str, post: schemas.BlogPostUpdate, admin: models.User = Depends(require_admin), db: Session = Depends(get_db)):
+def update_blog_post(post_id: str, post: schemas.BlogPostUpdate, admin: schemas.Identity = Depends(require_admin), db: Session = Depends(get_db)):
     db_post = crud.update_blog_post(db, post_id=post_id, post=post, sanitize_fn=sanitize_html)
     if db_post is None:
         raise HTTPException(status_code=404, detail="Blog post not found")
@@ -37,7 +44,7 @@ def update_blog_post(post_id: str, post: schemas.BlogPostUpdate, admin: models.U
 
 
 @router.delete("/blog_posts/{post_id}")
-def delete_blog_post(post_id: str, admin: models.User = Depends(require_admin), db: Session = Depends(get_db)):
+def delete_blog_post(post_id: str, admin: schemas.Identity = Depends(require_admin), db: Session = Depends(get_db)):
     db_post = crud.delete_blog_post(db, post_id=post_id)
     if db_post is None:
         raise HTTPException(status_code=404, detail="Blog post not found")
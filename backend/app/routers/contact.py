@@ -1,17 +1,21 @@
 """
 Contact routes: public contact form with DB storage + email dispatch.
 """
+import csv
 import html as html_lib
-import os
-from typing import List
-
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
+import io
+import json
+from datetime import datetime, timezone
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from fastapi_mail import FastMail, MessageSchema, MessageType
 
-from .. import models, schemas
-from ..database import get_db
-from ..main_helpers import limiter, build_mail_config
+from .. import crud, crud_async, mailer, models, schemas
+from ..database import SessionLocal, get_async_db, get_db
+from ..main_helpers import limiter, set_next_cursor
 from ..auth import require_admin
 
 router = APIRouter(tags=["contact"])
@@ -22,25 +26,14 @@ router = APIRouter(tags=["contact"])
 async def submit_contact_message(
     request: Request,
     contact: schemas.ContactCreate,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     # Silently reject bot submissions (honeypot field was filled)
     if contact.honeypot:
         return {"message": "Message received successfully"}
 
-    # Save to database
-    db_message = models.ContactMessage(
-        full_name=contact.full_name,
-        contact_number=contact.contact_number,
-        email=contact.email,
-        message=contact.message,
-    )
-    db.add(db_message)
-    db.commit()
-    db.refresh(db_message)
-
-    # Send email notification in background
+    # Notification email is queued in the same transaction as the message;
+    # the mailer resolves the recipient and SMTP settings when it sends
     html = f"""
     <h3>New Message from Website</h3>
     <p><strong>Full Name:</strong> {html_lib.escape(contact.full_name)}</p>
@@ -51,40 +44,100 @@ async def submit_contact_message(
     <p>{html_lib.escape(contact.message)}</p>
     """
 
-    try:
-        mail_conf = build_mail_config(db)
-        recipient_row = db.query(models.Setting).filter(models.Setting.key == "smtp_recipient_email").first()
-        recipient = (recipient_row.value if recipient_row and recipient_row.value else None) or os.getenv("MAIL_FROM", "info@jdgkbsi.ph")
-
-        email_message = MessageSchema(
-            subject=f"New Message from {contact.full_name}",
-            recipients=[recipient],
-            body=html,
-            subtype=MessageType.html,
-        )
-        fm = FastMail(mail_conf)
-        background_tasks.add_task(fm.send_message, email_message)
-    except Exception:
-        pass  # Email failure should not prevent DB save from succeeding
+    notification = mailer.compose_notification(
+        subject=f"New Message from {contact.full_name}",
+        html_body=html,
+    )
+    db_message = await crud_async.create_contact_message(db, contact, outbox=notification)
+    mailer.wake()
 
     return db_message
 
 
 # ── Admin endpoints ──────────────────────────────────────────────────────────
 
+def _message_filters(
+    is_read: Optional[bool] = None,
+    email: Optional[str] = None,
+    submitted_from: Optional[datetime] = None,
+    submitted_to: Optional[datetime] = None,
+) -> dict:
+    return {"is_read": is_read, "email": email, "submitted_from": submitted_from, "submitted_to": submitted_to}
+
+
 @router.get("/contact_messages", response_model=List[schemas.ContactMessageResponse])
 def list_contact_messages(
+    response: Response,
+    skip: int = 0,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    filters: dict = Depends(_message_filters),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_admin),
+    current_user: schemas.Identity = Depends(require_admin),
 ):
-    return db.query(models.ContactMessage).order_by(models.ContactMessage.submitted_at.desc()).all()
+    """
+    Newest first. With neither limit nor cursor every message is returned, as
+    the admin inbox expects; otherwise pages of `limit` (default 100), and the
+    X-Next-Cursor header goes back as ?cursor= for the next page.
+    """
+    if limit is None and cursor is None:
+        return crud.get_contact_messages(db, skip=skip, limit=None, **filters)
+    if limit is None:
+        limit = 100
+    rows = crud.get_contact_messages(db, skip=skip, limit=limit, cursor=cursor, **filters)
+    set_next_cursor(response, rows, models.ContactMessage, None, "desc", limit)
+    return rows
+
+
+# Column order of the CSV export (also the NDJSON field set)
+EXPORT_FIELDS = list(schemas.ContactMessageResponse.model_fields)
+
+
+def _export_rows(fmt: str, filters: dict):
+    # The request's get_db session is closed before a StreamingResponse body
+    # runs, so the export holds its own session for the length of the stream.
+    db = SessionLocal()
+    try:
+        if fmt == "csv":
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            writer.writerow(EXPORT_FIELDS)
+        for message in crud.iter_contact_messages(db, **filters):
+            row = schemas.ContactMessageResponse.model_validate(message).model_dump(mode="json")
+            if fmt == "csv":
+                writer.writerow([row[f] for f in EXPORT_FIELDS])
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+            else:
+                yield json.dumps(row, ensure_ascii=False) + "\n"
+        if fmt == "csv" and buf.tell():
+            yield buf.getvalue()
+    finally:
+        db.close()
+
+
+@router.get("/contact_messages/export")
+def export_contact_messages(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    filters: dict = Depends(_message_filters),
+    current_user: schemas.Identity = Depends(require_admin),
+):
+    """Stream every matching message (same filters as the list) as NDJSON or CSV."""
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"contact_messages-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.{format}"
+    return StreamingResponse(
+        _export_rows(format, filters),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @router.get("/contact_messages/{message_id}", response_model=schemas.ContactMessageResponse)
 def get_contact_message(
     message_id: str,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_admin),
+    current_user: schemas.Identity = Depends(require_admin),
 ):
     msg = db.query(models.ContactMessage).filter(models.ContactMessage.id == message_id).first()
     if not msg:
@@ -96,7 +149,7 @@ def get_contact_message(
 def mark_message_read(
     message_id: str,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_admin),
+    current_user: schemas.Identity = Depends(require_admin),
 ):
     msg = db.query(models.ContactMessage).filter(models.ContactMessage.id == message_id).first()
     if not msg:
@@ -111,7 +164,7 @@ def mark_message_read(
 def delete_contact_message(
     message_id: str,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(require_admin),
+    current_user: schemas.Identity = Depends(require_admin),
 ):
     msg = db.query(models.ContactMessage).filter(models.ContactMessage.id == message_id).first()
     if not msg:
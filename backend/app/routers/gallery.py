@@ -1,32 +1,42 @@
 """
 Gallery items routes.
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from .. import crud, schemas
-from ..database import get_db
+from .. import crud, crud_async, models, schemas
+from ..database import get_async_db, get_db
 from ..auth import require_admin
-from ..main_helpers import sanitize_html
+from ..main_helpers import conditional_get, sanitize_html, set_next_cursor
 
 router = APIRouter(tags=["gallery"])
 
 
 @router.get("/gallery_items", response_model=List[schemas.GalleryItem])
-def read_gallery_items(
+async def read_gallery_items(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 200,
     status: Optional[str] = None,
     category: Optional[str] = None,
     sort_by: Optional[str] = None,
     order: Optional[str] = "asc",
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
 ):
-    return crud.get_gallery_items(
+    stamp = await crud_async.get_collection_stamp(db, models.GalleryItem, status=status, category=category)
+    not_modified = conditional_get(request, response, stamp)
+    if not_modified:
+        return not_modified
+    rows = await crud_async.get_gallery_items(
         db, skip=skip, limit=limit, status=status, category=category,
-        sort_by=sort_by, order=order,
+        sort_by=sort_by, order=order, cursor=cursor,
     )
+    set_next_cursor(response, rows, models.GalleryItem, sort_by, order, limit)
+    return rows
 
 
 @router.get("/gallery_items/{item_id}", response_model=schemas.GalleryItem)
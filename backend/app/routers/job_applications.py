@@ -8,15 +8,16 @@ import os
 import pathlib
 import time
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, Request, UploadFile
-from fastapi_mail import FastMail, MessageSchema, MessageType
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, Response, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from .. import crud, models, schemas
+from .. import crud, crud_async, mailer, models, schemas
 from ..auth import require_admin
-from ..database import get_db
-from ..main_helpers import limiter, build_mail_config
+from ..database import get_async_db, get_db
+from ..main_helpers import limiter, set_next_cursor
+from ..uploads import UploadTooLarge, save_upload
 
 logger = logging.getLogger(__name__)
 
@@ -38,8 +39,7 @@ MAX_RESUME_BYTES = 5 * 1024 * 1024  # 5 MB
 @limiter.limit("5/minute")
 async def submit_job_application(
     request: Request,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     job_id: Optional[str] = Form(None),
     applicant_data: str = Form(...),
     resume: Optional[UploadFile] = File(None),
@@ -57,10 +57,7 @@ async def submit_job_application(
 
     # Clear job_id if it references a non-existent listing (e.g. fallback jobs)
     if payload.get("job_id"):
-        exists = db.query(models.JobListing).filter(
-            models.JobListing.id == payload["job_id"]
-        ).first()
-        if not exists:
+        if not await crud_async.job_listing_exists(db, payload["job_id"]):
             logger.info("Job application: job_id '%s' not found, setting to null", payload["job_id"])
             payload["job_id"] = None
 
@@ -98,53 +95,36 @@ async def submit_job_application(
             *ALLOWED_RESUME_MIMES, "application/octet-stream",
         ):
             logger.warning("Job application: unexpected MIME '%s' (file: %s, ext: %s)", resume.content_type, resume.filename, ext)
-        contents = await resume.read()
-        if len(contents) > MAX_RESUME_BYTES:
-            logger.warning("Job application: resume too large (%d bytes)", len(contents))
-            raise HTTPException(status_code=400, detail="Resume must be 5 MB or less")
-
-        os.makedirs(UPLOAD_DIR, exist_ok=True)
         timestamp = int(time.time())
         safe_name = pathlib.Path(resume.filename).name.replace(" ", "_")
         filename = f"{timestamp}_{safe_name}"
         file_path = os.path.join(UPLOAD_DIR, filename)
-        with open(file_path, "wb") as f:
-            f.write(contents)
+        try:
+            await save_upload(resume, file_path, MAX_RESUME_BYTES)
+        except UploadTooLarge:
+            logger.warning("Job application: resume too large (> %d bytes)", MAX_RESUME_BYTES)
+            raise HTTPException(status_code=400, detail="Resume must be 5 MB or less")
         resume_url = f"/{file_path}"
 
-    db_app = crud.create_job_application(db, data=app_schema, resume_url=resume_url)
-
-    # Send email notification to admin (fire-and-forget)
-    try:
-        mail_conf = build_mail_config(db)
-        recipient_row = db.query(models.Setting).filter(
-            models.Setting.key == "smtp_recipient_email"
-        ).first()
-        recipient = (
-            (recipient_row.value if recipient_row and recipient_row.value else None)
-            or os.getenv("MAIL_FROM", "info@jdgkbsi.ph")
-        )
-        applicant_name = f"{app_schema.first_name} {app_schema.last_name}"
-        html_body = f"""
-        <h3>New Job Application Received</h3>
-        <p><strong>Applicant:</strong> {html_lib.escape(applicant_name)}</p>
-        <p><strong>Email:</strong> {html_lib.escape(app_schema.email)}</p>
-        <p><strong>Mobile:</strong> {html_lib.escape(app_schema.mobile)}</p>
-        <p><strong>Job ID:</strong> {html_lib.escape(app_schema.job_id or 'N/A')}</p>
-        <p><strong>Resume:</strong> {'Attached' if resume_url else 'Not provided'}</p>
-        <br>
-        <p>Log into the admin panel to review the full application.</p>
-        """
-        message = MessageSchema(
-            subject=f"New Job Application from {applicant_name}",
-            recipients=[recipient],
-            body=html_body,
-            subtype=MessageType.html,
-        )
-        fm = FastMail(mail_conf)
-        background_tasks.add_task(fm.send_message, message)
-    except Exception:
-        pass  # Email failure must never block the applicant's submission
+    # Notification email is queued in the same transaction as the application;
+    # the mailer resolves the recipient and SMTP settings when it sends
+    applicant_name = f"{app_schema.first_name} {app_schema.last_name}"
+    html_body = f"""
+    <h3>New Job Application Received</h3>
+    <p><strong>Applicant:</strong> {html_lib.escape(applicant_name)}</p>
+    <p><strong>Email:</strong> {html_lib.escape(app_schema.email)}</p>
+    <p><strong>Mobile:</strong> {html_lib.escape(app_schema.mobile)}</p>
+    <p><strong>Job ID:</strong> {html_lib.escape(app_schema.job_id or 'N/A')}</p>
+    <p><strong>Resume:</strong> {'Attached' if resume_url else 'Not provided'}</p>
+    <br>
+    <p>Log into the admin panel to review the full application.</p>
+    """
+    notification = mailer.compose_notification(
+        subject=f"New Job Application from {applicant_name}",
+        html_body=html_body,
+    )
+    db_app = await crud_async.create_job_application(db, data=app_schema, resume_url=resume_url, outbox=notification)
+    mailer.wake()
 
     return db_app
 
@@ -153,14 +133,18 @@ async def submit_job_application(
 
 @router.get("/job_applications", response_model=List[schemas.JobApplicationResponse])
 def list_job_applications(
+    response: Response,
     job_id: Optional[str] = None,
     status: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
-    admin: models.User = Depends(require_admin),
+    cursor: Optional[str] = None,
+    admin: schemas.Identity = Depends(require_admin),
     db: Session = Depends(get_db),
 ):
-    return crud.get_job_applications(db, job_id=job_id, status=status, skip=skip, limit=limit)
+    rows = crud.get_job_applications(db, job_id=job_id, status=status, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, rows, models.JobApplication, None, "desc", limit)
+    return rows
 
 
 # ── Admin: get single application ────────────────────────────────────────────
@@ -168,7 +152,7 @@ def list_job_applications(
 @router.get("/job_applications/{app_id}", response_model=schemas.JobApplicationResponse)
 def get_job_application(
     app_id: str,
-    admin: models.User = Depends(require_admin),
+    admin: schemas.Identity = Depends(require_admin),
     db: Session = Depends(get_db),
 ):
     db_app = crud.get_job_application(db, app_id)
@@ -183,7 +167,7 @@ def get_job_application(
 def update_job_application(
     app_id: str,
     update: schemas.JobApplicationUpdate,
-    admin: models.User = Depends(require_admin),
+    admin: schemas.Identity = Depends(require_admin),
     db: Session = Depends(get_db),
 ):
     db_app = crud.update_job_application(db, app_id, update)
@@ -197,7 +181,7 @@ def update_job_application(
 @router.delete("/job_applications/{app_id}")
 def delete_job_application(
     app_id: str,
-    admin: models.User = Depends(require_admin),
+    admin: schemas.Identity = Depends(require_admin),
     db: Session = Depends(get_db),
 ):
     db_app = crud.delete_job_application(db, app_id)
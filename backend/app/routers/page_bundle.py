@@ -0,0 +1,75 @@
+"""
+Page bundle route: everything needed to render one public page in a single round trip.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+
+from .. import crud_async, models, schemas, settings_snapshot
+from ..cache import cached_call_async
+from ..database import get_async_db
+from ..main_helpers import conditional_get
+
+router = APIRouter(tags=["page_bundle"])
+
+BundleCollection = Literal["services", "testimonials", "team_members", "gallery_items"]
+
+# Collection name → (model, crud list function, filters shared by the stamp and the list query)
+_COLLECTIONS = {
+    "services": (models.Service, crud_async.get_services, {}),
+    "testimonials": (models.Testimonial, crud_async.get_testimonials, {}),
+    "team_members": (models.TeamMember, crud_async.get_team_members, {}),
+    "gallery_items": (models.GalleryItem, crud_async.get_gallery_items, {"status": "published"}),
+}
+
+
+async def _load_bundle(db: AsyncSession, page: models.Page, include: list[str]) -> schemas.PageBundle:
+    blocks = await crud_async.get_content_blocks(db, status="published", page_slug=page.slug)
+    settings = list((await settings_snapshot.current_async(db)).public)
+    extra = {}
+    for name in include:
+        _, get_rows, filters = _COLLECTIONS[name]
+        extra[name] = await get_rows(db, **filters)
+    return schemas.PageBundle(page=page, content_blocks=blocks, settings=settings, **extra)
+
+
+@router.get("/page_bundle/{slug}", response_model=schemas.PageBundle)
+async def read_page_bundle(
+    slug: str,
+    request: Request,
+    response: Response,
+    include: Optional[List[BundleCollection]] = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Return a page, its published content blocks, the public settings and any
+    requested collections (?include=services&include=team_members).
+
+    Served from the query cache as a unit; any write to one of the tables it
+    reads invalidates it.
+    """
+    include = sorted(set(include or []))
+    tables = ["pages", "content_blocks", "settings", *include]
+
+    stamps = [
+        await crud_async.get_collection_stamp(db, models.Page, slug=slug),
+        await crud_async.get_collection_stamp(db, models.ContentBlock, status="published", page_assignments=slug),
+        await crud_async.get_collection_stamp(db, models.Setting),
+    ]
+    for name in include:
+        model, _, filters = _COLLECTIONS[name]
+        stamps.append(await crud_async.get_collection_stamp(db, model, **filters))
+    modified = [ts for _, ts in stamps if ts is not None]
+    stamp = (sum(count for count, _ in stamps), max(modified) if modified else None)
+    not_modified = conditional_get(request, response, stamp)
+    if not_modified:
+        return not_modified
+
+    pages = await crud_async.get_pages(db, slug=slug)
+    if not pages:
+        raise HTTPException(status_code=404, detail="Page not found")
+    return await cached_call_async(
+        ("read_page_bundle", slug, tuple(include)),
+        tables,
+        lambda: _load_bundle(db, pages[0], include),
+    )
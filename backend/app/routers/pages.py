@@ -1,35 +1,43 @@
 """
 Pages routes: CMS page management.
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud, crud_async, models, schemas
+from ..database import get_async_db, get_db
 from ..auth import require_admin
-from ..main_helpers import sanitize_html
+from ..main_helpers import conditional_get, sanitize_html, set_next_cursor
 
 router = APIRouter(tags=["pages"])
 
 
 @router.get("/pages", response_model=List[schemas.Page])
-def read_pages(
+async def read_pages(
+    request: Request, response: Response,
     skip: int = 0, limit: int = 100,
     status: Optional[str] = None, slug: Optional[str] = None,
-    sort_by: Optional[str] = None, order: Optional[str] = "asc",
-    db: Session = Depends(get_db),
+    sort_by: Optional[str] = None, order: Optional[str] = "asc", cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
 ):
-    return crud.get_pages(db, skip=skip, limit=limit, status=status, slug=slug, sort_by=sort_by, order=order)
+    stamp = await crud_async.get_collection_stamp(db, models.Page, status=status, slug=slug)
+    not_modified = conditional_get(request, response, stamp)
+    if not_modified:
+        return not_modified
+    rows = await crud_async.get_pages(db, skip=skip, limit=limit, status=status, slug=slug, sort_by=sort_by, order=order, cursor=cursor)
+    set_next_cursor(response, rows, models.Page, sort_by, order, limit)
+    return rows
 
 
 @router.post("/pages", response_model=schemas.Page)
-def create_page(page: schemas.PageCreate, admin: models.User = Depends(require_admin), db: Session = Depends(get_db)):
+def create_page(page: schemas.PageCreate, admin: schemas.Identity = Depends(require_admin), db: Session = Depends(get_db)):
     return crud.create_page(db=db, page=page, sanitize_fn=sanitize_html)
 
 
 @router.put("/pages/{page_id}", response_model=schemas.Page)
-def update_page(page_id: str, page: schemas.PageUpdate, admin: models.User = Depends(require_admin), db: Session = Depends(get_db)):
+def update_page(page_id: str, page: schemas.PageUpdate, admin: schemas.Identity = Depends(require_admin), db: Session = Depends(get_db)):
     db_page = crud.update_page(db, page_id=page_id, page=page, sanitize_fn=sanitize_html)
     if db_page is None:
         raise HTTPException(status_code=404, detail="Page not found")
@@ -37,7 +45,7 @@ def update_page(page_id: str, page: schemas.PageUpdate, admin: models.User = Dep
 
 
 @router.delete("/pages/{page_id}")
-def delete_page(page_id: str, admin: models.User = Depends(require_admin), db: Session = Depends(get_db)):
+def delete_page(page_id: str, admin: schemas.Identity = Depends(require_admin), db: Session = Depends(get_db)):
     db_page = crud.delete_page(db, page_id=page_id)
     if db_page is None:
         raise HTTPException(status_code=404, detail="Page not found")
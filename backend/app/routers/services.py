@@ -1,35 +1,43 @@
 """
 Services routes: business service management.
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud, crud_async, models, schemas
+from ..database import get_async_db, get_db
 from ..auth import require_admin
-from ..main_helpers import sanitize_html
+from ..main_helpers import conditional_get, sanitize_html, set_next_cursor
 
 router = APIRouter(tags=["services"])
 
 
 @router.get("/services", response_model=List[schemas.Service])
-def read_services(
+async def read_services(
+    request: Request, response: Response,
     skip: int = 0, limit: int = 100,
     slug: Optional[str] = None,
-    sort_by: Optional[str] = None, order: Optional[str] = "asc",
-    db: Session = Depends(get_db),
+    sort_by: Optional[str] = None, order: Optional[str] = "asc", cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
 ):
-    return crud.get_services(db, skip=skip, limit=limit, slug=slug, sort_by=sort_by, order=order)
+    stamp = await crud_async.get_collection_stamp(db, models.Service, slug=slug)
+    not_modified = conditional_get(request, response, stamp)
+    if not_modified:
+        return not_modified
+    rows = await crud_async.get_services(db, skip=skip, limit=limit, slug=slug, sort_by=sort_by, order=order, cursor=cursor)
+    set_next_cursor(response, rows, models.Service, sort_by, order, limit)
+    return rows
 
 
 @router.post("/services", response_model=schemas.Service)
-def create_service(service: schemas.ServiceCreate, admin: models.User = Depends(require_admin), db: Session = Depends(get_db)):
+def create_service(service: schemas.ServiceCreate, admin: schemas.Identity = Depends(require_admin), db: Session = Depends(get_db)):
     return crud.create_service(db=db, service=service, sanitize_fn=sanitize_html)
 
 
 @router.put("/services/{service_id}", response_model=schemas.Service)
-def update_service(service_id: str, service: schemas.ServiceUpdate, admin: models.User = Depends(require_admin), db: Session = Depends(get_db)):
+def update_service(service_id: str, service: schemas.ServiceUpdate, admin: schemas.Identity = Depends(require_admin), db: Session = Depends(get_db)):
     db_service = crud.update_service(db, service_id=service_id, service=service, sanitize_fn=sanitize_html)
     if db_service is None:
         raise HTTPException(status_code=404, detail="Service not found")
@@ -37,7 +45,7 @@ def update_service(service_id: str, service: schemas.ServiceUpdate, admin: model
 
 
 @router.delete("/services/{service_id}")
-def delete_service(service_id: str, admin: models.User = Depends(require_admin), db: Session = Depends(get_db)):
+def delete_service(service_id: str, admin: schemas.Identity = Depends(require_admin), db: Session = Depends(get_db)):
     db_service = crud.delete_service(db, service_id=service_id)
     if db_service is None:
         raise HTTPException(status_code=404, detail="Service not found")
@@ -1,23 +1,25 @@
 """
-Storage routes: file upload endpoint.
+Storage routes: file upload endpoints (single request and resumable), stored
+content-addressed via app/blobstore.py, plus orphan blob collection.
 """
 import os
-import shutil
 import time
 import pathlib
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, Response, UploadFile, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from typing import Optional
 
-from .. import models
-from ..database import get_db
-from ..auth import get_current_user
+from .. import blobstore, schemas, uploads
+from ..auth import get_current_user, require_admin
+from ..database import get_async_db
 from ..main_helpers import limiter
 
 router = APIRouter(tags=["storage"])
 
 UPLOAD_DIR = "uploads"
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".pdf", ".ico"}
 ALLOWED_MIMES = {
     "image/jpeg", "image/png", "image/gif", "image/webp", "image/svg+xml",
@@ -25,6 +27,48 @@ ALLOWED_MIMES = {
 }
 
 
+def _destination(filename: str, path: Optional[str], content_type: Optional[str] = None) -> str:
+    """Validate the file type and resolve the target path inside UPLOAD_DIR."""
+    ext = pathlib.Path(filename or "").suffix.lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=f"File type '{ext}' not allowed. Allowed: {', '.join(ALLOWED_EXTENSIONS)}")
+
+    if content_type and content_type not in ALLOWED_MIMES:
+        raise HTTPException(status_code=400, detail=f"MIME type '{content_type}' not allowed")
+
+    if not path or path.endswith("/"):
+        timestamp = int(time.time())
+        file_path = os.path.join(UPLOAD_DIR, path or "", f"{timestamp}_{filename}")
+    else:
+        clean_path = path.replace("..", "").lstrip("/")
+        file_path = os.path.join(UPLOAD_DIR, clean_path)
+
+    resolved = os.path.realpath(file_path)
+    upload_root = os.path.realpath(UPLOAD_DIR)
+    if not resolved.startswith(upload_root):
+        raise HTTPException(status_code=400, detail="Invalid file path")
+    if blobstore.is_reserved_path(blobstore.logical_path(file_path)):
+        raise HTTPException(status_code=400, detail="Invalid file path")
+    return file_path
+
+
+def _uploaded(stored: blobstore.StoredUpload) -> dict:
+    # publicUrl is content-addressed and cached forever; path is the logical alias
+    return {
+        "publicUrl": stored.url,
+        "path": f"/uploads/{stored.path}",
+        "size": stored.size,
+        "sha256": stored.sha256,
+    }
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File exceeds the {UPLOAD_MAX_BYTES} byte upload limit",
+    )
+
+
 @router.post("/storage/upload")
 @limiter.limit("20/minute")
 async def upload_file(
@@ -32,38 +76,142 @@ async def upload_file(
     file: UploadFile = File(...),
     path: Optional[str] = Form(None),
     bucket: Optional[str] = Form(None),
-    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Identity = Depends(get_current_user),
 ):
     try:
-        ext = pathlib.Path(file.filename or "").suffix.lower()
-        if ext not in ALLOWED_EXTENSIONS:
-            raise HTTPException(status_code=400, detail=f"File type '{ext}' not allowed. Allowed: {', '.join(ALLOWED_EXTENSIONS)}")
+        file_path = _destination(file.filename, path, file.content_type)
+        tmp_path, saved = await uploads.stage_upload(file, blobstore.BLOB_DIR, UPLOAD_MAX_BYTES)
+        stored = await blobstore.store(
+            db, tmp_path, saved, file_path, pathlib.Path(file.filename).suffix.lower(), file.content_type,
+        )
+        return _uploaded(stored)
 
-        if file.content_type and file.content_type not in ALLOWED_MIMES:
-            raise HTTPException(status_code=400, detail=f"MIME type '{file.content_type}' not allowed")
+    except uploads.UploadTooLarge:
+        raise _too_large()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        if not path or path.endswith("/"):
-            timestamp = int(time.time())
-            filename = f"{timestamp}_{file.filename}"
-            file_path = os.path.join(UPLOAD_DIR, path or "", filename)
-        else:
-            clean_path = path.replace("..", "").lstrip("/")
-            file_path = os.path.join(UPLOAD_DIR, clean_path)
 
-        resolved = os.path.realpath(file_path)
-        upload_root = os.path.realpath(UPLOAD_DIR)
-        if not resolved.startswith(upload_root):
-            raise HTTPException(status_code=400, detail="Invalid file path")
+# ── Resumable uploads ─────────────────────────────────────────────────────────
+# POST   /storage/uploads                 start → {upload_id, offset: 0}
+# PUT    /storage/uploads/{id}?offset=N   append the raw request body at byte N
+# GET    /storage/uploads/{id}            bytes received so far (to resume)
+# POST   /storage/uploads/{id}/complete   verify (optional sha256) and publish
+# DELETE /storage/uploads/{id}            abandon
 
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+def _owned_session(upload_id: str, user: schemas.Identity) -> tuple[dict, int]:
+    try:
+        meta, offset = uploads.read_session(upload_id)
+    except uploads.UploadSessionNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if meta["user_id"] != user.id:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return meta, offset
 
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
 
-        relative_path = os.path.relpath(file_path, UPLOAD_DIR).replace("\\", "/")
-        return {"publicUrl": f"/uploads/{relative_path}"}
+@router.post("/storage/uploads", status_code=status.HTTP_201_CREATED)
+@limiter.limit("20/minute")
+async def start_upload(
+    request: Request,
+    filename: str = Form(...),
+    path: Optional[str] = Form(None),
+    size: Optional[int] = Form(None),
+    content_type: Optional[str] = Form(None),
+    current_user: schemas.Identity = Depends(get_current_user),
+):
+    """Start a resumable upload; the destination is validated now, not at completion."""
+    file_path = _destination(filename, path, content_type)
+    if size is not None and size > UPLOAD_MAX_BYTES:
+        raise _too_large()
+    upload_id = await run_in_threadpool(
+        uploads.create_session,
+        {"user_id": current_user.id, "file_path": file_path, "filename": filename, "content_type": content_type},
+    )
+    return {"upload_id": upload_id, "offset": 0, "max_bytes": UPLOAD_MAX_BYTES}
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/storage/uploads/{upload_id}")
+async def get_upload(upload_id: str, current_user: schemas.Identity = Depends(get_current_user)):
+    _, offset = await run_in_threadpool(_owned_session, upload_id, current_user)
+    return {"upload_id": upload_id, "offset": offset}
+
+
+@router.put("/storage/uploads/{upload_id}")
+async def append_upload(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    current_user: schemas.Identity = Depends(get_current_user),
+):
+    """Append the request body. A wrong offset returns 409 with the expected one."""
+    await run_in_threadpool(_owned_session, upload_id, current_user)
+    try:
+        new_offset = await uploads.append_to_session(upload_id, request.stream(), offset, UPLOAD_MAX_BYTES)
+    except uploads.UploadSessionNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except uploads.UploadOffsetMismatch as e:
+        raise HTTPException(status_code=409, detail={"message": "Offset mismatch", "offset": e.expected})
+    except uploads.UploadSessionBusy:
+        raise HTTPException(status_code=409, detail="Upload is busy with another request")
+    except uploads.UploadTooLarge:
+        raise _too_large()
+    return {"upload_id": upload_id, "offset": new_offset}
+
+
+@router.post("/storage/uploads/{upload_id}/complete")
+async def complete_upload(
+    upload_id: str,
+    sha256: Optional[str] = Form(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.Identity = Depends(get_current_user),
+):
+    meta, _ = await run_in_threadpool(_owned_session, upload_id, current_user)
+    staged = await run_in_threadpool(blobstore.staging_path)
+    try:
+        saved = await uploads.complete_session(upload_id, staged, sha256)
+    except uploads.UploadSessionNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except uploads.UploadSessionBusy:
+        raise HTTPException(status_code=409, detail="Upload is busy with another request")
+    except uploads.UploadChecksumMismatch as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    stored = await blobstore.store(
+        db, staged, saved, meta["file_path"], pathlib.Path(meta["filename"]).suffix.lower(), meta["content_type"],
+    )
+    return _uploaded(stored)
+
+
+@router.delete("/storage/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload(upload_id: str, current_user: schemas.Identity = Depends(get_current_user)):
+    await run_in_threadpool(_owned_session, upload_id, current_user)
+    await run_in_threadpool(uploads.abort_session, upload_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+# ── Logical paths & garbage collection ────────────────────────────────────────
+
+@router.delete("/storage/files", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_file(
+    path: str = Query(..., description="Logical path, e.g. gallery/logo.png or /uploads/gallery/logo.png"),
+    db: AsyncSession = Depends(get_async_db),
+    admin: schemas.Identity = Depends(require_admin),
+):
+    """Drop a logical path. Its blob (and publicUrl) lives on until GC finds it unreferenced."""
+    clean_path = path.removeprefix("/uploads/").replace("..", "").lstrip("/")
+    if not clean_path or blobstore.is_reserved_path(clean_path):
+        raise HTTPException(status_code=400, detail="Invalid file path")
+    if not await blobstore.remove(db, os.path.join(UPLOAD_DIR, clean_path)):
+        raise HTTPException(status_code=404, detail="File not found")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post("/admin/storage/gc")
+async def collect_orphan_blobs(
+    db: AsyncSession = Depends(get_async_db),
+    admin: schemas.Identity = Depends(require_admin),
+):
+    """Delete blobs no logical path has referenced for BLOB_GC_GRACE_SECONDS."""
+    return await blobstore.collect_garbage(db)
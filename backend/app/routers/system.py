@@ -0,0 +1,38 @@
+"""
+System routes: operational diagnostics — admin only.
+"""
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import schemas
+from ..auth import require_admin
+from ..database import get_async_db, pool_stats
+from ..mailer import mailer_metrics
+from ..main_helpers import limiter
+from ..passwords import hasher_metrics
+
+router = APIRouter(tags=["system"])
+
+
+@router.get("/admin/db_pool")
+def read_db_pool_stats(admin: schemas.Identity = Depends(require_admin)):
+    """Connection pool gauges, checkout wait / connection age histograms and counters per engine."""
+    return pool_stats()
+
+
+@router.get("/admin/mail_queue")
+async def read_mail_queue_stats(admin: schemas.Identity = Depends(require_admin), db: AsyncSession = Depends(get_async_db)):
+    """Outbox queue depth and oldest pending age, plus this worker's sender counters."""
+    return await mailer_metrics.snapshot(db)
+
+
+@router.get("/admin/password_hasher")
+def read_password_hasher_stats(admin: schemas.Identity = Depends(require_admin)):
+    """bcrypt pool size, queue limit, in-flight / rejected counts and average hash vs. wait time for this worker."""
+    return hasher_metrics.snapshot()
+
+
+@router.get("/admin/rate_limits")
+def read_rate_limit_stats(admin: schemas.Identity = Depends(require_admin)):
+    """Rate-limit storage and strategy, plus this worker's allowed / rejected counts per route."""
+    return limiter.stats()
@@ -2,14 +2,15 @@
 Team members routes.
 """
 import json
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud, crud_async, models, schemas
+from ..database import get_async_db, get_db
 from ..auth import require_admin
-from ..main_helpers import sanitize_html
+from ..main_helpers import conditional_get, sanitize_html, set_next_cursor
 
 router = APIRouter(tags=["team"])
 
@@ -40,13 +41,19 @@ def _serialize_json_arrays(data: dict) -> dict:
 
 
 @router.get("/team_members", response_model=List[schemas.TeamMember])
-def read_team_members(
+async def read_team_members(
+    request: Request, response: Response,
     skip: int = 0, limit: int = 100,
-    sort_by: Optional[str] = None, order: Optional[str] = "asc",
-    db: Session = Depends(get_db),
+    sort_by: Optional[str] = None, order: Optional[str] = "asc", cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
 ):
-    members = crud.get_team_members(db, skip=skip, limit=limit, sort_by=sort_by, order=order)
-    return [_deserialize_json_arrays(m) for m in members]
+    stamp = await crud_async.get_collection_stamp(db, models.TeamMember)
+    not_modified = conditional_get(request, response, stamp)
+    if not_modified:
+        return not_modified
+    members = await crud_async.get_team_members(db, skip=skip, limit=limit, sort_by=sort_by, order=order, cursor=cursor)
+    set_next_cursor(response, members, models.TeamMember, sort_by, order, limit)
+    return members
 
 
 @router.get("/team_members/{member_id}", response_model=schemas.TeamMember)
@@ -59,14 +66,14 @@ def read_team_member(member_id: str, db: Session = Depends(get_db)):
 
 
 @router.post("/team_members", response_model=schemas.TeamMember)
-def create_team_member(member: schemas.TeamMemberCreate, admin: models.User = Depends(require_admin), db: Session = Depends(get_db)):
+def create_team_member(member: schemas.TeamMemberCreate, admin: schemas.Identity = Depends(require_admin), db: Session = Depends(get_db)):
     return _deserialize_json_arrays(
         crud.create_team_member(db=db, member=member, sanitize_fn=sanitize_html, serialize_fn=_serialize_json_arrays)
     )
 
 
 @router.put("/team_members/{member_id}", response_model=schemas.TeamMember)
-def update_team_member(member_id: str, member: schemas.TeamMemberUpdate, admin: models.User = Depends(require_admin), db: Session = Depends(get_db)):
+def update_team_member(member_id: str, member: schemas.TeamMemberUpdate, admin: schemas.Identity = Depends(require_admin), db: Session = Depends(get_db)):
     db_member = crud.update_team_member(db, member_id=member_id, member=member, sanitize_fn=sanitize_html, serialize_fn=_serialize_json_arrays)
     if db_member is None:
         raise HTTPException(status_code=404, detail="Team member not found")
@@ -74,7 +81,7 @@ def update_team_member(member_id: str, member: schemas.TeamMemberUpdate, admin:
 
 
 @router.delete("/team_members/{member_id}")
-def delete_team_member(member_id: str, admin: models.User = Depends(require_admin), db: Session = Depends(get_db)):
+def delete_team_member(member_id: str, admin: schemas.Identity = Depends(require_admin), db: Session = Depends(get_db)):
     db_member = crud.delete_team_member(db, member_id=member_id)
     if db_member is None:
         raise HTTPException(status_code=404, detail="Team member not found")
@@ -1,34 +1,42 @@
 """
 Testimonials routes.
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from .. import crud, models, schemas
-from ..database import get_db
+from .. import crud, crud_async, models, schemas
+from ..database import get_async_db, get_db
 from ..auth import require_admin
-from ..main_helpers import sanitize_html
+from ..main_helpers import conditional_get, sanitize_html, set_next_cursor
 
 router = APIRouter(tags=["testimonials"])
 
 
 @router.get("/testimonials", response_model=List[schemas.Testimonial])
-def read_testimonials(
+async def read_testimonials(
+    request: Request, response: Response,
     skip: int = 0, limit: int = 100,
-    sort_by: Optional[str] = None, order: Optional[str] = "asc",
-    db: Session = Depends(get_db),
+    sort_by: Optional[str] = None, order: Optional[str] = "asc", cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
 ):
-    return crud.get_testimonials(db, skip=skip, limit=limit, sort_by=sort_by, order=order)
+    stamp = await crud_async.get_collection_stamp(db, models.Testimonial)
+    not_modified = conditional_get(request, response, stamp)
+    if not_modified:
+        return not_modified
+    rows = await crud_async.get_testimonials(db, skip=skip, limit=limit, sort_by=sort_by, order=order, cursor=cursor)
+    set_next_cursor(response, rows, models.Testimonial, sort_by, order, limit)
+    return rows
 
 
 @router.post("/testimonials", response_model=schemas.Testimonial)
-def create_testimonial(testimonial: schemas.TestimonialCreate, admin: models.User = Depends(require_admin), db: Session = Depends(get_db)):
+def create_testimonial(testimonial: schemas.TestimonialCreate, admin: schemas.Identity = Depends(require_admin), db: Session = Depends(get_db)):
     return crud.create_testimonial(db=db, testimonial=testimonial, sanitize_fn=sanitize_html)
 
 
 @router.put("/testimonials/{testimonial_id}", response_model=schemas.Testimonial)
-def update_testimonial(testimonial_id: str, testimonial: schemas.TestimonialUpdate, admin: models.User = Depends(require_admin), db: Session = Depends(get_db)):
+def update_testimonial(testimonial_id: str, testimonial: schemas.TestimonialUpdate, admin: schemas.Identity = Depends(require_admin), db: Session = Depends(get_db)):
     db_testimonial = crud.update_testimonial(db, testimonial_id=testimonial_id, testimonial=testimonial, sanitize_fn=sanitize_html)
     if db_testimonial is None:
         raise HTTPException(status_code=404, detail="Testimonial not found")
@@ -36,7 +44,7 @@ def update_testimonial(testimonial_id: str, testimonial: schemas.TestimonialUpda
 
 
 @router.delete("/testimonials/{testimonial_id}")
-def delete_testimonial(testimonial_id: str, admin: models.User = Depends(require_admin), db: Session = Depends(get_db)):
+def delete_testimonial(testimonial_id: str, admin: schemas.Identity = Depends(require_admin), db: Session = Depends(get_db)):
     db_testimonial = crud.delete_testimonial(db, testimonial_id=testimonial_id)
     if db_testimonial is None:
         raise HTTPException(status_code=404, detail="Testimonial not found")
@@ -1,8 +1,11 @@
-from pydantic import BaseModel, ConfigDict, EmailStr, field_validator
+from pydantic import BaseModel, ConfigDict, EmailStr, computed_field, field_validator
 from typing import List, Literal, Optional, Any, Dict
 from datetime import datetime
+import json
 import re
 
+from . import images
+
 
 # ── Shared sanitization helpers ──────────────────────────────────────────────
 
@@ -52,6 +55,11 @@ class User(UserBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+class Identity(User):
+    """The authenticated user as the auth dependencies return it: read-only, no credentials."""
+
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
 class PageBase(BaseModel):
     title: str
     slug: str
@@ -122,6 +130,12 @@ class Service(ServiceBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+    # {format: srcset} of resized variants, for <picture><source type="image/…" srcset>
+    @computed_field
+    @property
+    def image_srcset(self) -> Optional[Dict[str, str]]:
+        return images.srcset(self.image_url)
+
 class BlogPostBase(BaseModel):
     title: str
     slug: str
@@ -162,6 +176,11 @@ class BlogPost(BlogPostBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+    @computed_field
+    @property
+    def featured_image_srcset(self) -> Optional[Dict[str, str]]:
+        return images.srcset(self.featured_image)
+
 class JobListingBase(BaseModel):
     title: str
     department: Optional[str] = None
@@ -284,6 +303,27 @@ class TeamMember(TeamMemberBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+    @field_validator("expertise", "achievements", mode="before")
+    @classmethod
+    def parse_json_list(cls, v):
+        """The columns hold JSON-encoded lists; unreadable or missing values become []."""
+        if isinstance(v, str):
+            try:
+                v = json.loads(v)
+            except ValueError:
+                return []
+        return [] if v is None else v
+
+    @computed_field
+    @property
+    def avatar_srcset(self) -> Optional[Dict[str, str]]:
+        return images.srcset(self.avatar_url)
+
+    @computed_field
+    @property
+    def cover_image_srcset(self) -> Optional[Dict[str, str]]:
+        return images.srcset(self.cover_image_url)
+
 class SettingBase(BaseModel):
     key: str
     value: Optional[str] = None
@@ -321,6 +361,11 @@ class GalleryItem(GalleryItemBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+    @computed_field
+    @property
+    def image_srcset(self) -> Optional[Dict[str, str]]:
+        return images.srcset(self.image_url)
+
 class SettingCreate(SettingBase):
     pass
 
@@ -549,3 +594,16 @@ class JobApplicationResponse(JobApplicationCreate):
     updated_at: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
+
+
+# --- Page bundle ---
+
+class PageBundle(BaseModel):
+    """Everything needed to render one public page, returned in a single response."""
+    page: Page
+    content_blocks: List[ContentBlock]
+    settings: List[Setting]
+    services: Optional[List[Service]] = None
+    testimonials: Optional[List[Testimonial]] = None
+    team_members: Optional[List[TeamMember]] = None
+    gallery_items: Optional[List[GalleryItem]] = None
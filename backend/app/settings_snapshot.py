@@ -0,0 +1,105 @@
+"""
+settings_snapshot.py — Process-wide, read-only snapshot of the settings table.
+
+Centralizes: SettingsSnapshot (every value, the precomputed public view, the
+mail ConnectionConfig and the notification recipient) and current() /
+current_async(), which load it once per process and then serve it with no
+query until a settings write (local or on another worker, via cache_bus)
+drops it. The mail config is only built when first used, so a bad SMTP
+setting affects sending mail and nothing else.
+"""
+import logging
+import os
+from dataclasses import dataclass
+from functools import cached_property
+from types import MappingProxyType
+from typing import Iterable, Mapping, Optional
+
+from fastapi_mail import ConnectionConfig
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from . import cache_bus, models, schemas
+from .main_helpers import mail_config_from_settings
+
+logger = logging.getLogger("jdgk-api")
+
+# Sensitive keys never returned to unauthenticated users
+SENSITIVE_SETTING_KEYS = frozenset({
+    "recaptcha_secret_key",
+    "google_maps_api_key",
+    "smtp_password",
+    "smtp_username",
+})
+
+
+@dataclass(frozen=True)
+class SettingsSnapshot:
+    values: Mapping[str, Optional[str]]
+    public: tuple[schemas.Setting, ...]
+    recipient: str
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[models.Setting]) -> "SettingsSnapshot":
+        rows = list(rows)
+        values = {row.key: row.value for row in rows}
+        return cls(
+            values=MappingProxyType(values),
+            public=tuple(
+                schemas.Setting.model_validate(row) for row in rows if row.key not in SENSITIVE_SETTING_KEYS
+            ),
+            recipient=values.get("smtp_recipient_email") or os.getenv("MAIL_FROM", "info@jdgkbsi.ph"),
+        )
+
+    @cached_property
+    def mail_config(self) -> ConnectionConfig:
+        """SMTP config from the settings; invalid values fall back to the environment, as build_mail_config does."""
+        try:
+            return mail_config_from_settings(self.values)
+        except Exception as exc:
+            logger.warning("Invalid SMTP settings, using the environment's: %s", exc)
+            return mail_config_from_settings({})
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        return self.values.get(key, default)
+
+
+_snapshot: Optional[SettingsSnapshot] = None
+# Bumped on every invalidation; a load that raced with a write is not stored
+_generation = 0
+
+
+def _store(generation: int, snapshot: SettingsSnapshot) -> SettingsSnapshot:
+    global _snapshot
+    if generation == _generation:
+        _snapshot = snapshot
+    return snapshot
+
+
+def current(db: Session) -> SettingsSnapshot:
+    """The current snapshot, loading it with one query if it was invalidated."""
+    snapshot = _snapshot
+    if snapshot is not None:
+        return snapshot
+    generation = _generation
+    return _store(generation, SettingsSnapshot.from_rows(db.scalars(select(models.Setting))))
+
+
+async def current_async(db: AsyncSession) -> SettingsSnapshot:
+    """current() for an AsyncSession."""
+    snapshot = _snapshot
+    if snapshot is not None:
+        return snapshot
+    generation = _generation
+    return _store(generation, SettingsSnapshot.from_rows(await db.scalars(select(models.Setting))))
+
+
+def _invalidate(table: str, key: Optional[str]) -> None:
+    global _snapshot, _generation
+    if table in ("settings", cache_bus.ALL_TABLES):
+        _generation += 1
+        _snapshot = None
+
+
+cache_bus.subscribe(_invalidate)
@@ -0,0 +1,190 @@
+"""
+static_files.py — StaticFiles for the /uploads mount.
+
+Centralizes: UploadStaticFiles, which adds to Starlette's StaticFiles
+  - Cache-Control: content-addressed blobs (uploads/blobs/...) and their
+    resized variants (uploads/variants/...) are immutable — their URL changes
+    whenever their bytes do; other paths get UPLOADS_CACHE_MAX_AGE
+  - strong ETags: a blob's ETag is its sha256
+  - single-range requests (206 / 416, honouring If-Range)
+  - precompressed .gz sidecars (see blobstore.precompress) for clients that
+    accept gzip
+  - X-Accel-Redirect: with UPLOADS_ACCEL_REDIRECT set (the prefix of an
+    `internal` nginx location aliased to the uploads volume) the worker only
+    resolves the path and headers, and nginx sends the bytes, ranges and
+    .gz sidecars itself under the worker's ETag (If-Range included)
+  - rendering of a missing variant on its first request (see images.py)
+"""
+import os
+import re
+import stat
+from typing import Optional
+from urllib.parse import quote
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from . import images
+from .blobstore import BLOB_PREFIX, IMMUTABLE_CACHE_CONTROL, PRECOMPRESSED_EXTENSIONS, PRECOMPRESSED_SUFFIX
+
+UPLOADS_ACCEL_REDIRECT = os.getenv("UPLOADS_ACCEL_REDIRECT", "")
+UPLOADS_CACHE_MAX_AGE = int(os.getenv("UPLOADS_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+
+_VARIANTS = images.VARIANT_PREFIX + os.sep
+_IMMUTABLE_PREFIXES = (BLOB_PREFIX + os.sep, _VARIANTS)
+_BLOB_FILE = re.compile(r"^[0-9a-f]{64}(\.[a-z0-9]+)?$")
+_BYTE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def _byte_range(header: str, size: int) -> Optional[tuple[int, int]]:
+    """(first, last) byte of a single `bytes=` range; None means send the whole file."""
+    match = _BYTE_RANGE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None  # Malformed or multiple ranges — a full 200 is always allowed
+    first, last = match.group(1), match.group(2)
+    if first == "":
+        start, end = max(size - int(last), 0), size - 1  # Suffix: the last N bytes
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+class RangeFileResponse(FileResponse):
+    """206 Partial Content: bytes start..end (inclusive) of the file."""
+
+    def __init__(self, path: str, start: int, end: int, stat_result: os.stat_result, **kwargs):
+        super().__init__(path, status_code=206, stat_result=stat_result, **kwargs)
+        self.start, self.end = start, end
+        self.headers["content-range"] = f"bytes {start}-{end}/{stat_result.st_size}"
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        remaining = self.end - self.start + 1
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            while remaining:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break  # Truncated underneath us; the client sees a short body
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def _etag(path: str, stat_result: os.stat_result) -> Optional[str]:
+    """Content-derived ETag for blobs; None leaves Starlette's mtime/size one."""
+    if path.startswith(BLOB_PREFIX + os.sep):
+        name = os.path.basename(path)
+        if _BLOB_FILE.match(name):
+            return f'"{name.split(".", 1)[0]}"'
+    return None
+
+
+def _sidecar_stat(full_path: str) -> Optional[os.stat_result]:
+    """stat() of the file's .gz sidecar, if it has one."""
+    try:
+        sidecar_stat = os.stat(f"{full_path}{PRECOMPRESSED_SUFFIX}")
+    except OSError:
+        return None
+    return sidecar_stat if stat.S_ISREG(sidecar_stat.st_mode) else None
+
+
+def _accepts_gzip(request_headers: Headers) -> bool:
+    for coding in request_headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() == "gzip":
+            q = params.replace(" ", "").lower().partition("q=")[2]
+            try:
+                return float(q) > 0 if q else True
+            except ValueError:
+                return False
+    return False
+
+
+class UploadStaticFiles(StaticFiles):
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        try:
+            return await super().get_response(path, scope)
+        except HTTPException as exc:
+            if exc.status_code != 404 or not path.startswith(_VARIANTS):
+                raise
+            if not await images.ensure_variant(path):
+                raise
+        return await super().get_response(path, scope)
+
+    def file_response(
+        self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200,
+    ) -> Response:
+        path = self.get_path(scope)
+        request_headers = Headers(scope=scope)
+        headers = {
+            "accept-ranges": "bytes",
+            "cache-control": (
+                IMMUTABLE_CACHE_CONTROL if path.startswith(_IMMUTABLE_PREFIXES)
+                else f"public, max-age={UPLOADS_CACHE_MAX_AGE}"
+            ),
+        }
+        etag = _etag(path, stat_result)
+        if etag:
+            headers["etag"] = etag
+        compressible = os.path.splitext(path)[1].lower() in PRECOMPRESSED_EXTENSIONS
+        if compressible:
+            headers["vary"] = "Accept-Encoding"
+
+        response = FileResponse(full_path, status_code=status_code, headers=headers, stat_result=stat_result)
+        range_header = request_headers.get("range")
+        # nginx's gzip_static picks the sidecar the same way, Range or not
+        sidecar_stat = None
+        if compressible and (UPLOADS_ACCEL_REDIRECT or not range_header) and _accepts_gzip(request_headers):
+            sidecar_stat = _sidecar_stat(full_path)
+        if sidecar_stat is not None:
+            # A strong ETag per encoding, so 304s and If-Range keep working for both
+            response.headers["etag"] = response.headers["etag"][:-1] + '-gzip"'
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+
+        if UPLOADS_ACCEL_REDIRECT:
+            # nginx serves the file (and Range / gzip_static); it keeps our Cache-Control and, with
+            # `etag off` in nginx.conf, this ETag
+            headers["etag"] = response.headers["etag"]
+            headers["x-accel-redirect"] = UPLOADS_ACCEL_REDIRECT + quote(path.replace(os.sep, "/"))
+            return Response(status_code=status_code, headers=headers, media_type=response.media_type)
+
+        if range_header and status_code == 200 and self._if_range_matches(request_headers, response):
+            try:
+                byte_range = _byte_range(range_header, stat_result.st_size)
+            except RangeNotSatisfiable:
+                return Response(status_code=416, headers={"content-range": f"bytes */{stat_result.st_size}"})
+            if byte_range is not None:
+                return RangeFileResponse(full_path, *byte_range, stat_result=stat_result, headers=headers)
+
+        if sidecar_stat is not None:
+            headers["content-encoding"] = "gzip"
+            headers["etag"] = response.headers["etag"]
+            return FileResponse(
+                f"{full_path}{PRECOMPRESSED_SUFFIX}", status_code=status_code, headers=headers,
+                media_type=response.media_type, stat_result=sidecar_stat,
+            )
+        return response
+
+    @staticmethod
+    def _if_range_matches(request_headers: Headers, response: Response) -> bool:
+        if_range = request_headers.get("if-range")
+        if if_range is None:
+            return True
+        return if_range in (response.headers["etag"], response.headers["last-modified"])
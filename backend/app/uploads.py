@@ -0,0 +1,274 @@
+"""
+uploads.py — Streaming, size-bounded writes of uploaded files to disk.
+
+Centralizes: save_upload(), which copies an UploadFile to a temp file beside
+its destination one chunk at a time (file I/O and hashing run in the
+threadpool, never on the event loop), aborts as soon as the byte limit is
+crossed, and os.replace()s the finished file into place so readers never
+see a partial upload (stage_upload() stops before the move, for callers
+that name the file after its hash); and resumable upload sessions (create / append /
+complete / abort) whose state lives on disk under UPLOAD_SESSION_DIR, so any
+worker can continue a session another worker started.
+"""
+import errno
+import fcntl
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+from typing import AsyncIterator, NamedTuple, Optional
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+CHUNK_SIZE = 1024 * 1024  # 1 MB
+# Allowance over a route's file limit for multipart framing and its other form fields
+FORM_OVERHEAD_BYTES = 1024 * 1024
+
+# Outside the publicly served uploads/ tree
+UPLOAD_SESSION_DIR = os.getenv("UPLOAD_SESSION_DIR", "upload_sessions")
+UPLOAD_SESSION_TTL_SECONDS = int(os.getenv("UPLOAD_SESSION_TTL_SECONDS", str(24 * 3600)))
+
+
+class UploadTooLarge(Exception):
+    """Raised once more than max_bytes have been received."""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Upload exceeds {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+class SavedUpload(NamedTuple):
+    size: int
+    sha256: str
+
+
+def _discard(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def public_tempfile(directory: str, prefix: str = ".upload-") -> tuple[int, str]:
+    """mkstemp(), but readable by the web server (mkstemp creates files 0600)."""
+    fd, path = tempfile.mkstemp(dir=directory, prefix=prefix, suffix=".part")
+    os.fchmod(fd, 0o644)
+    return fd, path
+
+
+def _write_chunk(out, digest, chunk: bytes) -> None:
+    out.write(chunk)
+    if digest is not None:
+        digest.update(chunk)
+
+
+async def _iter_upload(upload: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await upload.read(CHUNK_SIZE):
+        yield chunk
+
+
+async def _rechunk(stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Coalesce small ASGI body messages into CHUNK_SIZE writes."""
+    buf = bytearray()
+    async for piece in stream:
+        buf += piece
+        if len(buf) >= CHUNK_SIZE:
+            yield bytes(buf)
+            buf.clear()
+    if buf:
+        yield bytes(buf)
+
+
+async def _copy(chunks: AsyncIterator[bytes], out, digest, written: int, max_bytes: int) -> int:
+    async for chunk in chunks:
+        written += len(chunk)
+        if written > max_bytes:
+            raise UploadTooLarge(max_bytes)
+        await run_in_threadpool(_write_chunk, out, digest, chunk)
+    return written
+
+
+async def stage_upload(upload: UploadFile, directory: str, max_bytes: int) -> tuple[str, SavedUpload]:
+    """Stream `upload` to a temp file in `directory`, hashing it; the caller moves or discards it."""
+    await run_in_threadpool(os.makedirs, directory, exist_ok=True)
+    # Same directory as the destination, so the final os.replace() is an atomic rename
+    fd, tmp_path = await run_in_threadpool(public_tempfile, directory)
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, "wb") as out:
+            written = await _copy(_iter_upload(upload), out, digest, 0, max_bytes)
+    except BaseException:
+        _discard(tmp_path)
+        raise
+    return tmp_path, SavedUpload(written, digest.hexdigest())
+
+
+async def save_upload(upload: UploadFile, dest_path: str, max_bytes: int) -> SavedUpload:
+    """Stream `upload` to `dest_path` (at most max_bytes), hashing it on the way."""
+    tmp_path, saved = await stage_upload(upload, os.path.dirname(dest_path) or ".", max_bytes)
+    try:
+        await run_in_threadpool(os.replace, tmp_path, dest_path)
+    except BaseException:
+        _discard(tmp_path)
+        raise
+    return saved
+
+
+# ── Resumable sessions ────────────────────────────────────────────────────────
+class UploadSessionNotFound(Exception):
+    """Unknown, expired or already completed session."""
+
+
+class UploadSessionBusy(Exception):
+    """Another request is appending to the same session."""
+
+
+class UploadChecksumMismatch(Exception):
+    """The assembled file does not hash to the sha256 the client sent."""
+
+
+class UploadOffsetMismatch(Exception):
+    """The client's offset is not where the session's data currently ends."""
+
+    def __init__(self, expected: int):
+        super().__init__(f"Expected offset {expected}")
+        self.expected = expected
+
+
+_SESSION_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+def _session_paths(session_id: str) -> tuple[str, str]:
+    if not _SESSION_ID.match(session_id):
+        raise UploadSessionNotFound(session_id)
+    base = os.path.join(UPLOAD_SESSION_DIR, session_id)
+    return base + ".json", base + ".part"
+
+
+def create_session(meta: dict) -> str:
+    """Start a session; `meta` (destination, owner, ...) is stored with it."""
+    os.makedirs(UPLOAD_SESSION_DIR, exist_ok=True)
+    sweep_expired_sessions()
+    session_id = uuid.uuid4().hex
+    meta_path, data_path = _session_paths(session_id)
+    open(data_path, "xb").close()
+    with open(meta_path, "x") as f:
+        json.dump({**meta, "created_at": time.time()}, f)
+    return session_id
+
+
+def read_session(session_id: str) -> tuple[dict, int]:
+    """(meta, bytes received so far)."""
+    meta_path, data_path = _session_paths(session_id)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        offset = os.path.getsize(data_path)
+    except (FileNotFoundError, ValueError):
+        raise UploadSessionNotFound(session_id)
+    if time.time() - meta["created_at"] > UPLOAD_SESSION_TTL_SECONDS:
+        abort_session(session_id)
+        raise UploadSessionNotFound(session_id)
+    return meta, offset
+
+
+def _open_for_append(data_path: str, offset: int):
+    out = open(data_path, "ab")
+    _lock(out)
+    current = out.seek(0, os.SEEK_END)
+    if current != offset:
+        out.close()
+        raise UploadOffsetMismatch(current)
+    return out
+
+
+async def append_to_session(session_id: str, body: AsyncIterator[bytes], offset: int, max_bytes: int) -> int:
+    """Append a request body at `offset`; returns the new offset."""
+    _, data_path = _session_paths(session_id)
+    await run_in_threadpool(read_session, session_id)
+    out = await run_in_threadpool(_open_for_append, data_path, offset)
+    try:
+        try:
+            return await _copy(_rechunk(body), out, None, offset, max_bytes)
+        except BaseException:
+            # Drop a partial chunk so the client can retry from the last good offset
+            out.truncate(offset)
+            raise
+    finally:
+        out.close()
+
+
+def _lock(f) -> None:
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        raise UploadSessionBusy(f.name)
+
+
+def _move_into_place(src: str, dest_path: str) -> None:
+    directory = os.path.dirname(dest_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    try:
+        os.replace(src, dest_path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # Session dir is on another filesystem: copy beside the target, then rename
+        fd, tmp_path = public_tempfile(directory)
+        try:
+            with os.fdopen(fd, "wb") as out, open(src, "rb") as f:
+                shutil.copyfileobj(f, out, CHUNK_SIZE)
+            os.replace(tmp_path, dest_path)
+        except BaseException:
+            _discard(tmp_path)
+            raise
+        os.unlink(src)
+
+
+def _complete(session_id: str, dest_path: str, expected_sha256: Optional[str]) -> SavedUpload:
+    meta_path, data_path = _session_paths(session_id)
+    read_session(session_id)
+    digest = hashlib.sha256()
+    with open(data_path, "rb") as f:
+        _lock(f)  # No append may land between hashing and the move
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+        size = f.tell()
+        sha256 = digest.hexdigest()
+        if expected_sha256 and expected_sha256.lower() != sha256:
+            raise UploadChecksumMismatch(f"Received data hashes to {sha256}")
+        _move_into_place(data_path, dest_path)
+    _discard(meta_path)
+    return SavedUpload(size, sha256)
+
+
+async def complete_session(session_id: str, dest_path: str, expected_sha256: Optional[str] = None) -> SavedUpload:
+    """Hash the assembled file, verify it against expected_sha256 and move it to dest_path."""
+    return await run_in_threadpool(_complete, session_id, dest_path, expected_sha256)
+
+
+def abort_session(session_id: str) -> None:
+    for path in _session_paths(session_id):
+        _discard(path)
+
+
+def sweep_expired_sessions() -> None:
+    """Delete sessions older than UPLOAD_SESSION_TTL_SECONDS (called when a session starts)."""
+    cutoff = time.time() - UPLOAD_SESSION_TTL_SECONDS
+    try:
+        names = os.listdir(UPLOAD_SESSION_DIR)
+    except FileNotFoundError:
+        return
+    for name in names:
+        path = os.path.join(UPLOAD_SESSION_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.unlink(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+middleware_overhead.py — Per-request cost of the security-header / logging middleware.
+
+Usage (from backend/):
+    python benchmarks/middleware_overhead.py [--requests 5000] [--chunks 64]
+
+Calls a trivial JSON route and a streaming route through the ASGI interface
+directly (no sockets, no database), with
+  - no middleware (baseline),
+  - the former pair of @app.middleware("http") functions (BaseHTTPMiddleware),
+  - app.middleware.RequestMiddleware,
+and prints the mean time per request and the overhead over the baseline.
+Logging is silenced so only the middleware machinery is measured.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import StreamingResponse  # noqa: E402
+
+from app.middleware import SECURITY_HEADERS, RequestMiddleware  # noqa: E402
+
+logger = logging.getLogger("jdgk-api")
+
+
+def build_app(variant: str, chunks: int) -> FastAPI:
+    app = FastAPI()
+
+    # async handlers keep threadpool hand-offs out of the numbers
+    @app.get("/json")
+    async def read_json():
+        return {"message": "ok"}
+
+    async def body():
+        for _ in range(chunks):
+            yield b"x" * 1024
+
+    @app.get("/stream")
+    async def read_stream():
+        return StreamingResponse(body(), media_type="text/plain")
+
+    if variant == "decorators":
+        # The middlewares as they were before RequestMiddleware
+        @app.middleware("http")
+        async def add_security_headers(request: Request, call_next):
+            response = await call_next(request)
+            for name, value in SECURITY_HEADERS.items():
+                response.headers[name] = value
+            return response
+
+        @app.middleware("http")
+        async def log_requests(request: Request, call_next):
+            start = time.time()
+            response = await call_next(request)
+            duration_ms = round((time.time() - start) * 1000)
+            logger.info(f"{request.method} {request.url.path} → {response.status_code} ({duration_ms}ms)")
+            return response
+    elif variant == "asgi":
+        app.add_middleware(RequestMiddleware)
+    return app
+
+
+async def call(app, path: str) -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    received = 0
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if request_sent:
+            await asyncio.Event().wait()  # No disconnect; cancelled once the response is sent
+        request_sent = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal received
+        if message["type"] == "http.response.body":
+            received += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return received
+
+
+async def measure(app, path: str, requests: int) -> float:
+    for _ in range(min(500, requests)):  # warm up (route compilation, first-call imports)
+        await call(app, path)
+    start = time.perf_counter_ns()
+    for _ in range(requests):
+        await call(app, path)
+    return (time.perf_counter_ns() - start) / requests / 1000
+
+
+async def main(requests: int, chunks: int) -> None:
+    logging.disable(logging.CRITICAL)
+    variants = ("none", "decorators", "asgi")
+    apps = {variant: build_app(variant, chunks) for variant in variants}
+    for path in ("/json", "/stream"):
+        print(f"\n{path}  ({requests} requests)")
+        baseline = None
+        for variant in variants:
+            us = await measure(apps[variant], path, requests)
+            baseline = us if baseline is None else baseline
+            print(f"  {variant:<11} {us:9.1f} µs/request   overhead {us - baseline:+8.1f} µs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--chunks", type=int, default=64, help="1 KiB chunks per streamed response")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.chunks))
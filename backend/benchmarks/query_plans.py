@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+query_plans.py — EXPLAIN ANALYZE the API's list queries with and without the declared indexes.
+
+Usage (from backend/, DATABASE_URL set):
+    python benchmarks/query_plans.py [--rows 20000] [--plans]
+
+Everything runs inside one transaction that is rolled back at the end:
+synthetic rows are inserted and ANALYZEd, each query is explained with the
+indexes from models.py, then the non-unique declared indexes are dropped
+(DROP INDEX is transactional in Postgres) and each query is explained again.
+The database is left exactly as it was.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sqlalchemy import select, text  # noqa: E402
+from sqlalchemy.schema import DropIndex  # noqa: E402
+
+from app import crud, models  # noqa: E402
+from app.database import Base, engine  # noqa: E402
+
+# Synthetic data: ~1/3 published, 50 pages to assign blocks to, 50 jobs
+SEED_SQL = [
+    """INSERT INTO pages (id, title, slug, status, created_at)
+       SELECT 'bench-page-' || g, 'Page ' || g, 'bench-page-' || g,
+              (ARRAY['draft','published','archived'])[g % 3 + 1], now() - g * interval '1 minute'
+       FROM generate_series(1, :rows) g""",
+    """INSERT INTO blog_posts (id, title, slug, status, created_at)
+       SELECT 'bench-post-' || g, 'Post ' || g, 'bench-post-' || g,
+              (ARRAY['draft','published','archived'])[g % 3 + 1], now() - g * interval '1 minute'
+       FROM generate_series(1, :rows) g""",
+    """INSERT INTO gallery_items (id, title, slug, image_url, category, sort_order, status)
+       SELECT 'bench-img-' || g, 'Image ' || g, 'bench-img-' || g, '/uploads/x.jpg',
+              (ARRAY['office','events','team','equipment'])[g % 4 + 1], g % 100,
+              (ARRAY['draft','published','archived'])[g % 3 + 1]
+       FROM generate_series(1, :rows) g""",
+    """INSERT INTO content_blocks (id, name, label, block_type, status, sort_order, page_assignments)
+       SELECT 'bench-block-' || g, 'bench-block-' || g, 'Block ' || g,
+              (ARRAY['hero','text','cta','stats'])[g % 4 + 1],
+              (ARRAY['draft','published','archived'])[g % 3 + 1], g % 100,
+              jsonb_build_array('bench-page-' || (g % 50), 'bench-page-' || ((g + 7) % 50))
+       FROM generate_series(1, :rows) g""",
+    """INSERT INTO job_listings (id, title, status, created_at)
+       SELECT 'bench-job-' || g, 'Job ' || g, 'open', now() FROM generate_series(1, 50) g""",
+    """INSERT INTO job_applications (id, job_id, first_name, last_name, email, status, created_at)
+       SELECT 'bench-app-' || g, 'bench-job-' || (g % 50 + 1), 'A', 'B', 'a@b.c',
+              (ARRAY['new','reviewing','shortlisted','rejected','hired'])[g % 5 + 1],
+              now() - g * interval '1 minute'
+       FROM generate_series(1, :rows) g""",
+    """INSERT INTO contact_messages (id, full_name, email, message, is_read, submitted_at)
+       SELECT 'bench-msg-' || g, 'Sender ' || g, 'sender' || g || '@example.com', 'hello',
+              g % 4 <> 0, now() - g * interval '1 minute'
+       FROM generate_series(1, :rows) g""",
+]
+
+BENCH_TABLES = ["pages", "blog_posts", "gallery_items", "content_blocks", "job_listings", "job_applications", "contact_messages"]
+
+# Representative list queries, built the same way the API builds them
+QUERIES = {
+    "pages ?status=published": crud.select_pages(status="published"),
+    "blog_posts ?status=published (newest)": crud._apply_sort(
+        select(models.BlogPost).where(models.BlogPost.status == "published"), models.BlogPost, None, "desc",
+    ),
+    "gallery_items ?status=published&category=team": crud.select_gallery_items(status="published", category="team"),
+    "content_blocks ?status=published&page_slug=…": crud.select_content_blocks(status="published", page_slug="bench-page-7"),
+    "content_blocks ?block_type=hero": crud.select_content_blocks(block_type="hero"),
+    "job_applications ?job_id=…": crud._apply_sort(
+        select(models.JobApplication).where(models.JobApplication.job_id == "bench-job-7"),
+        models.JobApplication, None, "desc",
+    ),
+    "contact_messages ?is_read=false": crud.select_contact_messages(is_read=False),
+}
+
+
+def _explain(conn, stmt) -> dict:
+    compiled = stmt.limit(20).compile(dialect=conn.dialect)
+    # Run the bind processors by hand (JSONB values have no literal renderer)
+    params = {}
+    for key, value in compiled.params.items():
+        process = compiled.binds[key].type.dialect_impl(conn.dialect).bind_processor(conn.dialect)
+        params[key] = process(value) if process else value
+    plan = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {compiled}", params).scalar()
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]
+
+
+def _nodes(node: dict) -> list[str]:
+    label = node["Node Type"]
+    if "Index Name" in node:
+        label += f" using {node['Index Name']}"
+    elif "Relation Name" in node:
+        label += f" on {node['Relation Name']}"
+    return [label] + [n for child in node.get("Plans", []) for n in _nodes(child)]
+
+
+def _run_all(conn, show_plans: bool) -> dict:
+    results = {}
+    for name, stmt in QUERIES.items():
+        plan = _explain(conn, stmt)
+        results[name] = plan
+        if show_plans:
+            print(f"\n--- {name}\n{json.dumps(plan['Plan'], indent=2)}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="synthetic rows per table (default 20000)")
+    parser.add_argument("--plans", action="store_true", help="print the full JSON plans")
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            print(f"Seeding {args.rows} rows per table (rolled back afterwards)...")
+            for sql in SEED_SQL:
+                conn.execute(text(sql), {"rows": args.rows})
+            conn.execute(text(f"ANALYZE {', '.join(BENCH_TABLES)}"))
+
+            with_indexes = _run_all(conn, args.plans)
+
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    if not index.unique:
+                        conn.execute(DropIndex(index, if_exists=True))
+            conn.execute(text(f"ANALYZE {', '.join(BENCH_TABLES)}"))
+
+            without_indexes = _run_all(conn, args.plans)
+        finally:
+            trans.rollback()
+
+    print(f"\n{'query':<48} {'no index (ms)':>14} {'indexed (ms)':>13}")
+    for name in QUERIES:
+        before, after = without_indexes[name], with_indexes[name]
+        print(f"{name:<48} {before['Execution Time']:>14.3f} {after['Execution Time']:>13.3f}")
+        print(f"    before: {' → '.join(_nodes(before['Plan']))}")
+        print(f"    after:  {' → '.join(_nodes(after['Plan']))}")
+
+
+if __name__ == "__main__":
+    main()
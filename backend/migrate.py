@@ -56,6 +56,52 @@ def add_column_if_missing(conn, table: str, column: str, col_type: str, default:
         print(f"  ✅ {table}.\"{column}\" exists")
 
 
+def backfill_team_member_slugs(conn):
+    """
+    Give every team member a unique slug derived from its name (-2, -3, ...
+    on collisions), then make sure slug is unique-indexed, so the API can
+    resolve /team_members/{slug} with one index lookup.
+    """
+    from app.crud import _generate_slug
+
+    rows = conn.execute(text(
+        "SELECT id, name, slug FROM team_members ORDER BY created_at NULLS LAST, id"
+    )).all()
+    taken = set()
+    updates = []
+    # Keep existing unique slugs first, so only missing/duplicate ones change
+    for _, _, slug in rows:
+        if slug:
+            taken.add(slug)
+    seen = set()
+    for member_id, name, slug in rows:
+        if slug and slug not in seen:
+            seen.add(slug)
+            continue
+        base = _generate_slug(name or "") or "member"
+        candidate, n = base, 2
+        while candidate in taken:
+            candidate, n = f"{base}-{n}", n + 1
+        taken.add(candidate)
+        seen.add(candidate)
+        updates.append({"id": member_id, "slug": candidate})
+
+    if updates:
+        print(f"  🔄 Backfilling {len(updates)} team member slug(s)")
+        conn.execute(text("UPDATE team_members SET slug = :slug WHERE id = :id"), updates)
+        conn.commit()
+    else:
+        print("  ✅ All team members have unique slugs")
+
+    has_index = conn.execute(text(
+        "SELECT 1 FROM pg_indexes WHERE tablename = 'team_members' AND indexdef LIKE '%(slug)'"
+    )).first()
+    if not has_index:
+        print("  ➕ Adding unique index on team_members.slug")
+        conn.execute(text("CREATE UNIQUE INDEX ix_team_members_slug ON team_members (slug)"))
+        conn.commit()
+
+
 def make_others_nullable(conn, table: str, excluded_columns: list):
     """
     Finds all columns in 'table' that are NOT NULL and don't have a default,
@@ -129,6 +175,7 @@ def migrate():
             add_column_if_missing(conn, "team_members", "website_url", "VARCHAR")
             add_column_if_missing(conn, "team_members", "github_url", "VARCHAR")
             add_column_if_missing(conn, "team_members", "twitter_url", "VARCHAR")
+            backfill_team_member_slugs(conn)
 
             # Convert expertise/achievements from TEXT to JSON if they were previously added as TEXT
             for col in ("expertise", "achievements"):
@@ -200,6 +247,11 @@ def migrate():
             add_column_if_missing(conn, "job_listings", "address", "VARCHAR")
             add_column_if_missing(conn, "job_listings", "salary_type", "VARCHAR")
 
+        # ── upload_blobs table ── Add source image width ────────────────────
+        if table_exists(conn, "upload_blobs"):
+            print("📋 Checking upload_blobs table columns...")
+            add_column_if_missing(conn, "upload_blobs", "width", "INTEGER")
+
         # ── Create any missing tables using SQLAlchemy metadata ─────────────
         print("  📋 Ensuring all tables exist (create_all)...")
 
@@ -210,6 +262,17 @@ def migrate():
     # To be safe, ensure models are loaded.
     import app.models # noqa
     Base.metadata.create_all(bind=engine)
+
+    # create_all() only indexes the tables it creates — add declared indexes
+    # (models.py __table_args__ / index=True) that existing tables are missing
+    print("  📋 Ensuring declared indexes exist...")
+    for table in Base.metadata.sorted_tables:
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except Exception as e:
+                # e.g. a unique slug index over legacy duplicate rows — keep going
+                print(f"  ⚠️ Could not create index {index.name}: {e}")
     print("✅ Migrations complete.")
 
 
@@ -25,5 +25,10 @@ done
 echo "✅ Database is ready. Running schema migrations..."
 python migrate.py
 
+# Per-worker metric snapshots (see app/metrics.py) start fresh with each server
+METRICS_DIR=${METRICS_DIR:-/tmp/jdgk-api-metrics}
+rm -rf "$METRICS_DIR" && mkdir -p "$METRICS_DIR"
+export METRICS_DIR
+
 echo "🚀 Starting API server..."
-exec uvicorn app.main:app --host 0.0.0.0 --port 3000 --workers 2 --access-log
+exec uvicorn app.main:app --host 0.0.0.0 --port 3000 --workers 2 --no-access-log
@@ -0,0 +1,57 @@
+"""
+Shared fixtures. The suite runs against the database in DATABASE_URL (see
+.env.example) with the dev requirements installed:
+
+    pip install -r requirements-dev.txt
+    pytest
+
+Tests create their own rows and delete them afterwards; they do not reset
+the database.
+"""
+import pytest
+
+from app.cache import query_cache
+from app.database import AsyncSessionLocal, SessionLocal, async_engine
+from app.main_helpers import limiter
+
+# Tests call the same routes many times from one client address
+limiter.enabled = False
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(autouse=True)
+def _empty_query_cache():
+    query_cache.clear()
+    yield
+    query_cache.clear()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+async def async_db():
+    """An AsyncSession for @pytest.mark.anyio tests."""
+    async with AsyncSessionLocal() as session:
+        yield session
+    # Each test runs on its own event loop; asyncpg connections cannot outlive it
+    await async_engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def client():
+    """A TestClient with the app lifespan running (seeding, background tasks)."""
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,59 @@
+"""auth: the bearer-token identity cache and its invalidation."""
+import uuid
+
+import pytest
+from pydantic import ValidationError
+
+from app import auth, crud, schemas
+
+
+@pytest.fixture
+def make_user(db):
+    ids = []
+
+    def make(role: str = "user"):
+        user = crud.create_user(db, schemas.UserCreate(
+            email=f"test-{uuid.uuid4().hex[:12]}@example.com", password="x" * 12, role=role,
+        ))
+        ids.append(user.id)
+        return user
+
+    yield make
+    for user_id in ids:
+        crud.delete_user(db, user_id)
+
+
+def _bearer(user) -> dict:
+    return {"Authorization": f"Bearer {auth.create_access_token({'sub': user.id})}"}
+
+
+def test_identity_is_cached_read_only_and_without_credentials(client, make_user):
+    headers = _bearer(make_user())
+    assert client.get("/api/user_roles/me", headers=headers).json()["role"] == "user"
+
+    identity = auth._cached_user(headers["Authorization"].split()[1])
+    assert isinstance(identity, schemas.Identity)
+    assert not hasattr(identity, "hashed_password")
+    with pytest.raises(ValidationError):
+        identity.role = "admin"
+
+    hits = auth.identity_cache_stats()["hits"]
+    client.get("/api/user_roles/me", headers=headers)
+    assert auth.identity_cache_stats()["hits"] == hits + 1
+
+
+def test_role_change_applies_to_the_next_request(client, db, make_user):
+    user = make_user()
+    headers = _bearer(user)
+    client.get("/api/user_roles/me", headers=headers)
+
+    crud.update_user_role(db, user.id, "admin")
+    assert client.get("/api/user_roles/me", headers=headers).json()["role"] == "admin"
+
+
+def test_signup_keeps_other_cached_identities(client, make_user):
+    token = _bearer(make_user())["Authorization"].split()[1]
+    client.get("/api/user_roles/me", headers={"Authorization": f"Bearer {token}"})
+
+    make_user()
+    assert auth._cached_user(token) is not None
@@ -0,0 +1,112 @@
+"""blobstore: deduplicated storage, reference counting and garbage collection."""
+import hashlib
+import os
+import uuid
+
+import pytest
+from sqlalchemy import delete, select
+
+from app import blobstore, crud_async, models, uploads
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def upload_root(tmp_path, monkeypatch):
+    """Run in a temp directory so uploads/ (blobs, paths, variants) lands there."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+async def store(async_db, upload_root):
+    """store(path, data) through blobstore.store(); blob and path rows are deleted afterwards."""
+    hashes, paths = set(), set()
+
+    async def store(path: str, data: bytes) -> blobstore.StoredUpload:
+        tmp_path = blobstore.staging_path()
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        saved = uploads.SavedUpload(len(data), hashlib.sha256(data).hexdigest())
+        hashes.add(saved.sha256)
+        paths.add(path)
+        return await blobstore.store(async_db, tmp_path, saved, os.path.join("uploads", path), ".png", "image/png")
+
+    yield store
+    await async_db.rollback()
+    await async_db.execute(delete(models.UploadPath).where(models.UploadPath.path.in_(paths)))
+    await async_db.execute(delete(models.UploadBlob).where(models.UploadBlob.sha256.in_(hashes)))
+    await async_db.commit()
+
+
+async def _blob(db, sha256: str):
+    return await db.scalar(
+        select(models.UploadBlob).where(models.UploadBlob.sha256 == sha256).execution_options(populate_existing=True)
+    )
+
+
+async def _gc(db) -> None:
+    await blobstore.collect_garbage(db, grace_seconds=0)
+
+
+async def test_identical_content_is_stored_once(async_db, store, upload_root):
+    data = os.urandom(1024)
+    prefix = uuid.uuid4().hex
+    first = await store(f"{prefix}/a.png", data)
+    second = await store(f"{prefix}/b.png", data)
+
+    assert first.url == second.url == blobstore.blob_url(first.sha256, ".png")
+    assert (await _blob(async_db, first.sha256)).ref_count == 2
+    blob_file = upload_root / "uploads" / blobstore.blob_name(first.sha256, ".png")
+    for path in (first.path, second.path):
+        assert os.path.samefile(blob_file, upload_root / "uploads" / path)
+
+
+async def test_replacing_a_path_moves_its_reference(async_db, store):
+    path = f"{uuid.uuid4().hex}/logo.png"
+    old = await store(path, os.urandom(64))
+    new = await store(path, os.urandom(64))
+
+    assert (await _blob(async_db, old.sha256)).ref_count == 0
+    assert (await _blob(async_db, new.sha256)).ref_count == 1
+
+
+async def test_gc_deletes_unreferenced_blobs_only(async_db, store, upload_root):
+    prefix = uuid.uuid4().hex
+    kept = await store(f"{prefix}/kept.png", os.urandom(64))
+    dropped = await store(f"{prefix}/dropped.png", os.urandom(64))
+    assert await blobstore.remove(async_db, os.path.join("uploads", dropped.path))
+    assert not await blobstore.remove(async_db, os.path.join("uploads", dropped.path))
+    assert (await _blob(async_db, dropped.sha256)).ref_count == 0
+
+    await _gc(async_db)
+
+    assert await _blob(async_db, dropped.sha256) is None
+    assert not (upload_root / "uploads" / blobstore.blob_name(dropped.sha256, ".png")).exists()
+    assert (await _blob(async_db, kept.sha256)).ref_count == 1
+    assert (upload_root / "uploads" / blobstore.blob_name(kept.sha256, ".png")).exists()
+
+
+async def test_gc_keeps_blobs_referenced_by_cms_rows(async_db, store):
+    stored = await store(f"{uuid.uuid4().hex}/photo.png", os.urandom(64))
+    await blobstore.remove(async_db, os.path.join("uploads", stored.path))
+    item = models.GalleryItem(title="GC test", image_url=stored.url)
+    async_db.add(item)
+    await async_db.commit()
+    try:
+        await _gc(async_db)
+        assert await _blob(async_db, stored.sha256) is not None
+    finally:
+        await async_db.delete(item)
+        await async_db.commit()
+
+    await _gc(async_db)
+    assert await _blob(async_db, stored.sha256) is None
+
+
+async def test_ref_count_does_not_go_negative(async_db, store):
+    stored = await store(f"{uuid.uuid4().hex}/x.png", os.urandom(64))
+    for _ in range(2):
+        await crud_async._release_blob(async_db, stored.sha256)
+    await async_db.commit()
+    assert (await _blob(async_db, stored.sha256)).ref_count == 0
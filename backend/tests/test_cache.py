@@ -0,0 +1,65 @@
+"""cache: QueryCache tags / TTL / LRU and the @cached_query snapshots."""
+import uuid
+
+import pytest
+from pydantic import ValidationError
+
+from app import crud, schemas
+from app.cache import _MISSING, QueryCache, query_cache
+
+
+def test_invalidate_drops_only_tagged_entries():
+    cache = QueryCache(ttl=60, max_entries=10)
+    cache.set("pages", 1, ["pages"])
+    cache.set("bundle", 2, ["pages", "settings"])
+    cache.set("services", 3, ["services"])
+
+    cache.invalidate("settings")
+
+    assert cache.get("pages") == 1
+    assert cache.get("bundle") is _MISSING
+    assert cache.get("services") == 3
+    cache.invalidate("pages", "services")
+    assert cache.stats()["entries"] == 0
+
+
+def test_expired_entry_is_a_miss():
+    cache = QueryCache(ttl=-1, max_entries=10)
+    cache.set("key", "value", ["pages"])
+    assert cache.get("key") is _MISSING
+    assert cache.stats() == {"entries": 0, "hits": 0, "misses": 1, "evictions": 0}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QueryCache(ttl=60, max_entries=2)
+    cache.set("a", 1, ["t"])
+    cache.set("b", 2, ["t"])
+    cache.get("a")
+    cache.set("c", 3, ["t"])
+
+    assert cache.get("b") is _MISSING
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cached_rows_are_shared_frozen_snapshots(db):
+    first = crud.get_pages(db, slug="home")
+    hits = query_cache.hits
+    second = crud.get_pages(db, slug="home")
+    assert query_cache.hits == hits + 1
+    assert second[0] is first[0]
+    assert isinstance(first[0], schemas.Page)
+    with pytest.raises(ValidationError):
+        first[0].title = "Changed"
+
+
+def test_write_invalidates_cached_list(db):
+    slug = f"test-{uuid.uuid4().hex[:12]}"
+    assert crud.get_pages(db, slug=slug) == []
+
+    page = crud.create_page(db, schemas.PageCreate(title="Cache test", slug=slug))
+    try:
+        assert [row.id for row in crud.get_pages(db, slug=slug)] == [page.id]
+    finally:
+        crud.delete_page(db, page.id)
+    assert crud.get_pages(db, slug=slug) == []
@@ -0,0 +1,62 @@
+"""cache_bus: invalidation events travel over NOTIFY and are applied once per worker."""
+import json
+import select
+
+import pytest
+
+from app import cache_bus
+from app.cache import _MISSING, query_cache
+from app.database import engine
+
+
+@pytest.fixture
+def listener():
+    conn = cache_bus._connect(engine)
+    yield conn
+    conn.close()
+
+
+def _events(conn, timeout: float = 2.0) -> list[dict]:
+    if select.select([conn], [], [], timeout) == ([], [], []):
+        return []
+    conn.poll()
+    events = [json.loads(notify.payload) for notify in conn.notifies]
+    conn.notifies.clear()
+    return events
+
+
+def test_publish_is_delivered_on_commit(db, listener):
+    cache_bus.publish(db, "pages", "some-id")
+    assert _events(listener, timeout=0.2) == []
+
+    db.commit()
+    assert _events(listener) == [{"origin": cache_bus.WORKER_ID, "table": "pages", "key": "some-id"}]
+
+
+def test_rolled_back_publish_is_not_delivered(db, listener):
+    cache_bus.publish(db, "pages")
+    db.rollback()
+    assert _events(listener, timeout=0.2) == []
+
+
+def test_remote_event_invalidates_table_and_row_tags():
+    query_cache.set("list", 1, ["pages"])
+    query_cache.set("row", 2, ["pages:abc"])
+    query_cache.set("other", 3, ["services"])
+
+    cache_bus._handle(json.dumps({"origin": "another-worker", "table": "pages", "key": "abc"}))
+
+    assert query_cache.get("list") is _MISSING
+    assert query_cache.get("row") is _MISSING
+    assert query_cache.get("other") == 3
+
+
+def test_own_events_are_not_applied_twice():
+    calls = []
+    cache_bus.subscribe(lambda table, key: calls.append((table, key)))
+    try:
+        cache_bus._handle(json.dumps({"origin": cache_bus.WORKER_ID, "table": "pages", "key": None}))
+        cache_bus._handle(json.dumps({"origin": "another-worker", "table": "pages", "key": None}))
+    finally:
+        cache_bus._subscribers.pop()
+    assert calls == [("pages", None)]
@@ -0,0 +1,52 @@
+"""Conditional GET: ETag / Last-Modified validators on the collection endpoints."""
+import uuid
+
+from app import crud, schemas
+
+
+def test_matching_etag_gets_304(client):
+    first = client.get("/api/services")
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "no-cache"
+
+    again = client.get("/api/services", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+    # Weak comparison, and any tag in the list matches
+    strong = etag.removeprefix("W/")
+    listed = client.get("/api/services", headers={"If-None-Match": f'"other", {strong}'})
+    assert listed.status_code == 304
+
+
+def test_etag_depends_on_query_parameters(client):
+    etag = client.get("/api/services").headers["etag"]
+    response = client.get("/api/services?limit=1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+
+def test_write_changes_etag(client, db):
+    etag = client.get("/api/services").headers["etag"]
+    service = crud.create_service(
+        db, schemas.ServiceCreate(title="ETag test", slug=f"test-{uuid.uuid4().hex[:12]}", description="x"),
+    )
+    try:
+        response = client.get("/api/services", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+    finally:
+        crud.delete_service(db, service.id)
+
+
+def test_if_modified_since(client):
+    last_modified = client.get("/api/services").headers["last-modified"]
+    assert client.get("/api/services", headers={"If-Modified-Since": last_modified}).status_code == 304
+    stale = "Mon, 01 Jan 2001 00:00:00 GMT"
+    assert client.get("/api/services", headers={"If-Modified-Since": stale}).status_code == 200
+    # An ETag mismatch wins over a current If-Modified-Since
+    response = client.get(
+        "/api/services", headers={"If-None-Match": '"other"', "If-Modified-Since": last_modified},
+    )
+    assert response.status_code == 200
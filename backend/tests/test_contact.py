@@ -0,0 +1,91 @@
+"""contact: public submissions survive broken mail settings; the admin inbox list."""
+import random
+import string
+import uuid
+
+import pytest
+from sqlalchemy import delete, insert, select
+
+from app import auth, crud, models, schemas, settings_snapshot
+from app.main_helpers import NEXT_CURSOR_HEADER
+
+
+@pytest.fixture
+def broken_settings(monkeypatch):
+    async def current_async(db):
+        raise RuntimeError("settings unavailable")
+
+    monkeypatch.setattr(settings_snapshot, "current_async", current_async)
+
+
+@pytest.fixture
+def submitted(db):
+    """Names used for submissions; their messages and notifications are deleted afterwards."""
+    names = []
+
+    def name() -> str:
+        # Names may only hold letters and a little punctuation
+        names.append("Test " + "".join(random.choices(string.ascii_letters, k=12)))
+        return names[-1]
+
+    yield name
+    for full_name in names:
+        db.execute(delete(models.ContactMessage).where(models.ContactMessage.full_name == full_name))
+        db.execute(delete(models.EmailOutbox).where(models.EmailOutbox.subject == f"New Message from {full_name}"))
+    db.commit()
+
+
+def test_message_is_stored_when_settings_fail(client, db, broken_settings, submitted):
+    full_name = submitted()
+    response = client.post("/api/contact", json={
+        "full_name": full_name, "email": "someone@example.com", "message": "Hello, is anyone there?",
+    })
+    assert response.status_code == 200
+
+    assert db.get(models.ContactMessage, response.json()["id"]) is not None
+    recipients = db.scalar(
+        select(models.EmailOutbox.recipients).where(models.EmailOutbox.subject == f"New Message from {full_name}")
+    )
+    # Addressed when sent, from the settings at that time
+    assert recipients == []
+
+
+@pytest.fixture
+def admin_headers(db):
+    admin = crud.create_user(db, schemas.UserCreate(
+        email=f"test-{uuid.uuid4().hex[:12]}@example.com", password="x" * 12, role="admin",
+    ))
+    yield {"Authorization": f"Bearer {auth.create_access_token({'sub': admin.id})}"}
+    crud.delete_user(db, admin.id)
+
+
+@pytest.fixture
+def inbox(db):
+    """105 messages from one sender, so listing them by email sees only these."""
+    email = f"test-{uuid.uuid4().hex[:12]}@example.com"
+    db.execute(insert(models.ContactMessage), [
+        {"full_name": "Test Sender", "email": email, "message": f"Message number {n}"} for n in range(105)
+    ])
+    db.commit()
+    yield email
+    db.execute(delete(models.ContactMessage).where(models.ContactMessage.email == email))
+    db.commit()
+
+
+def test_inbox_without_limit_is_complete(client, admin_headers, inbox):
+    response = client.get("/api/contact_messages", params={"email": inbox}, headers=admin_headers)
+    assert response.status_code == 200
+    assert len(response.json()) == 105
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+
+def test_inbox_pages_with_limit(client, admin_headers, inbox):
+    first = client.get("/api/contact_messages", params={"email": inbox, "limit": 100}, headers=admin_headers)
+    assert len(first.json()) == 100
+    cursor = first.headers[NEXT_CURSOR_HEADER]
+
+    rest = client.get("/api/contact_messages", params={"email": inbox, "cursor": cursor}, headers=admin_headers)
+    assert len(rest.json()) == 5
+    assert NEXT_CURSOR_HEADER not in rest.headers
+    ids = [row["id"] for row in first.json() + rest.json()]
+    assert len(set(ids)) == 105
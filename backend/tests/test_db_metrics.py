@@ -0,0 +1,32 @@
+"""db_metrics: per-request statement counts and the assert_max_queries guard."""
+import pytest
+from sqlalchemy import select
+
+from app import models
+from app.db_metrics import QUERY_BUDGET, assert_max_queries
+
+# Two statements per table: its collection stamp, then (on a miss) the rows
+BUNDLE = {"include": ["services"]}
+
+
+def test_page_bundle_stays_within_the_query_budget(client):
+    with assert_max_queries(QUERY_BUDGET):
+        response = client.get("/api/page_bundle/home", params=BUNDLE)
+    assert response.status_code == 200
+    assert response.headers["server-timing"].startswith("db;dur=")
+
+    # Served from the query cache as a unit (Server-Timing counts only this request)
+    warm = client.get("/api/page_bundle/home", params=BUNDLE)
+    assert 'desc="0 queries"' in warm.headers["server-timing"]
+
+
+def test_repeated_statement_fails_the_guard(db):
+    with pytest.raises(AssertionError, match="repeated"):
+        with assert_max_queries(100, repeat_threshold=2):
+            for _ in range(3):
+                db.execute(select(models.Page.id).limit(1)).all()
+
+    with pytest.raises(AssertionError, match="at most 1 statements"):
+        with assert_max_queries(1):
+            db.execute(select(models.Page.id).limit(1)).all()
+            db.execute(select(models.Service.id).limit(1)).all()
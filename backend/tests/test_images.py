@@ -0,0 +1,102 @@
+"""images: srcset widths bounded by the source, and which variants may be rendered."""
+import hashlib
+import io
+import os
+
+import pytest
+from PIL import Image
+from sqlalchemy import delete, select
+
+from app import blobstore, images, models, uploads
+
+pytestmark = pytest.mark.skipif(not images.VARIANT_FORMATS, reason="Pillow cannot encode any variant format")
+
+
+def _png(width: int, height: int = 50) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), "red").save(out, format="PNG")
+    return out.getvalue()
+
+
+@pytest.fixture(autouse=True)
+def upload_root(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(images, "_source_widths", {})
+    images.srcset.cache_clear()
+    yield tmp_path
+    images.srcset.cache_clear()
+
+
+def _blob(data: bytes) -> str:
+    sha256 = hashlib.sha256(data).hexdigest()
+    path = os.path.join("uploads", blobstore.blob_name(sha256, ".png"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return sha256
+
+
+def _widths(srcset: str) -> list[int]:
+    return [int(candidate.rsplit(" ", 1)[1].rstrip("w")) for candidate in srcset.split(", ")]
+
+
+def test_srcset_stops_at_the_source_width():
+    sha256 = _blob(_png(700))
+    result = images.srcset(blobstore.blob_url(sha256, ".png"))
+
+    assert set(result) == set(images.VARIANT_FORMATS)
+    for fmt, candidates in result.items():
+        assert _widths(candidates) == [w for w in images.VARIANT_WIDTHS if w < 700] + [700]
+        assert images.variant_url(sha256, 700, fmt) in candidates
+
+
+def test_small_source_offers_only_its_own_width():
+    sha256 = _blob(_png(100))
+    result = images.srcset(blobstore.blob_url(sha256, ".png"))
+    assert all(_widths(candidates) == [100] for candidates in result.values())
+
+
+def test_recorded_width_is_used_without_reading_the_file():
+    images.remember_widths([("ab" * 32, 500)])
+    result = images.srcset(blobstore.blob_url("ab" * 32, ".png"))
+    assert _widths(next(iter(result.values()))) == [w for w in images.VARIANT_WIDTHS if w < 500] + [500]
+
+
+def test_unreadable_or_missing_source_has_no_srcset():
+    assert images.srcset(blobstore.blob_url("cd" * 32, ".png")) is None
+    sha256 = hashlib.sha256(b"not an image").hexdigest()
+    _blob(b"not an image")
+    assert images.srcset(blobstore.blob_url(sha256, ".png")) is None
+
+
+def test_only_offered_widths_are_rendered():
+    sha256 = _blob(_png(700))
+    fmt = images.VARIANT_FORMATS[0]
+
+    def variant(width: int) -> str:
+        return f"variants/{sha256[:2]}/{sha256}/{width}.{fmt}"
+
+    assert images.render_variant(variant(700))
+    with Image.open(os.path.join("uploads", variant(700))) as im:
+        assert im.width == 700
+    assert images.render_variant(variant(320))
+    assert not images.render_variant(variant(960))  # Would be an upscale
+    assert not images.render_variant(variant(500))  # Not a listed width
+
+
+@pytest.mark.anyio
+async def test_store_records_the_width(async_db):
+    data = _png(321)
+    tmp_path = blobstore.staging_path()
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    saved = uploads.SavedUpload(len(data), hashlib.sha256(data).hexdigest())
+    stored = await blobstore.store(async_db, tmp_path, saved, "uploads/width-test.png", ".png", "image/png")
+    try:
+        width = await async_db.scalar(select(models.UploadBlob.width).where(models.UploadBlob.sha256 == stored.sha256))
+        assert width == 321
+        assert images.source_width(stored.sha256) == 321
+    finally:
+        await async_db.execute(delete(models.UploadPath).where(models.UploadPath.path == stored.path))
+        await async_db.execute(delete(models.UploadBlob).where(models.UploadBlob.sha256 == stored.sha256))
+        await async_db.commit()
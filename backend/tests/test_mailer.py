@@ -0,0 +1,156 @@
+"""mailer: the outbox sender against an in-process SMTP server (aiosmtpd)."""
+import socket
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from aiosmtpd.controller import Controller
+from sqlalchemy import delete, select
+
+from app import mailer, models, settings_snapshot
+from app.database import AsyncSessionLocal, async_engine
+from app.main_helpers import mail_config_from_settings
+
+pytestmark = pytest.mark.anyio
+
+Outbox = models.EmailOutbox
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class _Inbox:
+    def __init__(self):
+        self.envelopes = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.envelopes.append(envelope)
+        return "250 Message accepted for delivery"
+
+
+@pytest.fixture
+def smtp_server():
+    inbox = _Inbox()
+    controller = Controller(inbox, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    yield controller, inbox
+    controller.stop()
+
+
+@pytest.fixture
+async def outbox():
+    """Queue messages under a new unique subject; deleted (with the async pool) afterwards."""
+    ids = []
+
+    async def queue(count: int, recipients: tuple = ("someone@example.com",)) -> str:
+        subject = f"test-{uuid.uuid4().hex}"
+        async with AsyncSessionLocal() as db:
+            rows = [mailer.compose(subject, recipients, f"<p>{n}</p>") for n in range(count)]
+            db.add_all(rows)
+            await db.commit()
+            ids.extend(row.id for row in rows)
+        return subject
+
+    yield queue
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Outbox).where(Outbox.id.in_(ids)))
+        await db.commit()
+    # Each test runs on its own event loop; asyncpg connections cannot outlive it
+    await async_engine.dispose()
+
+
+def _use_smtp(monkeypatch, port: int):
+    config = mail_config_from_settings(
+        {"smtp_host": "127.0.0.1", "smtp_port": str(port), "smtp_use_tls": "false"}
+    )
+
+    async def current_async(db):
+        return SimpleNamespace(mail_config=config, recipient="office@example.com")
+
+    monkeypatch.setattr(settings_snapshot, "current_async", current_async)
+
+
+async def _rows(subject: str) -> list[models.EmailOutbox]:
+    async with AsyncSessionLocal() as db:
+        return (await db.scalars(select(Outbox).where(Outbox.subject == subject))).all()
+
+
+async def _drain(conn: "mailer._Connection", subject: str) -> None:
+    # Other due rows in the database may be claimed first
+    for _ in range(10):
+        if all(row.attempts for row in await _rows(subject)):
+            return
+        await mailer._send_due(conn)
+
+
+async def test_sends_batch_over_one_connection(monkeypatch, smtp_server, outbox):
+    controller, inbox = smtp_server
+    _use_smtp(monkeypatch, controller.port)
+    conn = mailer._Connection()
+    connects = mailer.mailer_metrics.connects
+    try:
+        subject = await outbox(3)
+        await _drain(conn, subject)
+        subject_later = await outbox(1)
+        await _drain(conn, subject_later)
+    finally:
+        await conn.close()
+
+    rows = await _rows(subject) + await _rows(subject_later)
+    assert [row.status for row in rows] == ["sent"] * 4
+    assert all(row.sent_at is not None and row.last_error is None for row in rows)
+    delivered = [e for e in inbox.envelopes if subject in e.content.decode()]
+    assert len(delivered) == 3
+    assert delivered[0].rcpt_tos == ["someone@example.com"]
+    # The connection stays open between passes
+    assert mailer.mailer_metrics.connects == connects + 1
+
+
+async def test_unreachable_server_defers_with_backoff(monkeypatch, outbox):
+    _use_smtp(monkeypatch, _free_port())  # Nothing listening
+    conn = mailer._Connection()
+    subject = await outbox(2)
+    try:
+        await _drain(conn, subject)
+    finally:
+        await conn.close()
+
+    rows = await _rows(subject)
+    now = datetime.now(timezone.utc)
+    for row in rows:
+        assert row.status == "pending"
+        assert row.attempts == 1
+        assert row.last_error
+        # Deferred by the backoff, not claimed again on the next pass
+        assert (row.next_attempt_at - now).total_seconds() > mailer.MAIL_RETRY_BASE_SECONDS - 5
+
+
+async def test_notification_goes_to_the_current_recipient(monkeypatch, smtp_server, outbox):
+    controller, inbox = smtp_server
+    _use_smtp(monkeypatch, controller.port)
+    conn = mailer._Connection()
+    try:
+        subject = await outbox(1, recipients=())
+        await _drain(conn, subject)
+    finally:
+        await conn.close()
+
+    delivered = [e for e in inbox.envelopes if subject in e.content.decode()]
+    assert [e.rcpt_tos for e in delivered] == [["office@example.com"]]
+
+
+async def test_settings_failure_leases_nothing(monkeypatch, outbox):
+    async def current_async(db):
+        raise RuntimeError("settings unavailable")
+
+    monkeypatch.setattr(settings_snapshot, "current_async", current_async)
+    subject = await outbox(1)
+    with pytest.raises(RuntimeError):
+        await mailer._send_due(mailer._Connection())
+
+    [row] = await _rows(subject)
+    assert (row.status, row.attempts) == ("pending", 0)
@@ -0,0 +1,79 @@
+"""Keyset pagination: cursor round trips, seeking, and rejected cursors."""
+import base64
+import json
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app import crud, models, schemas
+from app.main_helpers import NEXT_CURSOR_HEADER
+
+
+def _cursor(payload: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def test_cursor_round_trip():
+    created = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    rows = [SimpleNamespace(id="a", created_at=created)]
+    cursor = crud.next_cursor(rows, models.Page, "created_at", "desc", limit=1)
+
+    assert crud._decode_cursor(cursor, models.Page.created_at, descending=True) == (created, "a")
+
+
+def test_no_cursor_after_last_page():
+    rows = [SimpleNamespace(id="a", sort_order=1)]
+    assert crud.next_cursor(rows, models.Service, None, "asc", limit=2) is None
+    assert crud.next_cursor([], models.Service, None, "asc", limit=2) is None
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", _cursor({"k": "sort_order"}), _cursor(["list"])])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(crud.InvalidCursor):
+        crud._decode_cursor(cursor, models.Service.sort_order, descending=False)
+
+
+def test_cursor_for_another_sort_is_rejected():
+    cursor = _cursor({"k": "sort_order", "d": False, "id": "a", "v": 1})
+    with pytest.raises(crud.InvalidCursor):
+        crud._decode_cursor(cursor, models.Service.title, descending=False)
+    with pytest.raises(crud.InvalidCursor):
+        crud._decode_cursor(cursor, models.Service.sort_order, descending=True)
+
+
+def test_invalid_cursor_is_a_400(client):
+    response = client.get("/api/services", params={"cursor": "garbage"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Malformed pagination cursor"
+
+
+@pytest.fixture
+def services(db):
+    """Five services sharing a sort_order, so pages are ordered by the id tiebreaker."""
+    prefix = f"test-{uuid.uuid4().hex[:8]}"
+    rows = [
+        crud.create_service(db, schemas.ServiceCreate(title=f"{prefix}-{n}", slug=f"{prefix}-{n}", sort_order=-1000))
+        for n in range(5)
+    ]
+    yield sorted(row.id for row in rows)
+    for row in rows:
+        crud.delete_service(db, row.id)
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_cursor_pages_cover_every_row_once(client, services, order):
+    seen, cursor = [], None
+    while True:
+        params = {"sort_by": "sort_order", "order": order, "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/services", params=params)
+        assert response.status_code == 200
+        seen.extend(row["id"] for row in response.json() if row["sort_order"] == -1000)
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+
+    assert seen == (services if order == "asc" else services[::-1])
@@ -0,0 +1,60 @@
+"""rate_limit: the Postgres-backed window shared by workers, checked off the event loop."""
+import threading
+import uuid
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from slowapi import _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
+
+from app.main_helpers import limiter
+from app.rate_limit import PostgresStorage
+
+_client = {"key": ""}
+_threads = {}
+
+app = FastAPI()
+app.state.limiter = limiter
+app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
+
+@app.get("/limited")
+@limiter.limit("2/minute", key_func=lambda: _client["key"])
+async def limited(request: Request):
+    _threads["route"] = threading.get_ident()
+    return {"ok": True}
+
+
+@pytest.fixture
+def workers():
+    """Two storages on their own pools, as two uvicorn workers would have."""
+    first, second = PostgresStorage(), PostgresStorage()
+    key = f"test-{uuid.uuid4().hex}"
+    yield first, second, key
+    first.clear(key)
+    first.engine.dispose()
+    second.engine.dispose()
+
+
+def test_moving_window_is_shared_between_workers(workers):
+    first, second, key = workers
+    assert first.acquire_entry(key, limit=2, expiry=60)
+    assert second.acquire_entry(key, limit=2, expiry=60)
+    assert not first.acquire_entry(key, limit=2, expiry=60)
+    assert second.get_moving_window(key, limit=2, expiry=60)[1] == 2
+
+
+def test_async_route_is_checked_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(limiter, "enabled", True)
+    monkeypatch.setitem(_client, "key", f"test-{uuid.uuid4().hex}")
+    check = limiter._check_request_limit
+
+    def spy(*args):
+        _threads["check"] = threading.get_ident()
+        return check(*args)
+
+    monkeypatch.setattr(limiter, "_check_request_limit", spy)
+    with TestClient(app) as client:
+        assert [client.get("/limited").status_code for _ in range(3)] == [200, 200, 429]
+    assert _threads["check"] != _threads["route"]
@@ -0,0 +1,45 @@
+"""settings_snapshot: one bad admin-edited SMTP setting must not break settings readers."""
+import os
+
+import pytest
+from sqlalchemy import delete, select
+
+from app import crud, models, schemas, settings_snapshot
+
+
+@pytest.fixture
+def save_setting(db):
+    """Save settings through crud (so the snapshot is dropped); restored afterwards."""
+    saved = {}
+
+    def save(key: str, value: str):
+        if key not in saved:
+            row = db.scalar(select(models.Setting).where(models.Setting.key == key))
+            saved[key] = (row is not None, row.value if row else None)
+        crud.update_settings_bulk(db, [schemas.SettingBase(key=key, value=value)])
+
+    yield save
+    for key, (existed, value) in saved.items():
+        if existed:
+            crud.update_settings_bulk(db, [schemas.SettingBase(key=key, value=value)])
+        else:
+            db.execute(delete(models.Setting).where(models.Setting.key == key))
+            crud._commit(db, "settings")
+
+
+def test_invalid_from_address_only_affects_mail(client, db, save_setting):
+    save_setting("smtp_from_email", "JDGK Info")
+
+    response = client.get("/api/settings/public")
+    assert response.status_code == 200
+    assert {row["key"]: row["value"] for row in response.json()}["smtp_from_email"] == "JDGK Info"
+    assert client.get("/api/page_bundle/home").status_code == 200
+
+    # The mailer gets the environment's config instead
+    config = settings_snapshot.current(db).mail_config
+    assert config.MAIL_FROM == os.getenv("MAIL_FROM", "info@jdgkbsi.ph")
+
+
+def test_mail_config_uses_valid_settings(db, save_setting):
+    save_setting("smtp_from_email", "mailer@example.com")
+    assert settings_snapshot.current(db).mail_config.MAIL_FROM == "mailer@example.com"
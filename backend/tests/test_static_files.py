@@ -0,0 +1,89 @@
+"""static_files: upload serving — blob ETags, Range, gzip sidecars and X-Accel-Redirect."""
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import static_files
+from app.blobstore import BLOB_PREFIX, PRECOMPRESSED_SUFFIX
+from app.static_files import UploadStaticFiles
+
+SHA = "ab" * 32
+PNG = f"/uploads/{BLOB_PREFIX}/{SHA}.png"
+SVG = f"/uploads/{BLOB_PREFIX}/{SHA}.svg"
+BODY = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def uploads(tmp_path):
+    blobs = tmp_path / BLOB_PREFIX
+    blobs.mkdir()
+    (blobs / f"{SHA}.png").write_bytes(BODY)
+    (blobs / f"{SHA}.svg").write_bytes(b"<svg/>")
+    (blobs / f"{SHA}.svg{PRECOMPRESSED_SUFFIX}").write_bytes(gzip.compress(b"<svg/>"))
+    app = FastAPI()
+    app.mount("/uploads", UploadStaticFiles(directory=str(tmp_path)), name="uploads")
+    with TestClient(app) as client:
+        yield client
+
+
+def test_blob_has_strong_content_etag(uploads):
+    response = uploads.get(PNG)
+    assert response.status_code == 200
+    assert response.headers["etag"] == f'"{SHA}"'
+    assert "immutable" in response.headers["cache-control"]
+    assert uploads.get(PNG, headers={"If-None-Match": f'"{SHA}"'}).status_code == 304
+
+
+def test_range_and_if_range(uploads):
+    partial = uploads.get(PNG, headers={"Range": "bytes=10-19"})
+    assert partial.status_code == 206
+    assert partial.content == BODY[10:20]
+    assert partial.headers["content-range"] == f"bytes 10-19/{len(BODY)}"
+
+    assert uploads.get(PNG, headers={"Range": "bytes=-5"}).content == BODY[-5:]
+    assert uploads.get(PNG, headers={"Range": f"bytes={len(BODY)}-"}).status_code == 416
+    # A validator that no longer matches gets the whole file
+    stale = uploads.get(PNG, headers={"Range": "bytes=10-19", "If-Range": '"other"'})
+    assert stale.status_code == 200
+    assert stale.content == BODY
+
+
+def test_gzip_sidecar(uploads):
+    response = uploads.get(SVG, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == f'"{SHA}-gzip"'
+    assert response.content == b"<svg/>"  # Decoded by the client
+    assert uploads.get(SVG, headers={"Accept-Encoding": "gzip", "If-None-Match": f'"{SHA}-gzip"'}).status_code == 304
+
+    identity = uploads.get(SVG, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["etag"] == f'"{SHA}"'
+
+
+def test_accel_redirect_passes_the_etag_to_nginx(uploads, monkeypatch):
+    monkeypatch.setattr(static_files, "UPLOADS_ACCEL_REDIRECT", "/_uploads/")
+
+    response = uploads.get(PNG, headers={"Range": "bytes=0-9"})
+    assert response.status_code == 200  # nginx applies the Range
+    assert response.content == b""
+    assert response.headers["x-accel-redirect"] == f"/_uploads/{BLOB_PREFIX}/{SHA}.png"
+    assert response.headers["etag"] == f'"{SHA}"'
+
+    # Strong per encoding: gzip_static sends the sidecar exactly when the worker would have
+    gzipped = uploads.get(SVG, headers={"Accept-Encoding": "gzip", "Range": "bytes=0-9"})
+    assert gzipped.headers["etag"] == f'"{SHA}-gzip"'
+    assert "content-encoding" not in gzipped.headers
+    assert uploads.get(SVG, headers={"Accept-Encoding": "identity"}).headers["etag"] == f'"{SHA}"'
+    assert uploads.get(SVG, headers={"Accept-Encoding": "gzip", "If-None-Match": f'"{SHA}-gzip"'}).status_code == 304
+
+
+def test_accel_redirect_etag_for_other_files(uploads, monkeypatch, tmp_path):
+    monkeypatch.setattr(static_files, "UPLOADS_ACCEL_REDIRECT", "/_uploads/")
+    (tmp_path / "legacy.png").write_bytes(BODY)
+
+    response = uploads.get("/uploads/legacy.png")
+    assert response.headers["x-accel-redirect"] == "/_uploads/legacy.png"
+    etag = response.headers["etag"]
+    assert uploads.get("/uploads/legacy.png", headers={"If-None-Match": etag}).status_code == 304
@@ -0,0 +1,145 @@
+"""uploads: streamed, size-bounded saves and the request body limit in front of them."""
+import hashlib
+import io
+import json
+import os
+
+import pytest
+from starlette.datastructures import UploadFile
+
+from app import uploads
+from app.routers import job_applications, storage
+
+APPLICANT = json.dumps({"first_name": "Test", "last_name": "Applicant", "mobile": "0917 000 0000", "email": "t@example.com"})
+
+
+@pytest.mark.anyio
+async def test_save_upload_streams_and_hashes(tmp_path):
+    data = os.urandom(3 * uploads.CHUNK_SIZE + 17)
+    dest = tmp_path / "out.bin"
+
+    saved = await uploads.save_upload(UploadFile(io.BytesIO(data), filename="x.bin"), str(dest), len(data))
+
+    assert saved == uploads.SavedUpload(len(data), hashlib.sha256(data).hexdigest())
+    assert dest.read_bytes() == data
+    assert os.listdir(tmp_path) == ["out.bin"]
+
+
+@pytest.mark.anyio
+async def test_save_upload_over_limit_leaves_nothing(tmp_path):
+    data = b"x" * (uploads.CHUNK_SIZE + 1)
+    with pytest.raises(uploads.UploadTooLarge):
+        await uploads.save_upload(UploadFile(io.BytesIO(data), filename="x.bin"), str(tmp_path / "out.bin"), uploads.CHUNK_SIZE)
+    assert os.listdir(tmp_path) == []
+
+
+def _apply(client, resume: bytes, **kwargs):
+    return client.post(
+        "/api/job_applications",
+        data={"applicant_data": APPLICANT},
+        files={"resume": ("cv.pdf", resume, "application/pdf")},
+        **kwargs,
+    )
+
+
+def test_oversized_body_is_refused_before_parsing(client):
+    response = _apply(client, b"x" * (job_applications.MAX_RESUME_BYTES + uploads.FORM_OVERHEAD_BYTES))
+    assert response.status_code == 413
+    assert response.json()["detail"].startswith("Request body exceeds")
+
+
+def test_chunked_oversized_body_is_cut_off(client):
+    limit = job_applications.MAX_RESUME_BYTES + uploads.FORM_OVERHEAD_BYTES
+
+    def body():
+        for _ in range(limit // uploads.CHUNK_SIZE + 2):
+            yield b"x" * uploads.CHUNK_SIZE
+
+    response = client.post(
+        "/api/job_applications", content=body(), headers={"Content-Type": "multipart/form-data; boundary=b"},
+    )
+    assert response.status_code == 413
+
+
+def test_resume_over_file_limit_within_body_limit(client):
+    response = _apply(client, b"x" * (job_applications.MAX_RESUME_BYTES + 1))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Resume must be 5 MB or less"
+
+
+def test_oversized_storage_upload_is_refused_before_auth(client):
+    response = client.post(
+        "/api/storage/upload",
+        files={"file": ("big.png", b"x" * (storage.UPLOAD_MAX_BYTES + uploads.FORM_OVERHEAD_BYTES), "image/png")},
+    )
+    assert response.status_code == 413
+
+
+# ── Resumable sessions ────────────────────────────────────────────────────────
+@pytest.fixture
+def session_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_SESSION_DIR", str(tmp_path / "sessions"))
+    return tmp_path
+
+
+async def _body(*pieces: bytes):
+    for piece in pieces:
+        yield piece
+
+
+@pytest.mark.anyio
+async def test_session_appends_at_offset_and_completes(session_dir):
+    data = os.urandom(1000)
+    session_id = uploads.create_session({"user_id": "u"})
+
+    offset = await uploads.append_to_session(session_id, _body(data[:400]), 0, len(data))
+    assert offset == 400
+    meta, received = uploads.read_session(session_id)
+    assert meta["user_id"] == "u" and received == 400
+    offset = await uploads.append_to_session(session_id, _body(data[400:700], data[700:]), 400, len(data))
+    assert offset == 1000
+
+    dest = session_dir / "out" / "file.bin"
+    saved = await uploads.complete_session(session_id, str(dest), hashlib.sha256(data).hexdigest().upper())
+    assert saved == uploads.SavedUpload(1000, hashlib.sha256(data).hexdigest())
+    assert dest.read_bytes() == data
+    with pytest.raises(uploads.UploadSessionNotFound):
+        uploads.read_session(session_id)
+
+
+@pytest.mark.anyio
+async def test_session_rejects_wrong_offset(session_dir):
+    session_id = uploads.create_session({})
+    await uploads.append_to_session(session_id, _body(b"abc"), 0, 100)
+
+    with pytest.raises(uploads.UploadOffsetMismatch) as exc:
+        await uploads.append_to_session(session_id, _body(b"def"), 1, 100)
+    assert exc.value.expected == 3
+    assert uploads.read_session(session_id)[1] == 3
+
+
+@pytest.mark.anyio
+async def test_session_over_limit_keeps_last_good_offset(session_dir):
+    session_id = uploads.create_session({})
+    await uploads.append_to_session(session_id, _body(b"a" * 60), 0, 100)
+
+    with pytest.raises(uploads.UploadTooLarge):
+        await uploads.append_to_session(session_id, _body(b"b" * 50), 60, 100)
+    assert uploads.read_session(session_id)[1] == 60
+
+
+@pytest.mark.anyio
+async def test_session_checksum_mismatch_keeps_session(session_dir):
+    session_id = uploads.create_session({})
+    await uploads.append_to_session(session_id, _body(b"abc"), 0, 100)
+
+    with pytest.raises(uploads.UploadChecksumMismatch):
+        await uploads.complete_session(session_id, str(session_dir / "out.bin"), "0" * 64)
+    assert not (session_dir / "out.bin").exists()
+    assert uploads.read_session(session_id)[1] == 3
+
+
+def test_unknown_session_ids_are_not_found(session_dir):
+    for session_id in ("0" * 32, "../../etc/passwd"):
+        with pytest.raises(uploads.UploadSessionNotFound):
+            uploads.read_session(session_id)